@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark of the almanac field extraction: pattern strings passed to
+re.search() per call (the old extractors) against the compiled registry,
+a single alternation of all patterns, and MultiFieldExtractor
+"""
+import argparse
+import os
+import re
+import sys
+import time
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from crop_scraper.spiders.almanac_spider import FIELDS
+
+SAMPLE_PAGE = (
+    "Tomatoes | Planting, Growing, and Harvesting Tomato Plants. Tomatoes are warm-season "
+    "crops that need full sun and a long growing season. Sow seeds indoors 6 to 8 weeks before "
+    "the last spring frost. Planting depth: 1/4 inch. Spacing: 24 to 36 inches apart. "
+    "Days to maturity: 60 to 80 days. Watering: 1 to 2 inches per week, water deeply once a week. "
+    "Soil pH: 6.2 to 6.8. Soil: well-drained loam rich in organic matter. Fertilizer: 5-10-10 "
+    "at planting, then side-dress every two weeks. Compost: 2 inches worked into the bed. "
+    "Sunlight: at least 6 to 8 hours per day. Temperature: 65-85°F. Hardiness zones 3-11. "
+    "Harvest: when fruits are firm and fully colored. "
+)
+
+
+def load_pages(archive_path, spider, limit):
+    """Joined text of archived pages, or the built-in sample page"""
+    if not archive_path:
+        return [SAMPLE_PAGE * 20]
+
+    from crop_scraper.archive import ResponseArchive
+    pages = []
+    with ResponseArchive(archive_path) as archive:
+        for record in archive.records(spider=spider):
+            response = archive.load_response(record)
+            pages.append(' '.join(response.css('*::text').getall()))
+            if len(pages) >= limit:
+                break
+    return pages
+
+
+def per_call(text, fields):
+    """Pattern strings through re's compile cache, stopping at each field's first hit"""
+    return {
+        field: next((m for m in (re.search(p.pattern, text, re.IGNORECASE) for p in patterns) if m), None)
+        for field, patterns in fields.items()
+    }
+
+
+def precompiled(text, fields):
+    """The same loop over compiled patterns"""
+    return {
+        field: next((m for m in (p.search(text) for p in patterns) if m), None)
+        for field, patterns in fields.items()
+    }
+
+
+def build_alternation(fields):
+    """One pattern holding every field's patterns as named lookahead groups"""
+    branches = []
+    for f, patterns in enumerate(fields.values()):
+        for p, pattern in enumerate(patterns):
+            branches.append(f'(?=(?P<f{f}p{p}>{pattern.pattern}))')
+    return re.compile('|'.join(branches), re.IGNORECASE)
+
+
+def alternation(text, combined):
+    """Every field's pattern hits from a single scan of the page"""
+    found = {}
+    for match in combined.finditer(text):
+        found.setdefault(match.lastgroup, match)
+    return found
+
+
+def multi_field(text, extractor):
+    """MultiFieldExtractor.first_matches(), stopping at each field's first hit"""
+    matches = extractor.first_matches(text)
+    return {field: next((m for m in matches[field] if m), None) for field in extractor.fields}
+
+
+def bench(function, pages, argument, repeat):
+    # Warm up caches (compiled patterns and their lowercased twins) first
+    for text in pages:
+        function(text, argument)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for text in pages:
+            function(text, argument)
+    return (time.perf_counter() - started) / (repeat * len(pages)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--archive', help='Response archive to take pages from (default: a built-in sample page)')
+    parser.add_argument('--spider', default='almanac', help='Spider whose archived pages are used')
+    parser.add_argument('--pages', type=int, default=50, help='Number of archived pages to use')
+    parser.add_argument('--repeat', type=int, default=20, help='Passes over the pages')
+    args = parser.parse_args()
+
+    pages = load_pages(args.archive, args.spider, args.pages)
+    if not pages:
+        print("❌ No archived pages found")
+        return 1
+
+    fields = FIELDS.fields
+    pattern_count = sum(len(patterns) for patterns in fields.values())
+    average = sum(len(text) for text in pages) // len(pages)
+    print(f"📏 {len(pages)} pages, {average} characters on average, "
+          f"{len(fields)} fields / {pattern_count} patterns")
+
+    results = [
+        ('re.search(pattern string)', bench(per_call, pages, fields, args.repeat)),
+        ('compiled patterns', bench(precompiled, pages, fields, args.repeat)),
+        ('single alternation scan', bench(alternation, pages, build_alternation(fields), args.repeat)),
+        ('MultiFieldExtractor', bench(multi_field, pages, FIELDS, args.repeat)),
+    ]
+
+    baseline = results[0][1]
+    for name, ms in results:
+        print(f"   {name:<28} {ms:8.3f} ms/page  {baseline / ms:5.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Run several spiders at once in one process, sharing the database writer, the
+dedup cache and the HTTP cache, instead of one run per spider
+"""
+import argparse
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapy.utils.project import get_project_settings
+
+from crop_scraper.orchestrator import DEFAULT_SPIDERS, run_spiders
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('spiders', nargs='*', default=DEFAULT_SPIDERS,
+                        help=f"Spiders to run (default: {' '.join(DEFAULT_SPIDERS)})")
+    args = parser.parse_args()
+
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'crop_scraper.settings')
+    settings = get_project_settings()
+
+    print(f"🌱 Crawling with {', '.join(args.spiders)} in one process...")
+    results, seconds = run_spiders(settings, args.spiders)
+
+    for name, counts in results.items():
+        print(f"  {name}: {counts['pages']} pages -> {counts['items']} items "
+              f"({counts['dropped']} dropped) in {counts['seconds']}s [{counts['finish_reason']}]")
+    slowest = max((counts['seconds'] for counts in results.values()), default=0)
+    total = sum(counts['seconds'] for counts in results.values())
+    print(f"✅ Done in {seconds}s (slowest spider {slowest}s, {total:.1f}s if run one after another)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
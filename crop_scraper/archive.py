@@ -0,0 +1,175 @@
+# Durable archive of fetched responses, so extraction code can be re-run
+# offline instead of recrawling.
+#
+# Everything lives in one SQLite file:
+#
+#     bodies     zlib-compressed response bodies keyed by their SHA-256, so a
+#                body fetched again (by any spider, in any run) is stored once
+#     responses  one row per fetch: url, status, headers, body hash, fetch
+#                time, spider and callback, indexed for random access by url
+
+import hashlib
+import json
+import os
+import sqlite3
+import zlib
+from datetime import datetime
+
+
+class ResponseArchive:
+    """Content-addressed store of raw responses in a single SQLite file"""
+
+    def __init__(self, path='archive/responses.db', compression_level=6):
+        self.path = path
+        self.compression_level = compression_level
+        self.connection = None
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS bodies (
+                sha256 TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                body BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS responses (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                status INTEGER,
+                headers TEXT,
+                body_sha256 TEXT NOT NULL REFERENCES bodies (sha256),
+                fetched_at TEXT NOT NULL,
+                spider TEXT,
+                callback TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_responses_url ON responses (url, fetched_at);
+            CREATE INDEX IF NOT EXISTS idx_responses_spider ON responses (spider, fetched_at);
+        ''')
+        return self
+
+    def close(self):
+        if self.connection:
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def commit(self):
+        self.connection.commit()
+
+    def add(self, url, body, status=200, headers=None, spider=None, callback=None,
+            fetched_at=None):
+        """Archive one fetch. Returns the body's SHA-256."""
+        digest = hashlib.sha256(body).hexdigest()
+        cursor = self.connection.cursor()
+        # Only compress bodies we have not stored before
+        known = cursor.execute('SELECT 1 FROM bodies WHERE sha256 = ?', (digest,)).fetchone()
+        if not known:
+            cursor.execute(
+                'INSERT INTO bodies (sha256, size, body) VALUES (?, ?, ?)',
+                (digest, len(body), zlib.compress(body, self.compression_level))
+            )
+        cursor.execute(
+            '''INSERT INTO responses (url, status, headers, body_sha256, fetched_at, spider, callback)
+               VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            (url, status, json.dumps(headers or {}), digest,
+             fetched_at or datetime.now().isoformat(), spider, callback)
+        )
+        return digest
+
+    def add_response(self, response, spider=None, callback=None):
+        """Archive a Scrapy response"""
+        return self.add(
+            response.url, response.body,
+            status=response.status,
+            headers=headers_to_dict(response.headers),
+            spider=spider,
+            callback=callback,
+        )
+
+    def body(self, digest):
+        """Decompressed body for a SHA-256, or None"""
+        row = self.connection.execute('SELECT body FROM bodies WHERE sha256 = ?', (digest,)).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def records(self, spider=None, url=None, latest=True):
+        """Yield archived fetches as dicts, optionally only the newest per url"""
+        conditions, params = [], []
+        if spider:
+            conditions.append('spider = ?')
+            params.append(spider)
+        if url:
+            conditions.append('url = ?')
+            params.append(url)
+        if latest:
+            scope = 'WHERE spider = ?' if spider else ''
+            conditions.append(f'id IN (SELECT MAX(id) FROM responses {scope} GROUP BY url)')
+            if spider:
+                params.append(spider)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+
+        cursor = self.connection.execute(f'''
+            SELECT id, url, status, headers, body_sha256, fetched_at, spider, callback
+            FROM responses {where} ORDER BY id
+        ''', params)
+        for row in cursor:
+            yield {
+                'id': row[0],
+                'url': row[1],
+                'status': row[2],
+                'headers': json.loads(row[3] or '{}'),
+                'body_sha256': row[4],
+                'fetched_at': row[5],
+                'spider': row[6],
+                'callback': row[7],
+            }
+
+    def latest(self, url):
+        """The most recent archived fetch of a url, or None"""
+        for record in self.records(url=url):
+            return record
+        return None
+
+    def load_response(self, record):
+        """Rebuild a Scrapy response (HtmlResponse, TextResponse, ...) from a record"""
+        from scrapy.http import Headers
+        from scrapy.responsetypes import responsetypes
+
+        body = self.body(record['body_sha256'])
+        headers = Headers(record['headers'])
+        cls = responsetypes.from_args(headers=headers, url=record['url'], body=body)
+        return cls(url=record['url'], status=record['status'], headers=headers, body=body)
+
+    def stats(self):
+        """Counts and sizes, for reporting"""
+        responses = self.connection.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        bodies, raw, stored = self.connection.execute(
+            'SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(LENGTH(body)), 0) FROM bodies'
+        ).fetchone()
+        return {'responses': responses, 'bodies': bodies, 'raw_bytes': raw, 'stored_bytes': stored}
+
+
+def headers_to_dict(headers):
+    """Convert Scrapy Headers (bytes keys and values) to a JSON-friendly dict"""
+    return {
+        key.decode('latin-1'): [value.decode('latin-1') for value in values]
+        for key, values in headers.items()
+    }
+
+
+def callback_name(request):
+    """Name of the spider method a request is routed to"""
+    callback = request.callback
+    if callback is None:
+        return 'parse'
+    if isinstance(callback, str):
+        return callback
+    return getattr(callback, '__name__', None)
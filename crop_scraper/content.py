@@ -0,0 +1,225 @@
+# Main-content isolation: find the part of a page that holds the article and
+# leave out navigation, headers, footers, calendars and ads.
+#
+# One pass over the DOM measures, for every element, how much prose it
+# contains: the text of blocks (paragraphs, list items, runs of text in a
+# div) longer than MIN_BLOCK_LENGTH characters (text density) that are mostly
+# not link text (link density). The short entries and links of menus,
+# calendars and footers don't count. The main region is the deepest element
+# that still holds COVERAGE of the page's prose, going no deeper than an
+# <article> or <main> element; when prose is spread out, the region stays
+# wide rather than cutting part of the article off.
+#
+# Script, style and the HTML5 boilerplate elements (nav, header, footer,
+# aside, ...) are neither counted nor read, and neither are elements whose
+# class or id names them a sidebar, menu, comment section and the like,
+# unless it also names them content (as in "content-sidebar-wrap").
+#
+# Pages built from the same template put their content in the same place, so
+# the region found on one page is remembered as a locator per site template
+# (host and first path segment) and tried first on the next page.
+
+import re
+from urllib.parse import urlsplit
+from weakref import WeakKeyDictionary
+
+from parsel import Selector
+
+
+BOILERPLATE_TAGS = frozenset([
+    'script', 'style', 'noscript', 'template', 'nav', 'header', 'footer', 'aside',
+    'form', 'button', 'select', 'iframe', 'svg',
+])
+
+BOILERPLATE_HINT = re.compile(
+    r'\b(?:nav|navbar|menu|sidebar|footer|breadcrumbs?|comments?|related|share|sharing|social|'
+    r'newsletter|subscribe|calendar|widget|promo|sponsored|advert|ads?|cookie|popup|modal)\b',
+    re.IGNORECASE,
+)
+CONTENT_HINT = re.compile(r'\b(?:content|article|main|body|entry|post|story|text)\b', re.IGNORECASE)
+
+# Elements whose whole text is one block
+BLOCK_TAGS = frozenset([
+    'p', 'li', 'dd', 'dt', 'td', 'th', 'pre', 'blockquote', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+])
+
+# Elements whose text belongs to the block around them
+INLINE_TAGS = frozenset([
+    'a', 'abbr', 'b', 'br', 'cite', 'code', 'em', 'font', 'i', 'img', 'mark', 'q', 's',
+    'small', 'span', 'strong', 'sub', 'sup', 'time', 'u',
+])
+
+# The region is never narrowed below these
+CONTENT_TAGS = frozenset(['article', 'main'])
+
+MIN_BLOCK_LENGTH = 50
+MAX_LINK_DENSITY = 0.5
+COVERAGE = 0.9
+# Pages with less prose than this are used whole
+MIN_CONTENT_LENGTH = 150
+
+CLASS_SPACE = re.compile(r'\s+')
+
+# Region locators (XPath) by site template
+templates = {}
+
+# Main region of each response (None when the page is used whole)
+regions = WeakKeyDictionary()
+
+
+def template_key(url):
+    """Host and first path segment: pages of one template share their layout"""
+    parts = urlsplit(url)
+    segment = parts.path.strip('/').split('/', 1)[0]
+    return parts.netloc.lower(), segment
+
+
+def main_content(response):
+    """The lxml element holding a page's main content, or None to use the whole page"""
+    if response in regions:
+        return regions[response]
+
+    root = response.selector.root
+    key = template_key(response.url)
+    region = locate(root, templates.get(key))
+    if region is None:
+        region = find_region(root)
+        if region is not None:
+            templates[key] = locator(region)
+    regions[response] = region
+    return region
+
+
+def main_content_nodes(response, selector=None):
+    """Text nodes of the main content (matching a CSS selector); None without a main region"""
+    region = main_content(response)
+    if region is None:
+        return None
+    if selector is None:
+        return region_text(region)
+    return Selector(root=region, type='html').css(selector).getall()
+
+
+def is_boilerplate(element):
+    """Whether an element is navigation, a sidebar or similar by its tag, class or id"""
+    tag = element.tag
+    if not isinstance(tag, str):
+        # Comments and processing instructions
+        return True
+    if tag in BOILERPLATE_TAGS:
+        return True
+    names = f"{element.get('id', '')} {element.get('class', '')}"
+    return bool(BOILERPLATE_HINT.search(names)) and not CONTENT_HINT.search(names)
+
+
+def region_text(region):
+    """Text nodes of a region in document order, leaving out boilerplate inside it"""
+    from lxml import etree
+
+    nodes = []
+    skipped = 0
+    for event, element in etree.iterwalk(region, events=('start', 'end')):
+        if event == 'start':
+            if skipped or is_boilerplate(element):
+                skipped += 1
+            elif element.text:
+                nodes.append(element.text)
+            continue
+        if skipped:
+            skipped -= 1
+        if not skipped and element is not region and element.tail:
+            nodes.append(element.tail)
+    return nodes
+
+
+def locate(root, path):
+    """The element a cached locator points to, if it is unique and still holds content"""
+    if not path:
+        return None
+    found = root.xpath(path)
+    if len(found) != 1:
+        return None
+    text = sum(len(text.strip()) for text in region_text(found[0]))
+    return found[0] if text >= MIN_CONTENT_LENGTH else None
+
+
+def locator(element):
+    """XPath to an element by tag, id and class, without positions that vary between pages"""
+    steps = []
+    while element is not None:
+        step = element.tag
+        element_id = element.get('id', '')
+        classes = CLASS_SPACE.sub(' ', element.get('class', '')).strip()
+        if element_id and '"' not in element_id:
+            step += f'[@id="{element_id}"]'
+        elif classes and '"' not in classes:
+            step += f'[normalize-space(@class)="{classes}"]'
+        steps.append(step)
+        element = element.getparent()
+    return '/' + '/'.join(reversed(steps))
+
+
+def find_region(root):
+    """Deepest element holding COVERAGE of the page's prose, or None if there's too little"""
+    from lxml import etree
+
+    prose = {}
+    # Per open element: [text, link text, run text, run link text, prose, skipped, in link]
+    stack = []
+    for event, element in etree.iterwalk(root, events=('start', 'end')):
+        tag = element.tag if isinstance(element.tag, str) else None
+        if event == 'start':
+            parent = stack[-1] if stack else None
+            skipped = (parent is not None and parent[5]) or is_boilerplate(element)
+            in_link = tag == 'a' or (parent is not None and parent[6])
+            frame = [0, 0, 0, 0, 0, skipped, in_link]
+            if not skipped and element.text:
+                add_text(frame, len(element.text.strip()))
+            stack.append(frame)
+            continue
+
+        text, links, run_text, run_links, mass, skipped, in_link = stack.pop()
+        if not skipped:
+            if tag in INLINE_TAGS:
+                block = None
+            elif tag in BLOCK_TAGS and not mass:
+                block = (text, links)
+            else:
+                block = (run_text, run_links)
+            if block and block[0] > MIN_BLOCK_LENGTH and block[1] / block[0] < MAX_LINK_DENSITY:
+                mass += block[0] - block[1]
+            if mass:
+                prose[element] = mass
+
+        if stack:
+            parent = stack[-1]
+            if not skipped:
+                parent[0] += text
+                parent[1] += links
+                parent[4] += mass
+                if tag in INLINE_TAGS:
+                    parent[2] += text
+                    parent[3] += links
+            if element.tail and not parent[5]:
+                add_text(parent, len(element.tail.strip()))
+
+    total = prose.get(root, 0)
+    if total < MIN_CONTENT_LENGTH:
+        return None
+
+    region = root
+    while region.tag not in CONTENT_TAGS:
+        child = max((child for child in region if child in prose), key=prose.get, default=None)
+        if child is None or prose[child] < COVERAGE * total:
+            break
+        region = child
+    return region
+
+
+def add_text(frame, length):
+    """Count text that sits directly in a frame's element"""
+    frame[0] += length
+    frame[2] += length
+    if frame[6]:
+        frame[1] += length
+        frame[3] += length
@@ -0,0 +1,490 @@
+# Distributed crawling: several worker processes, on one box or on machines
+# sharing a filesystem, crawl from one broker.
+#
+# The broker is a single SQLite file (BROKER_PATH) holding:
+#
+#     requests  the shared request queue. (spider, fingerprint) is unique,
+#               so a URL is queued once across all nodes (central dedup).
+#               A node leases a request and marks it done once the items
+#               and links of its response are in the broker
+#               (request_finished); the lease expires after
+#               BROKER_LEASE_TIMEOUT so a crashed node's work is picked up
+#               by the others
+#     domains   next_allowed time of each domain. Leasing a request books
+#               the domain's next slot and moves next_allowed on by
+#               BROKER_DOMAIN_DELAY, so politeness holds across all nodes.
+#               A 429/503 seen by any node pushes it back by
+#               BROKER_BACKOFF_DELAY
+#     items     the item sink: workers store scraped items here and
+#               drain_items() runs them through the project pipelines once,
+#               centrally (validation, dedup, database, exports). A node
+#               keeps the items of a leased request until the lease is
+#               finished, then writes them and the finish in one transaction
+#
+# Each worker runs the spider with DistributedScheduler in place of the
+# local frontier, which also feeds the item sink, and no item pipelines:
+#
+#     python run_worker.py almanac --node worker-1     (as many as you like)
+#     python run_worker.py almanac --drain             (store the items)
+#
+# A lease can book a domain slot up to BROKER_MAX_WAIT seconds ahead; the
+# request then waits in BrokerPacingMiddleware (middlewares.py) until its
+# slot. Workers stop when no request of their spider is queued or leased
+# anywhere.
+
+import gc
+import json
+import logging
+import os
+import pickle
+import socket
+import sqlite3
+import time
+from urllib.parse import urlsplit
+
+from scrapy import signals
+
+from crop_scraper.frontier import DONE, IN_FLIGHT, PENDING, InFlight
+from crop_scraper.signals import request_finished
+
+
+class Broker:
+    """Shared request queue, domain politeness and item sink in one SQLite file"""
+
+    def __init__(self, path='broker/broker.db', domain_delay=2.0, backoff_delay=30.0,
+                 lease_timeout=300.0, max_wait=5.0):
+        self.path = path
+        self.domain_delay = domain_delay
+        self.backoff_delay = backoff_delay
+        self.lease_timeout = lease_timeout
+        self.max_wait = max_wait
+        self.connection = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            path=settings.get('BROKER_PATH', 'broker/broker.db'),
+            domain_delay=settings.getfloat('BROKER_DOMAIN_DELAY', 2.0),
+            backoff_delay=settings.getfloat('BROKER_BACKOFF_DELAY', 30.0),
+            lease_timeout=settings.getfloat('BROKER_LEASE_TIMEOUT', 300.0),
+            max_wait=settings.getfloat('BROKER_MAX_WAIT', 5.0),
+        )
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit; multi-statement changes use explicit BEGIN IMMEDIATE
+        self.connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+        self.connection.executescript('''
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                spider TEXT NOT NULL,
+                fingerprint BLOB,
+                url TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                state INTEGER NOT NULL,
+                node TEXT,
+                leased_until REAL,
+                request BLOB,
+                UNIQUE (spider, fingerprint)
+            );
+            CREATE INDEX IF NOT EXISTS idx_requests_pending
+                ON requests (spider, priority DESC, id) WHERE state = 0;
+            CREATE INDEX IF NOT EXISTS idx_requests_leased
+                ON requests (leased_until) WHERE state = 1;
+            CREATE TABLE IF NOT EXISTS domains (
+                domain TEXT PRIMARY KEY,
+                next_allowed REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                spider TEXT NOT NULL,
+                node TEXT,
+                item_class TEXT NOT NULL,
+                data TEXT NOT NULL,
+                scraped_at TEXT NOT NULL,
+                drained INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_items_undrained ON items (spider, id) WHERE drained = 0;
+        ''')
+        return self
+
+    def close(self):
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def push(self, spider, fingerprint, url, priority, data):
+        """Queue a request; False if the spider already has it (queued, leased or done)"""
+        cursor = self.connection.execute(
+            '''INSERT OR IGNORE INTO requests (spider, fingerprint, url, domain, priority, state, request)
+               VALUES (?, ?, ?, ?, ?, ?, ?)''',
+            (spider, fingerprint, url, domain_of(url), priority, PENDING, data)
+        )
+        return bool(cursor.rowcount)
+
+    def lease(self, spider, node):
+        """(id, pickled request, seconds to wait) of the best request whose domain has a free slot, or None"""
+        now = time.time()
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self.connection.execute(
+                'UPDATE requests SET state = ?, node = NULL WHERE state = ? AND leased_until < ?',
+                (PENDING, IN_FLIGHT, now)
+            )
+            # A domain that is free now, else the one free soonest
+            row = self.connection.execute(
+                '''SELECT r.id, r.domain, r.request, COALESCE(d.next_allowed, 0) FROM requests r
+                   LEFT JOIN domains d ON d.domain = r.domain
+                   WHERE r.spider = ? AND r.state = ? AND COALESCE(d.next_allowed, 0) <= ?
+                   ORDER BY r.priority DESC, r.id LIMIT 1''',
+                (spider, PENDING, now)
+            ).fetchone() or self.connection.execute(
+                '''SELECT r.id, r.domain, r.request, d.next_allowed FROM requests r
+                   JOIN domains d ON d.domain = r.domain
+                   WHERE r.spider = ? AND r.state = ? AND d.next_allowed <= ?
+                   ORDER BY d.next_allowed, r.priority DESC, r.id LIMIT 1''',
+                (spider, PENDING, now + self.max_wait)
+            ).fetchone()
+            if row is None:
+                self.connection.execute('COMMIT')
+                return None
+
+            request_id, domain, data, next_allowed = row
+            start = max(now, next_allowed)
+            self.connection.execute(
+                'INSERT OR REPLACE INTO domains (domain, next_allowed) VALUES (?, ?)',
+                (domain, start + self.domain_delay)
+            )
+            self.connection.execute(
+                'UPDATE requests SET state = ?, node = ?, leased_until = ? WHERE id = ?',
+                (IN_FLIGHT, node, start + self.lease_timeout, request_id)
+            )
+            self.connection.execute('COMMIT')
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+        return request_id, data, start - now
+
+    def done(self, request_id, spider=None, node=None, items=()):
+        """Finish a lease, storing the items scraped from its response in the same transaction"""
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self.insert_items(spider, node, items)
+            self.connection.execute(
+                'UPDATE requests SET state = ?, request = NULL, leased_until = NULL WHERE id = ?',
+                (DONE, request_id)
+            )
+            self.connection.execute('COMMIT')
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+
+    def back_off(self, domain):
+        """Push a domain's next slot back after it signalled overload"""
+        self.connection.execute(
+            '''INSERT INTO domains (domain, next_allowed) VALUES (?, ?)
+               ON CONFLICT (domain) DO UPDATE SET next_allowed = MAX(next_allowed, excluded.next_allowed)''',
+            (domain, time.time() + self.backoff_delay)
+        )
+
+    def unfinished(self, spider):
+        """Whether a spider has requests queued or leased on any node"""
+        return self.connection.execute(
+            'SELECT 1 FROM requests WHERE spider = ? AND state IN (?, ?) LIMIT 1',
+            (spider, PENDING, IN_FLIGHT)
+        ).fetchone() is not None
+
+    def reset(self, spider):
+        """Forget a spider's requests and items, to crawl it again from its start URLs"""
+        self.connection.execute('DELETE FROM requests WHERE spider = ?', (spider,))
+        self.connection.execute('DELETE FROM items WHERE spider = ? AND drained = 1', (spider,))
+
+    def add_items(self, spider, node, items):
+        """Store items in the sink in one transaction"""
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self.insert_items(spider, node, items)
+            self.connection.execute('COMMIT')
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+
+    def insert_items(self, spider, node, items):
+        from itemadapter import ItemAdapter
+
+        scraped_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.connection.executemany(
+            'INSERT INTO items (spider, node, item_class, data, scraped_at) VALUES (?, ?, ?, ?, ?)',
+            [(spider, node, f"{type(item).__module__}.{type(item).__qualname__}",
+              json.dumps(ItemAdapter(item).asdict(), ensure_ascii=False, default=str), scraped_at)
+             for item in items]
+        )
+
+    def undrained_items(self, spider, limit=500):
+        """[(id, item)] not yet run through the pipelines, oldest first"""
+        from scrapy.utils.misc import load_object
+
+        rows = self.connection.execute(
+            'SELECT id, item_class, data FROM items WHERE spider = ? AND drained = 0 ORDER BY id LIMIT ?',
+            (spider, limit)
+        ).fetchall()
+        return [(item_id, load_object(item_class)(**json.loads(data))) for item_id, item_class, data in rows]
+
+    def mark_drained(self, item_ids):
+        self.connection.executemany('UPDATE items SET drained = 1 WHERE id = ?', [(i,) for i in item_ids])
+
+    def stats(self, spider=None):
+        """Request counts by state and item counts, for reporting"""
+        scope, params = ('WHERE spider = ?', (spider,)) if spider else ('', ())
+        states = dict(self.connection.execute(
+            f'SELECT state, COUNT(*) FROM requests {scope} GROUP BY state', params
+        ).fetchall())
+        items, drained = self.connection.execute(
+            f'SELECT COUNT(*), COALESCE(SUM(drained), 0) FROM items {scope}', params
+        ).fetchone()
+        return {
+            'pending': states.get(PENDING, 0),
+            'leased': states.get(IN_FLIGHT, 0),
+            'done': states.get(DONE, 0),
+            'items': items,
+            'drained': drained,
+        }
+
+
+def domain_of(url):
+    return (urlsplit(url).hostname or '').lower()
+
+
+def node_name(settings):
+    return settings.get('NODE_NAME') or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class DistributedScheduler:
+    """Scheduler that queues requests in the Broker and leases them from it"""
+
+    # Seconds has_pending_requests() trusts its last look at the broker
+    UNFINISHED_CHECK_INTERVAL = 1.0
+
+    def __init__(self, crawler, broker, node):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.fingerprinter = crawler.request_fingerprinter
+        self.broker = broker
+        self.node = node
+        self.spider = None
+        self.in_flight = InFlight('broker_id')
+        # Items scraped from each leased request's response, until its lease is finished
+        self.items = {}
+        self.unfinished = True
+        self.unfinished_checked = 0.0
+        self.log_unserializable = True
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler = cls(crawler, Broker.from_settings(crawler.settings), node_name(crawler.settings))
+        crawler.signals.connect(scheduler.response_received, signal=signals.response_received)
+        crawler.signals.connect(scheduler.request_done, signal=request_finished)
+        crawler.signals.connect(scheduler.request_done, signal=signals.request_dropped)
+        crawler.signals.connect(scheduler.item_scraped, signal=signals.item_scraped)
+        return scheduler
+
+    def open(self, spider):
+        self.spider = spider
+        self.broker.open()
+        logging.info(f"Node {self.node} crawling {spider.name} from broker {self.broker.path}: "
+                     f"{self.broker.stats(spider.name)}")
+
+    def close(self, reason):
+        if self.items:
+            # Their requests are leased again once the leases expire
+            logging.info(f"Node {self.node} discarding the items of {len(self.items)} unfinished leases")
+        logging.info(f"Node {self.node} done with {self.spider.name} ({reason}): "
+                     f"{self.broker.stats(self.spider.name)}")
+        self.broker.close()
+
+    def has_pending_requests(self):
+        # Only asked once the downloader and scraper are idle, so requests
+        # still in flight are ones Scrapy let go of; collect any a reference
+        # cycle keeps alive, or their leases would keep the node running
+        if self.in_flight:
+            gc.collect()
+            self.collect_released()
+        if self.in_flight:
+            return True
+        now = time.monotonic()
+        if now - self.unfinished_checked >= self.UNFINISHED_CHECK_INTERVAL:
+            self.unfinished = self.broker.unfinished(self.spider.name)
+            self.unfinished_checked = now
+        return self.unfinished
+
+    def __len__(self):
+        stats = self.broker.stats(self.spider.name)
+        return stats['pending'] + stats['leased']
+
+    def enqueue_request(self, request):
+        # Start requests are dont_filter, but every node yields them: queue them once
+        dedup = not request.dont_filter or request.meta.get('is_start_request')
+        fingerprint = self.fingerprinter.fingerprint(request) if dedup else None
+        try:
+            data = pickle.dumps(request.to_dict(spider=self.spider), protocol=4)
+        except (ValueError, TypeError, AttributeError, pickle.PicklingError) as e:
+            if self.log_unserializable:
+                logging.warning(f"Unable to serialize request: {request} - reason: {e} - dropping it; "
+                                f"no more unserializable requests will be logged (stats being collected)")
+                self.log_unserializable = False
+            self.stats.inc_value('scheduler/unserializable')
+            return False
+
+        if not self.broker.push(self.spider.name, fingerprint, request.url, request.priority, data):
+            self.stats.inc_value('dupefilter/filtered')
+            return False
+        self.unfinished = True
+        self.stats.inc_value('scheduler/enqueued/broker')
+        self.stats.inc_value('scheduler/enqueued')
+        return True
+
+    def next_request(self):
+        from scrapy.utils.request import request_from_dict
+
+        self.collect_released()
+        leased = self.broker.lease(self.spider.name, self.node)
+        if leased is None:
+            return None
+        request_id, data, wait = leased
+        request = request_from_dict(pickle.loads(data), spider=self.spider)
+        if wait > 0:
+            request.meta['broker_not_before'] = time.time() + wait
+        self.in_flight.add(request, request_id)
+        self.stats.inc_value('scheduler/dequeued/broker')
+        self.stats.inc_value('scheduler/dequeued')
+        return request
+
+    def response_received(self, response, request, spider):
+        if response.status in (429, 503):
+            self.broker.back_off(domain_of(request.url))
+            self.stats.inc_value('broker/back_off')
+
+    def request_done(self, request, **kwargs):
+        """Finish the lease of a request whose callback output is in the broker (or that was dropped)"""
+        request_id = request.meta.get('broker_id')
+        if request_id in self.in_flight and self.broker.connection is not None:
+            self.finish(request_id)
+
+    def collect_released(self):
+        for request_id in self.in_flight.collect():
+            self.finish(request_id)
+
+    def finish(self, request_id):
+        self.in_flight.discard(request_id)
+        items = self.items.pop(request_id, [])
+        self.broker.done(request_id, self.spider.name, self.node, items)
+        self.stats.inc_value('broker/items', len(items))
+
+    def item_scraped(self, item, response, spider):
+        """Keep an item until the lease of the request it was scraped from is finished"""
+        request = getattr(response, 'request', None)
+        request_id = request.meta.get('broker_id') if request is not None else None
+        if request_id in self.in_flight:
+            self.items.setdefault(request_id, []).append(item)
+        else:
+            self.broker.add_items(spider.name, self.node, [item])
+            self.stats.inc_value('broker/items')
+
+
+def worker_settings(settings, broker_path=None, node=None):
+    """A copy of the project settings for a worker node.
+
+    Requests go through the broker (which paces domains for all nodes, so the
+    local delays and adaptive throttle are off) and items to its sink, which
+    the scheduler feeds instead of item pipelines. The
+    response archive and validator store get per-node files, since SQLite
+    files are poor at concurrent writers.
+    """
+    settings = settings.copy()
+    node = node or node_name(settings)
+    overrides = {
+        'NODE_NAME': node,
+        'SCHEDULER': 'crop_scraper.distributed.DistributedScheduler',
+        'ITEM_PIPELINES': {},
+        'DOWNLOAD_DELAY': 0,
+        'ADAPTIVE_CONCURRENCY_ENABLED': False,
+        'AUTOTHROTTLE_ENABLED': False,
+        'RESPONSE_ARCHIVE_PATH': os.path.join(os.path.dirname(settings.get('RESPONSE_ARCHIVE_PATH')),
+                                              node, 'responses.db'),
+        'VALIDATOR_STORE_PATH': os.path.join(os.path.dirname(settings.get('VALIDATOR_STORE_PATH')),
+                                             node, 'validators.db'),
+    }
+    if broker_path:
+        overrides['BROKER_PATH'] = broker_path
+    for name, value in overrides.items():
+        settings.set(name, value, priority='cmdline')
+    return settings
+
+
+def drain_items(settings, spider_name, batch_size=500):
+    """Run a spider's undrained sink items through the project's item pipelines; returns counts"""
+    from scrapy.crawler import Crawler
+
+    from crop_scraper.replay import build_pipelines, load_spider_class, run_pipelines
+
+    spidercls = load_spider_class(settings, spider_name)
+    settings = settings.copy()
+    settings.set('DATABASE_WRITER_QUEUE_SIZE', 0)
+    crawler = Crawler(spidercls, settings)
+    spider = spidercls.from_crawler(crawler)
+    pipelines = build_pipelines(crawler)
+
+    counts = {'items': 0, 'stored': 0, 'dropped': 0}
+    with Broker.from_settings(settings) as broker:
+        for pipeline in pipelines:
+            if hasattr(pipeline, 'open_spider'):
+                pipeline.open_spider(spider)
+        try:
+            while True:
+                batch = broker.undrained_items(spider_name, batch_size)
+                if not batch:
+                    break
+                for item_id, item in batch:
+                    counts['items'] += 1
+                    if run_pipelines(pipelines, item, spider):
+                        counts['stored'] += 1
+                    else:
+                        counts['dropped'] += 1
+                broker.mark_drained([item_id for item_id, item in batch])
+        finally:
+            for pipeline in reversed(pipelines):
+                if hasattr(pipeline, 'close_spider'):
+                    pipeline.close_spider(spider)
+    return counts
+
+
+def run_worker(settings, spider_name, broker_path=None, node=None):
+    """Crawl a spider as one worker node until the broker has nothing left for it; returns its counts"""
+    from scrapy.crawler import CrawlerProcess
+
+    settings = worker_settings(settings, broker_path, node)
+    process = CrawlerProcess(settings)
+    crawler = process.create_crawler(spider_name)
+    process.crawl(crawler)
+    process.start()
+
+    stats = crawler.stats.get_stats()
+    return {
+        'node': settings.get('NODE_NAME'),
+        'pages': stats.get('response_received_count', 0),
+        'items': stats.get('item_scraped_count', 0),
+        'duplicates': stats.get('dupefilter/filtered', 0),
+        'seconds': round(stats.get('elapsed_time_seconds', 0), 1),
+        'finish_reason': stats.get('finish_reason'),
+    }
@@ -0,0 +1,170 @@
+# Text model of a response, built once and shared by every extractor that
+# looks at the same page.
+#
+# Extractors used to call response.css('*::text').getall() (a full walk of
+# the DOM) and join the result themselves, once per field. page_document()
+# walks the page once per selector and caches the text, its lowercased form,
+# the individual text nodes and the sentence boundaries on the response.
+# SentenceIndex answers "which sentences with numbers mention this keyword"
+# from one split of the text. With main=True only the page's main content
+# region (see content.py) is read, leaving out navigation and footers.
+
+import re
+from functools import cached_property
+from weakref import WeakKeyDictionary
+
+from crop_scraper.content import main_content_nodes
+
+
+ALL_TEXT = '*::text'
+
+SENTENCE_END = re.compile(r'[.!?]')
+
+# Documents keyed by response; entries go away with the response
+documents = WeakKeyDictionary()
+
+
+def page_document(response, selector=ALL_TEXT, main=False):
+    """The cached PageDocument for a response's text nodes matching a CSS selector.
+
+    With main=True the selector is applied to the main content region only,
+    or to the whole page when no region stands out.
+    """
+    by_selector = documents.get(response)
+    if by_selector is None:
+        by_selector = documents[response] = {}
+    document = by_selector.get((selector, main))
+    if document is None:
+        nodes = main_content_nodes(response, None if selector == ALL_TEXT else selector) if main else None
+        if nodes is None:
+            nodes = response.css(selector).getall()
+        document = by_selector[(selector, main)] = PageDocument(nodes)
+    return document
+
+
+def content_document(response, selectors, main=False):
+    """page_document() of the first selector that matches any text, else of the whole page"""
+    for selector in selectors:
+        document = page_document(response, selector, main)
+        if document.nodes:
+            return document
+    return page_document(response, main=main)
+
+
+class PageDocument:
+    """Text nodes of a page plus views derived from them on first use"""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.scans = {}
+
+    @cached_property
+    def text(self):
+        """All text nodes joined with single spaces"""
+        return ' '.join(self.nodes)
+
+    @cached_property
+    def lower(self):
+        return self.text.lower()
+
+    @cached_property
+    def passages(self):
+        """(cleaned, lowercased) pairs for text nodes longer than 10 characters.
+
+        Whitespace inside a passage is collapsed, so each one reads as a
+        single line of prose.
+        """
+        passages = []
+        for node in self.nodes:
+            node = node.strip()
+            if len(node) > 10:
+                passages.append((' '.join(node.split()), node.lower()))
+        return passages
+
+    @cached_property
+    def sentence_bounds(self):
+        """(start, end) offsets of the sentences in text, split at . ! and ?"""
+        bounds, start = [], 0
+        for match in SENTENCE_END.finditer(self.text):
+            bounds.append((start, match.start()))
+            start = match.end()
+        bounds.append((start, len(self.text)))
+        return bounds
+
+    @cached_property
+    def sentences(self):
+        """Same as re.split(r'[.!?]', text)"""
+        return [self.text[start:end] for start, end in self.sentence_bounds]
+
+    @cached_property
+    def sentence_index(self):
+        return SentenceIndex(self.sentences)
+
+    def matches(self, extractor):
+        """extractor.first_matches() over text, computed once per extractor"""
+        found = self.scans.get(extractor)
+        if found is None:
+            found = self.scans[extractor] = extractor.first_matches(self.text, self.lower)
+        return found
+
+    def snippets(self, classifier):
+        """classifier.classify() of the text nodes, computed once per classifier"""
+        found = self.scans.get(classifier)
+        if found is None:
+            found = self.scans[classifier] = classifier.classify(self.nodes)
+        return found
+
+    def findall(self, extractor, field):
+        """extractor.findall() of one field over text"""
+        return extractor.findall(field, self.text, self.lower)
+
+    def containing(self, keywords, limit=5, max_length=500):
+        """Passages mentioning any keyword (case-insensitive), in page order"""
+        keywords = [keyword.lower() for keyword in keywords]
+        results = []
+        for cleaned, lowered in self.passages:
+            if any(keyword in lowered for keyword in keywords):
+                if cleaned not in results and len(cleaned) < max_length:
+                    results.append(cleaned)
+                    if len(results) == limit:
+                        break
+        return results
+
+
+class SentenceIndex:
+    """Sentences that mention a number, looked up by keyword.
+
+    Sentences are stripped and kept when they are between min_length and
+    max_length characters long and contain a digit. Lookups are
+    case-insensitive substring matches and are memoized per keyword.
+    """
+
+    def __init__(self, sentences, min_length=20, max_length=300):
+        # (stripped, lowercased) per numeric sentence, in text order
+        self.numeric = []
+        for sentence in sentences:
+            stripped = sentence.strip()
+            if min_length < len(stripped) < max_length and any(char.isdigit() for char in stripped):
+                self.numeric.append((stripped, sentence.lower()))
+        self.by_keyword = {}
+
+    @classmethod
+    def from_text(cls, text, **kwargs):
+        return cls(SENTENCE_END.split(text), **kwargs)
+
+    def __len__(self):
+        return len(self.numeric)
+
+    def containing(self, keyword):
+        """Numeric sentences mentioning a keyword"""
+        keyword = keyword.lower()
+        found = self.by_keyword.get(keyword)
+        if found is None:
+            found = self.by_keyword[keyword] = [
+                stripped for stripped, lowered in self.numeric if keyword in lowered
+            ]
+        return found
+
+    def find(self, keywords):
+        """Numeric sentences for each keyword in turn (a sentence repeats if several keywords match it)"""
+        return [sentence for keyword in keywords for sentence in self.containing(keyword)]
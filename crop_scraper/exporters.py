@@ -0,0 +1,179 @@
+# Columnar (Parquet) export of the crops, nutrient_recipes and recipes tables.
+#
+# Files are laid out as hive-style partitions so readers can prune by source
+# and crawl date and load only the columns they need:
+#
+#     exports/parquet/crops/data_source=almanac.com/crawl_date=2025-05-26/part-....parquet
+#
+# pyarrow is an optional dependency; it is imported only when an export runs.
+
+import logging
+import os
+import shutil
+import uuid
+from collections import defaultdict
+from datetime import date, datetime
+from urllib.parse import quote, urlparse
+
+from crop_scraper.normalizers import as_text
+from crop_scraper.pipelines import (
+    CROP_COLUMNS, NUMERIC_CROP_COLUMNS, NUMERIC_RECIPE_COLUMNS, PPM_RECIPE_COLUMNS,
+    RECIPE_COLUMNS, TRACKING_COLUMNS,
+)
+from crop_scraper.storage import open_storage
+
+
+EXPORT_COLUMNS = {
+    'crops': CROP_COLUMNS + TRACKING_COLUMNS,
+    'nutrient_recipes': RECIPE_COLUMNS + TRACKING_COLUMNS,
+    'recipes': PPM_RECIPE_COLUMNS + TRACKING_COLUMNS,
+}
+
+# Columns stored as float64; everything else is a string
+FLOAT_COLUMNS = set(NUMERIC_CROP_COLUMNS) | set(NUMERIC_RECIPE_COLUMNS)
+
+PARTITION_COLUMNS = ('data_source', 'crawl_date')
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("Parquet export needs pyarrow. Install with: pip install pyarrow")
+    return pyarrow
+
+
+def table_schema(table):
+    """Arrow schema for a table, fixed so every part file has the same types"""
+    pa = require_pyarrow()
+    fields = []
+    for column in EXPORT_COLUMNS[table]:
+        if column == 'data_source':
+            continue  # Stored in the partition path
+        fields.append(pa.field(column, pa.float64() if column in FLOAT_COLUMNS else pa.string()))
+    return pa.schema(fields)
+
+
+def partition_values(table, row):
+    """Return the (data_source, crawl_date) partition for a row"""
+    source = row.get('data_source')
+    if not source and row.get('source_url'):
+        source = urlparse(row['source_url']).netloc
+    crawl_date = str(row.get('scraped_date') or '')[:10] or date.today().isoformat()
+    return source or 'unknown', crawl_date
+
+
+def coerce_value(column, value):
+    if value is None or value == '':
+        return None
+    if column in FLOAT_COLUMNS:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    return as_text(value)
+
+
+def write_partitioned(rows, root, table):
+    """Write rows as one new part file per (data_source, crawl_date) partition.
+
+    Returns the list of files written. Existing parts are never modified, so
+    this can be called repeatedly during a crawl.
+    """
+    pa = require_pyarrow()
+    import pyarrow.parquet as pq
+
+    schema = table_schema(table)
+    partitions = defaultdict(list)
+    for row in rows:
+        partitions[partition_values(table, row)].append(row)
+
+    written = []
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    for (source, crawl_date), partition_rows in partitions.items():
+        directory = os.path.join(
+            root, table,
+            f"data_source={quote(source, safe='')}",
+            f"crawl_date={crawl_date}",
+        )
+        os.makedirs(directory, exist_ok=True)
+
+        columns = {
+            field.name: [coerce_value(field.name, row.get(field.name)) for row in partition_rows]
+            for field in schema
+        }
+        path = os.path.join(directory, f"part-{stamp}-{uuid.uuid4().hex[:8]}.parquet")
+        pq.write_table(pa.table(columns, schema=schema), path, compression='zstd')
+        written.append(path)
+
+    return written
+
+
+def export_database(database_url=None, root='exports/parquet', chunk_size=5000):
+    """Rewrite the full Parquet export from the DATABASE_URL database.
+
+    The read happens in chunks so memory stays bounded on large tables. Any
+    previous export (including incremental parts from ParquetExportPipeline)
+    is replaced, which also compacts away older versions of updated rows.
+    """
+    require_pyarrow()
+    storage = open_storage(database_url, pool_size=1)
+    counts = {}
+
+    try:
+        for table, columns in EXPORT_COLUMNS.items():
+            with storage.transaction() as cursor:
+                existing = set(storage.column_names(cursor, table))
+            if not existing:
+                continue
+            selected = [column for column in columns if column in existing]
+
+            target = os.path.join(root, table)
+            if os.path.isdir(target):
+                shutil.rmtree(target)
+
+            counts[table] = 0
+            with storage.connection() as conn:
+                # A named (server-side) cursor streams PostgreSQL rows instead of loading them all
+                cursor = conn.cursor(f"export_{table}") if storage.dialect == 'postgresql' else conn.cursor()
+                try:
+                    cursor.execute(f"SELECT {', '.join(selected)} FROM {table}")
+                    while True:
+                        rows = [dict(zip(selected, row)) for row in cursor.fetchmany(chunk_size)]
+                        if not rows:
+                            break
+                        write_partitioned(rows, root, table)
+                        counts[table] += len(rows)
+                finally:
+                    cursor.close()
+                    conn.rollback()
+            logging.info(f"Exported {counts[table]} {table} rows to {target}")
+    finally:
+        storage.close()
+
+    return counts
+
+
+def read_crops(root='exports/parquet', columns=None):
+    """Load crops from the Parquet export as a DataFrame.
+
+    Only the requested columns are read (memory-mapped). When rows were
+    exported by several crawls, the most recent version of each crop wins.
+    """
+    import pandas as pd
+
+    key = ['name', 'source_url']
+    wanted = None
+    if columns is not None:
+        wanted = list(dict.fromkeys(list(columns) + key + ['crawl_date']))
+
+    df = pd.read_parquet(os.path.join(root, 'crops'), columns=wanted, memory_map=True)
+    for column in PARTITION_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype(str)
+
+    df = df.sort_values('crawl_date', kind='stable').drop_duplicates(key, keep='last')
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
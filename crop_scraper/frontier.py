@@ -0,0 +1,351 @@
+# Persistent crawl frontier: a Scrapy scheduler that keeps the request queue
+# and the seen-set in one SQLite file per spider, so an interrupted crawl
+# (crash, kill, Ctrl-C) resumes where it stopped instead of starting over.
+#
+# Every request a spider yields becomes a row in FRONTIER_DIR/<spider>.db:
+#
+#     fingerprint  canonical request fingerprint, unique, so a URL already
+#                  queued or fetched (in this run or an interrupted one) is
+#                  filtered on insert
+#     request      the pickled request, dropped once it has been downloaded
+#     state        pending, in flight or done
+#
+# Requests are popped highest priority first, newest first within a priority
+# (like Scrapy's default LIFO queues). Nothing but the in-flight requests is
+# held in memory, so memory stays flat however large the crawl grows. Writes
+# are committed every FRONTIER_COMMIT_EVERY changes; on the next run,
+# requests that were in flight when the process died are queued again.
+# A request is done once its callback output has been handled
+# (request_finished), or once Scrapy lets go of it without calling back
+# (ignored, failed, filtered, or replaced by a redirect or retry).
+# A crawl that finishes with nothing left to fetch deletes its file, so the
+# next run starts fresh.
+#
+# Fingerprints are computed from canonical URLs (canonicalize_url), so
+# http/https, trailing-slash, query-order, tracking-parameter and fragment
+# variants of a page are fetched once. A redirect from one variant to
+# another (/plant/delta -> /plant/delta/, http -> https) is fingerprinted on
+# its exact URL, or it would be filtered as a duplicate of itself.
+
+import logging
+import os
+import pickle
+import sqlite3
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from weakref import WeakKeyDictionary, finalize
+
+from scrapy import signals
+
+from crop_scraper.signals import request_finished
+
+
+PENDING, IN_FLIGHT, DONE = 0, 1, 2
+
+# Query parameters that don't change the page
+TRACKING_PARAMS = frozenset([
+    'gclid', 'dclid', 'fbclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'ref', 'ref_src', 'source', 'spm',
+    'sessionid', 'sid', 'phpsessid', 'jsessionid',
+])
+TRACKING_PREFIXES = ('utm_',)
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url):
+    """The URL with scheme, host, port, path and query in one canonical form.
+
+    http becomes https, the host is lowercased and its default port dropped,
+    trailing slashes and the fragment are removed, tracking parameters are
+    dropped and the rest sorted. Only used for fingerprints; requests keep
+    the URL they were made with.
+    """
+    from w3lib.url import canonicalize_url as w3lib_canonicalize_url
+
+    parts = urlsplit(w3lib_canonicalize_url(url))
+    scheme = parts.scheme.lower()
+    if scheme == 'http':
+        scheme = 'https'
+
+    host = (parts.hostname or '').rstrip('.')
+    if parts.port and parts.port != DEFAULT_PORTS.get(parts.scheme.lower()):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip('/') or '/'
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(key)
+    ))
+    return urlunsplit((scheme, host, path, query, ''))
+
+
+def is_tracking_param(key):
+    key = key.lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
+
+
+def redirected_variant(request):
+    """Whether a request was redirected to a variant of a URL it was redirected from"""
+    redirect_urls = request.meta.get('redirect_urls')
+    if not redirect_urls:
+        return False
+    url = canonicalize_url(request.url)
+    return any(canonicalize_url(redirect_url) == url for redirect_url in redirect_urls)
+
+
+class CanonicalRequestFingerprinter:
+    """Scrapy's request fingerprint, computed on the canonical URL (see canonicalize_url).
+
+    Requests with meta['verbatim_url'], and redirects between variants of one
+    URL, are fingerprinted on their exact URL.
+    """
+
+    def __init__(self, crawler=None):
+        self.cache = WeakKeyDictionary()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler)
+
+    def fingerprint(self, request):
+        from scrapy.utils.request import fingerprint
+
+        if request not in self.cache:
+            if request.meta.get('verbatim_url') or redirected_variant(request):
+                self.cache[request] = fingerprint(request)
+            else:
+                self.cache[request] = fingerprint(request.replace(url=canonicalize_url(request.url)))
+        return self.cache[request]
+
+
+class InFlight:
+    """Ids of the requests a scheduler handed out that are not finished yet.
+
+    A request is finished when request_finished is sent for it, or when
+    Scrapy drops the request object without getting that far. Dropped ids
+    are collected by a finalizer, which may run on any thread, so they are
+    only queued in released; the scheduler takes them with collect().
+    """
+
+    def __init__(self, meta_key):
+        self.meta_key = meta_key
+        self.ids = set()
+        self.released = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(list(self.ids))
+
+    def __contains__(self, request_id):
+        return request_id in self.ids
+
+    def add(self, request, request_id):
+        request.meta[self.meta_key] = request_id
+        self.ids.add(request_id)
+        finalize(request, self.released.append, request_id)
+
+    def discard(self, request_id):
+        self.ids.discard(request_id)
+
+    def collect(self):
+        """The ids whose requests were dropped since the last call and are still in flight"""
+        released, self.released[:] = self.released[:], []
+        return [request_id for request_id in released if request_id in self.ids]
+
+
+class FrontierScheduler:
+    """Scheduler whose queue and seen-set live in a per-spider SQLite file (FRONTIER_DIR)"""
+
+    def __init__(self, crawler, directory='frontier', commit_every=100, reset_on_finish=True,
+                 debug=False):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.fingerprinter = crawler.request_fingerprinter
+        self.directory = directory
+        self.commit_every = max(1, commit_every)
+        self.reset_on_finish = reset_on_finish
+        self.debug = debug
+        self.path = None
+        self.connection = None
+        self.spider = None
+        self.pending = 0
+        self.in_flight = InFlight('frontier_id')
+        self.uncommitted = 0
+        # Requests that can't be pickled (e.g. non-spider callbacks) are queued in memory
+        self.memory = []
+        self.log_unserializable = True
+        self.log_duplicates = True
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        scheduler = cls(
+            crawler,
+            directory=settings.get('FRONTIER_DIR', 'frontier'),
+            commit_every=settings.getint('FRONTIER_COMMIT_EVERY', 100),
+            reset_on_finish=settings.getbool('FRONTIER_RESET_ON_FINISH', True),
+            debug=settings.getbool('DUPEFILTER_DEBUG'),
+        )
+        crawler.signals.connect(scheduler.request_done, signal=request_finished)
+        crawler.signals.connect(scheduler.request_done, signal=signals.request_dropped)
+        return scheduler
+
+    def open(self, spider):
+        self.spider = spider
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{spider.name}.db")
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript('''
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fingerprint BLOB UNIQUE,
+                url TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                state INTEGER NOT NULL,
+                request BLOB
+            );
+            CREATE INDEX IF NOT EXISTS idx_requests_pending
+                ON requests (priority DESC, id DESC) WHERE state = 0;
+        ''')
+
+        resumed = self.connection.execute(
+            'UPDATE requests SET state = ? WHERE state = ?', (PENDING, IN_FLIGHT)
+        ).rowcount
+        self.connection.commit()
+        self.pending = self.connection.execute(
+            'SELECT COUNT(*) FROM requests WHERE state = ?', (PENDING,)
+        ).fetchone()[0]
+        if self.pending:
+            seen = self.connection.execute('SELECT COUNT(*) FROM requests').fetchone()[0]
+            logging.info(
+                f"Resuming crawl frontier {self.path}: {self.pending} requests pending "
+                f"({resumed} were in flight), {seen} seen"
+            )
+            self.stats.set_value('frontier/resumed', self.pending)
+        else:
+            logging.info(f"Crawl frontier: {self.path}")
+
+    def close(self, reason):
+        if self.connection is None:
+            return
+        # A finished crawl is idle: whatever is still in flight was dropped along the way
+        if reason == 'finished':
+            for frontier_id in self.in_flight:
+                self.mark_done(frontier_id)
+        self.collect_released()
+        finished = reason == 'finished' and not self.pending and not self.in_flight and not self.memory
+        self.connection.commit()
+        self.connection.close()
+        self.connection = None
+        if finished and self.reset_on_finish:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(self.path + suffix):
+                    os.remove(self.path + suffix)
+        elif self.pending:
+            logging.info(f"Crawl frontier {self.path} saved with {self.pending} requests pending")
+
+    def has_pending_requests(self):
+        return len(self) > 0
+
+    def __len__(self):
+        return self.pending + len(self.memory)
+
+    def enqueue_request(self, request):
+        fingerprint = None if request.dont_filter else self.fingerprinter.fingerprint(request)
+        try:
+            data = pickle.dumps(request.to_dict(spider=self.spider), protocol=4)
+        except (ValueError, TypeError, AttributeError, pickle.PicklingError) as e:
+            data = None
+            if self.log_unserializable:
+                logging.warning(
+                    f"Unable to serialize request: {request} - reason: {e} - keeping it in "
+                    f"memory; no more unserializable requests will be logged (stats being collected)"
+                )
+                self.log_unserializable = False
+            self.stats.inc_value('scheduler/unserializable')
+
+        cursor = self.connection.execute(
+            'INSERT OR IGNORE INTO requests (fingerprint, url, priority, state, request) VALUES (?, ?, ?, ?, ?)',
+            (fingerprint, request.url, request.priority, PENDING if data else DONE, data)
+        )
+        if not cursor.rowcount:
+            self.log_duplicate(request)
+            return False
+        self.changed()
+
+        if data:
+            self.pending += 1
+            self.stats.inc_value('scheduler/enqueued/disk')
+        else:
+            self.memory.append(request)
+            self.stats.inc_value('scheduler/enqueued/memory')
+        self.stats.inc_value('scheduler/enqueued')
+        return True
+
+    def next_request(self):
+        self.collect_released()
+        if self.memory:
+            self.stats.inc_value('scheduler/dequeued/memory')
+            self.stats.inc_value('scheduler/dequeued')
+            return self.memory.pop()
+        if not self.pending:
+            return None
+
+        from scrapy.utils.request import request_from_dict
+
+        row = self.connection.execute(
+            'SELECT id, request FROM requests WHERE state = ? ORDER BY priority DESC, id DESC LIMIT 1',
+            (PENDING,)
+        ).fetchone()
+        if row is None:
+            self.pending = 0
+            return None
+        frontier_id, data = row
+        self.connection.execute('UPDATE requests SET state = ? WHERE id = ?', (IN_FLIGHT, frontier_id))
+        self.pending -= 1
+        self.changed()
+
+        request = request_from_dict(pickle.loads(data), spider=self.spider)
+        self.in_flight.add(request, frontier_id)
+        self.stats.inc_value('scheduler/dequeued/disk')
+        self.stats.inc_value('scheduler/dequeued')
+        return request
+
+    def request_done(self, request, **kwargs):
+        """Mark a finished request done and drop its stored copy"""
+        frontier_id = request.meta.get('frontier_id')
+        if frontier_id in self.in_flight and self.connection is not None:
+            self.mark_done(frontier_id)
+
+    def collect_released(self):
+        for frontier_id in self.in_flight.collect():
+            self.mark_done(frontier_id)
+
+    def mark_done(self, frontier_id):
+        self.in_flight.discard(frontier_id)
+        self.connection.execute(
+            'UPDATE requests SET state = ?, request = NULL WHERE id = ?', (DONE, frontier_id)
+        )
+        self.changed()
+
+    def changed(self):
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_every:
+            self.connection.commit()
+            self.uncommitted = 0
+
+    def log_duplicate(self, request):
+        if self.debug:
+            referer = request.headers.get('Referer')
+            logging.debug(f"Filtered duplicate request: {request} (referer: {referer})")
+        elif self.log_duplicates:
+            logging.debug(
+                f"Filtered duplicate request: {request} - no more duplicates will be shown "
+                f"(see DUPEFILTER_DEBUG to show all duplicates)"
+            )
+            self.log_duplicates = False
+        self.stats.inc_value('dupefilter/filtered')
@@ -154,10 +154,21 @@ class CropItem(scrapy.Item):
         output_processor=TakeFirst()
     )
     
+    # Typed values parsed from the text fields above (see NormalizationPipeline)
+    ph_min = scrapy.Field()
+    ph_max = scrapy.Field()
+    maturity_days_min = scrapy.Field()
+    maturity_days_max = scrapy.Field()
+    spacing_in = scrapy.Field()
+    npk_n = scrapy.Field()
+    npk_p = scrapy.Field()
+    npk_k = scrapy.Field()
+    
     # Metadata
     source_url = scrapy.Field()
     scraped_date = scrapy.Field()
     data_source = scrapy.Field()
+    content_hash = scrapy.Field()  # Hash of the extracted fields, for change detection
 
 
 class NutrientRecipeItem(scrapy.Item):
@@ -188,6 +199,12 @@ class NutrientRecipeItem(scrapy.Item):
     ec_range = scrapy.Field()  # Electrical conductivity
     ph_range = scrapy.Field()
     
+    # Range bounds parsed from ec_range/ph_range (see NormalizationPipeline)
+    ec_min = scrapy.Field()
+    ec_max = scrapy.Field()
+    ph_min = scrapy.Field()
+    ph_max = scrapy.Field()
+    
     # Application details
     application_method = scrapy.Field()
     frequency = scrapy.Field()
@@ -197,3 +214,5 @@ class NutrientRecipeItem(scrapy.Item):
     reference_document = scrapy.Field()
     author = scrapy.Field()
     data_source = scrapy.Field()
+    scraped_date = scrapy.Field()
+    content_hash = scrapy.Field()
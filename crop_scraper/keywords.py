@@ -0,0 +1,102 @@
+# Multi-keyword snippet classification for the keyword-based extractors.
+#
+# Those extractors keep the text nodes of a page that mention one of a
+# field's keywords and none of a list of navigation words. Checking every
+# node against every keyword separately for each field means many passes
+# per page. KeywordClassifier compiles the keywords of all fields, plus the
+# navigation words, into one trie-shaped pattern (the regex equivalent of an
+# Aho-Corasick automaton). Each node is then scanned once, and that scan
+# sorts it into every field it belongs to.
+
+import re
+from functools import reduce
+
+
+def trie_pattern(keywords):
+    """Regex alternation of keywords, factored into a trie so shared prefixes are tested once"""
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # A keyword ends here, so the rest is optional
+        return f"(?:{body})?" if '' in node else body
+
+    return build(trie) or '(?!)'
+
+
+class KeywordClassifier:
+    """Sorts text snippets into fields by the keywords they contain.
+
+    fields maps a field name to its keywords; snippets containing any of the
+    exclude words are dropped. Matching is case-insensitive and on substrings,
+    like "keyword.lower() in text.lower()".
+
+    min_length and max_length bound the stripped text node (max_length=None
+    for no bound); max_snippet_length optionally bounds the snippet once its
+    whitespace is collapsed.
+    """
+
+    def __init__(self, fields, exclude=(), min_length=10, max_length=1000, limit=5, max_snippet_length=None):
+        self.fields = {field: frozenset(k.lower() for k in keywords) for field, keywords in fields.items()}
+        self.exclude = frozenset(word.lower() for word in exclude)
+        self.min_length = min_length
+        self.max_length = max_length if max_length is not None else float('inf')
+        self.max_snippet_length = max_snippet_length
+        self.limit = limit
+
+        keywords = reduce(frozenset.union, self.fields.values(), self.exclude)
+        # A lookahead reports the longest keyword starting at every position;
+        # keywords that are prefixes of it start there as well
+        self.pattern = re.compile(f"(?=({trie_pattern(keywords)}))")
+        self.prefixes = {
+            keyword: frozenset(other for other in keywords if keyword.startswith(other))
+            for keyword in keywords
+        }
+
+    def __repr__(self):
+        return f"KeywordClassifier({len(self.fields)} fields, {len(self.prefixes)} keywords)"
+
+    def keywords_in(self, lowered):
+        """Every keyword occurring in lowercased text"""
+        found = set()
+        for match in self.pattern.finditer(lowered):
+            found.update(self.prefixes[match.group(1)])
+        return found
+
+    def classify(self, nodes):
+        """Map every field to up to limit distinct, whitespace-collapsed snippets, in page order"""
+        results = {field: [] for field in self.fields}
+        for node in nodes:
+            if not node:
+                continue
+            text = node.strip()
+            if not self.min_length < len(text) < self.max_length:
+                continue
+
+            found = self.keywords_in(text.lower())
+            fields = [field for field, keywords in self.fields.items() if not found.isdisjoint(keywords)]
+            if not fields:
+                continue
+
+            cleaned = ' '.join(text.split())
+            if self.max_snippet_length is not None and len(cleaned) >= self.max_snippet_length:
+                continue
+            if cleaned != text:
+                # Exclude words may span whitespace that was collapsed
+                found = self.keywords_in(cleaned.lower())
+            if not found.isdisjoint(self.exclude):
+                continue
+
+            for field in fields:
+                snippets = results[field]
+                if len(snippets) < self.limit and cleaned not in snippets:
+                    snippets.append(cleaned)
+        return results
@@ -6,8 +6,17 @@
 from scrapy import signals
 from scrapy.downloadermiddlewares.useragent import UserAgentMiddleware
 from scrapy.downloadermiddlewares.retry import RetryMiddleware
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from crop_scraper.archive import ResponseArchive, callback_name
+from crop_scraper.shared import close_user, open_user, shared
+from crop_scraper.signals import request_finished
+from crop_scraper.throttle import AdaptiveThrottle
+from crop_scraper.validators import ValidatorStore
+import hashlib
+import logging
 import random
 import time
+from weakref import WeakSet
 
 
 class RotateUserAgentMiddleware(UserAgentMiddleware):
@@ -80,6 +89,369 @@ class ScrapyApiMiddleware:
         return request
 
 
+class ResponseArchiveMiddleware:
+    """Save every downloaded response to the ResponseArchive.
+
+    Runs after HttpCompressionMiddleware, so decoded bodies are archived.
+    Responses served from HTTPCACHE are skipped since they were archived
+    when first downloaded. Writes are committed every
+    RESPONSE_ARCHIVE_COMMIT_EVERY responses and when the spider closes.
+    """
+
+    def __init__(self, archive, commit_every=50):
+        self.archive = archive
+        self.commit_every = max(1, commit_every)
+        self.uncommitted = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('RESPONSE_ARCHIVE_ENABLED'):
+            raise NotConfigured
+        path = settings.get('RESPONSE_ARCHIVE_PATH', 'archive/responses.db')
+        middleware = cls(
+            shared(crawler, ('archive', path), lambda: ResponseArchive(path)),
+            commit_every=settings.getint('RESPONSE_ARCHIVE_COMMIT_EVERY', 50),
+        )
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_opened(self, spider):
+        if open_user(self.archive):
+            self.archive.open()
+        logging.info(f"Archiving responses to {self.archive.path}")
+
+    def spider_closed(self, spider):
+        if close_user(self.archive):
+            self.archive.close()
+
+    def process_response(self, request, response, spider):
+        if 'cached' in response.flags or self.archive.connection is None:
+            return response
+        try:
+            self.archive.add_response(response, spider=spider.name, callback=callback_name(request))
+            self.uncommitted += 1
+            if self.uncommitted >= self.commit_every:
+                self.archive.commit()
+                self.uncommitted = 0
+        except Exception as e:
+            logging.error(f"Could not archive {response.url}: {e}")
+        return response
+
+
+class ConditionalRequestMiddleware:
+    """Skip pages that haven't changed since the last crawl.
+
+    Applies to requests for the callbacks a spider lists in
+    incremental_callbacks (the pages items are extracted from, not the
+    listings that lead to them). Requests carry If-None-Match /
+    If-Modified-Since from the ValidatorStore; a 304 response, or a 200
+    whose body hash matches the stored one, is dropped with IgnoreRequest
+    before it reaches the spider and the pipelines, and only its freshness
+    is updated. Changed pages are parsed as usual, and their validators are
+    only saved once that succeeded (request_finished), so a page whose parse
+    failed is parsed again next time.
+
+    Must run after HttpCompressionMiddleware (a lower priority than 590), so
+    the hash is taken on the decoded body.
+    """
+
+    def __init__(self, store, commit_every=50, stats=None):
+        self.store = store
+        self.commit_every = max(1, commit_every)
+        self.uncommitted = 0
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('CONDITIONAL_REQUESTS_ENABLED'):
+            raise NotConfigured
+        path = settings.get('VALIDATOR_STORE_PATH', 'archive/validators.db')
+        middleware = cls(
+            shared(crawler, ('validators', path), lambda: ValidatorStore(path)),
+            commit_every=settings.getint('VALIDATOR_STORE_COMMIT_EVERY', 50),
+            stats=crawler.stats,
+        )
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(middleware.page_parsed, signal=request_finished)
+        return middleware
+
+    def spider_opened(self, spider):
+        if open_user(self.store):
+            self.store.open()
+        logging.info(f"Conditional requests for {getattr(spider, 'incremental_callbacks', [])} "
+                     f"with validators in {self.store.path}")
+
+    def spider_closed(self, spider):
+        if close_user(self.store):
+            self.store.close()
+
+    def is_incremental(self, request, spider):
+        return (self.store.connection is not None
+                and callback_name(request) in getattr(spider, 'incremental_callbacks', ()))
+
+    def process_request(self, request, spider):
+        if not self.is_incremental(request, spider):
+            return None
+        validators = self.store.get(spider.name, request.url)
+        if validators:
+            if validators['etag'] and b'If-None-Match' not in request.headers:
+                request.headers['If-None-Match'] = validators['etag']
+            if validators['last_modified'] and b'If-Modified-Since' not in request.headers:
+                request.headers['If-Modified-Since'] = validators['last_modified']
+        return None
+
+    def process_response(self, request, response, spider):
+        if not self.is_incremental(request, spider) or response.status not in (200, 304):
+            return response
+
+        etag = header_text(response, 'ETag')
+        last_modified = header_text(response, 'Last-Modified')
+        if response.status == 304:
+            self.store.unchanged(spider.name, request.url, etag, last_modified)
+            self.saved('not_modified')
+            raise IgnoreRequest(f"Not modified: {request.url}")
+
+        digest = hashlib.sha256(response.body).hexdigest()
+        validators = self.store.get(spider.name, request.url)
+        if validators and validators['sha256'] == digest:
+            self.store.unchanged(spider.name, request.url, etag, last_modified)
+            self.saved('unchanged')
+            raise IgnoreRequest(f"Unchanged: {request.url}")
+
+        request.meta['changed_validators'] = (digest, etag, last_modified)
+        return response
+
+    def page_parsed(self, request, response, failed, spider):
+        """Save the validators of a changed page once its callback output has been handled"""
+        validators = request.meta.pop('changed_validators', None)
+        if validators is None or self.store.connection is None:
+            return
+        if failed:
+            self.stats.inc_value('conditional_requests/parse_failed')
+            return
+        digest, etag, last_modified = validators
+        self.store.changed(spider.name, response.url, digest, etag, last_modified)
+        self.saved('changed')
+
+    def saved(self, outcome):
+        self.stats.inc_value(f'conditional_requests/{outcome}')
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_every:
+            self.store.commit()
+            self.uncommitted = 0
+
+
+def header_text(response, name):
+    value = response.headers.get(name)
+    return value.decode('latin-1') if value else None
+
+
+class AdaptiveConcurrencyMiddleware:
+    """Retune each host's downloader slot from its latency and errors (see throttle.py).
+
+    Sits next to the downloader so it sees raw statuses before retries and
+    redirects. Responses served from HTTPCACHE don't count.
+    """
+
+    def __init__(self, crawler, throttle, debug=False):
+        self.crawler = crawler
+        self.throttle = throttle
+        self.debug = debug
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('ADAPTIVE_CONCURRENCY_ENABLED'):
+            raise NotConfigured
+        if settings.getbool('AUTOTHROTTLE_ENABLED'):
+            logging.warning("AUTOTHROTTLE_ENABLED and ADAPTIVE_CONCURRENCY_ENABLED are both set; "
+                            "AutoThrottle will override the adaptive slot delays")
+        middleware = cls(
+            crawler,
+            shared(crawler, ('throttle',), lambda: AdaptiveThrottle.from_settings(settings)),
+            debug=settings.getbool('ADAPTIVE_CONCURRENCY_DEBUG'),
+        )
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_opened(self, spider):
+        open_user(self.throttle)
+
+    def spider_closed(self, spider):
+        self.crawler.stats.set_value('adaptive_concurrency/hosts', len(self.throttle.hosts))
+        self.throttle.leave(self)
+        if not close_user(self.throttle):
+            return
+        for key, state in sorted(self.throttle.hosts.items()):
+            logging.info(f"Adaptive concurrency {key}: {state.responses} responses, {state.errors} errors, "
+                         f"final {state}")
+
+    def process_response(self, request, response, spider):
+        if 'cached' not in response.flags:
+            key = request.meta.get('download_slot')
+            if key is not None:
+                state = self.throttle.response(key, response.status, request.meta.get('download_latency'))
+                self.retune(key, state)
+        return response
+
+    def process_exception(self, request, exception, spider):
+        key = request.meta.get('download_slot')
+        if key is not None and not isinstance(exception, IgnoreRequest):
+            self.retune(key, self.throttle.error(key))
+        return None
+
+    def retune(self, key, state):
+        slot = self.crawler.engine.downloader.slots.get(key)
+        if slot is None:
+            return
+        concurrency, delay = slot.concurrency, slot.delay
+        self.throttle.apply(slot, state, self)
+        if slot.concurrency != concurrency:
+            self.crawler.stats.inc_value(
+                'adaptive_concurrency/increases' if slot.concurrency > concurrency else 'adaptive_concurrency/decreases'
+            )
+        if self.debug and (slot.concurrency != concurrency or abs(slot.delay - delay) > 0.01):
+            logging.info(f"Slot {key}: concurrency {concurrency} -> {slot.concurrency}, "
+                         f"delay {delay:.2f}s -> {slot.delay:.2f}s ({state})")
+
+
+class BrokerPacingMiddleware:
+    """Hold a request leased from the broker until the domain slot it booked (see distributed.py).
+
+    Sits after the HTTP cache so cached pages aren't held back.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if crawler.settings.get('SCHEDULER') != 'crop_scraper.distributed.DistributedScheduler':
+            raise NotConfigured
+        return cls(crawler.stats)
+
+    async def process_request(self, request, spider):
+        wait = request.meta.get('broker_not_before', 0) - time.time()
+        if wait > 0:
+            from scrapy.utils.defer import maybe_deferred_to_future
+            from twisted.internet import reactor
+            from twisted.internet.task import deferLater
+
+            self.stats.inc_value('broker/paced_requests')
+            await maybe_deferred_to_future(deferLater(reactor, wait, lambda: None))
+        return None
+
+
+class RequestFinishedMiddleware:
+    """Send request_finished (see signals.py) once a response's callback output is all handled.
+
+    The outermost spider middleware: it counts the items and requests each
+    callback yields, and sends the signal once the items have left the
+    pipelines (scraped, dropped or failed) and the requests have been
+    scheduled. Schedulers only mark a request done, and conditional requests
+    only save a page's validators, after that.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        # response -> {'outstanding': outputs not handled yet, 'exhausted': callback done, 'failed': it raised}
+        self.outputs = {}
+        # request yielded by a callback -> the response it came from, until scheduled
+        self.requests = {}
+        # Responses request_finished was sent for: an exception reaches both
+        # process_spider_exception and process_spider_output, and it is sent once
+        self.finished = WeakSet()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        middleware = cls(crawler)
+        for signal in (signals.item_scraped, signals.item_dropped, signals.item_error):
+            crawler.signals.connect(middleware.item_done, signal=signal)
+        crawler.signals.connect(middleware.request_scheduled, signal=signals.request_scheduled)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def process_spider_output(self, response, result, spider):
+        try:
+            for output in result:
+                self.yielded(response, output)
+                yield output
+        except Exception:
+            self.exhausted(response, failed=True)
+            raise
+        self.exhausted(response, failed=False)
+
+    async def process_spider_output_async(self, response, result, spider):
+        try:
+            async for output in result:
+                self.yielded(response, output)
+                yield output
+        except Exception:
+            self.exhausted(response, failed=True)
+            raise
+        self.exhausted(response, failed=False)
+
+    def process_spider_exception(self, response, exception, spider):
+        self.exhausted(response, failed=True)
+        return None
+
+    def state(self, response):
+        return self.outputs.setdefault(response, {'outstanding': 0, 'exhausted': False, 'failed': False})
+
+    def yielded(self, response, output):
+        from scrapy import Request
+
+        if output is None or response in self.finished:
+            return
+        self.state(response)['outstanding'] += 1
+        if isinstance(output, Request):
+            self.requests[output] = response
+
+    def exhausted(self, response, failed):
+        if response in self.finished:
+            return
+        state = self.state(response)
+        state['exhausted'] = True
+        state['failed'] = state['failed'] or failed
+        self.maybe_finished(response)
+
+    def item_done(self, response=None, **kwargs):
+        self.output_done(response)
+
+    def request_scheduled(self, request, **kwargs):
+        response = self.requests.pop(request, None)
+        if response is not None:
+            # Sent just before the request is enqueued; count it once that's done
+            from twisted.internet import reactor
+
+            reactor.callLater(0, self.output_done, response)
+
+    def output_done(self, response):
+        state = self.outputs.get(response)
+        if state is not None:
+            state['outstanding'] -= 1
+            self.maybe_finished(response)
+
+    def maybe_finished(self, response):
+        state = self.outputs[response]
+        if state['exhausted'] and state['outstanding'] <= 0:
+            del self.outputs[response]
+            self.finished.add(response)
+            self.crawler.signals.send_catch_log(
+                request_finished, request=response.request, response=response,
+                failed=state['failed'], spider=self.crawler.spider,
+            )
+
+    def spider_closed(self, spider):
+        self.outputs.clear()
+        self.requests.clear()
+
+
 class CropScraperSpiderMiddleware:
     # Not all methods need to be defined. If a method is not defined,
     # scrapy acts as if the spider middleware does not modify the
@@ -0,0 +1,185 @@
+# Parsers that turn the free-text growing requirements collected by the
+# spiders into numbers that can be stored in typed, indexed columns.
+
+import re
+
+
+NUMBER = r'(\d+(?:\.\d+)?)'
+RANGE_SEPARATOR = r'\s*(?:-|–|—|to|and)\s*'
+
+PH_RANGE_PATTERN = re.compile(NUMBER + RANGE_SEPARATOR + NUMBER, re.IGNORECASE)
+PH_SINGLE_PATTERN = re.compile(r'\bph\b[^\d]{0,20}' + NUMBER, re.IGNORECASE)
+PH_CONTEXT_PATTERN = re.compile(r'\bph\b', re.IGNORECASE)
+
+MATURITY_PATTERN = re.compile(
+    r'(\d+)(?:' + RANGE_SEPARATOR + r'(\d+))?\s*(days?|weeks?)\b', re.IGNORECASE
+)
+
+SPACING_PATTERN = re.compile(
+    NUMBER + r'(?:' + RANGE_SEPARATOR + NUMBER + r')?\s*'
+    r'(inches|inch|in\b|"|feet|foot|ft\b|centimeters?|cm\b)',
+    re.IGNORECASE
+)
+
+# 10-10-10, 10:10:10 or 10/10/10, with the same separator throughout
+NPK_PATTERN = re.compile(r'(?<![\d.])(\d{1,2}(?:\.\d+)?)([-:/])(\d{1,2}(?:\.\d+)?)\2(\d{1,2}(?:\.\d+)?)(?![\d.])')
+
+# Multipliers converting spacing units to inches
+INCHES_PER_UNIT = {
+    'inches': 1.0, 'inch': 1.0, 'in': 1.0, '"': 1.0,
+    'feet': 12.0, 'foot': 12.0, 'ft': 12.0,
+    'centimeter': 1 / 2.54, 'centimeters': 1 / 2.54, 'cm': 1 / 2.54,
+}
+
+# Plausible bounds used to reject numbers that belong to something else
+PH_BOUNDS = (3.0, 10.0)
+MAX_MATURITY_DAYS = 400
+MAX_SPACING_INCHES = 240
+MAX_EC = 20.0  # mS/cm; larger numbers are usually µS/cm or ppm
+
+# Nutrient concentrations stored for a NutrientRecipeItem
+PPM_FIELDS = (
+    'nitrogen_ppm', 'phosphorus_ppm', 'potassium_ppm',
+    'calcium_ppm', 'magnesium_ppm', 'sulfur_ppm',
+    'iron_ppm', 'manganese_ppm', 'zinc_ppm', 'copper_ppm', 'boron_ppm', 'molybdenum_ppm',
+)
+
+RANGE_PATTERN = re.compile(NUMBER + RANGE_SEPARATOR + NUMBER, re.IGNORECASE)
+NUMBER_PATTERN = re.compile(NUMBER)
+
+
+def as_text(value):
+    """Flatten list values (as some spiders produce) into a single string"""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ' | '.join(str(v) for v in value if v)
+    return str(value)
+
+
+def as_float(value):
+    """Convert a number or numeric string to float, or None"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        match = NUMBER_PATTERN.search(as_text(value))
+        return float(match.group(1)) if match else None
+
+
+def parse_ph_range(value):
+    """Parse a soil pH range like 'pH 6.0 to 6.8' into (min, max)"""
+    text = as_text(value)
+    low, high = PH_BOUNDS
+
+    fallback = None
+    for match in PH_RANGE_PATTERN.finditer(text):
+        first, second = float(match.group(1)), float(match.group(2))
+        if not (low <= first <= second <= high):
+            continue
+        # A range right after "pH" is trusted; otherwise require decimals so
+        # things like "6-8 inches" aren't mistaken for a pH range
+        if PH_CONTEXT_PATTERN.search(text, max(0, match.start() - 40), match.start()):
+            return first, second
+        if fallback is None and '.' in match.group(1) + match.group(2):
+            fallback = (first, second)
+
+    if fallback:
+        return fallback
+
+    match = PH_SINGLE_PATTERN.search(text)
+    if match and low <= float(match.group(1)) <= high:
+        ph = float(match.group(1))
+        return ph, ph
+
+    return None, None
+
+
+def parse_ec_range(value):
+    """Parse an EC range like '1.5-2.5' (mS/cm) into (min, max)"""
+    text = as_text(value)
+
+    match = RANGE_PATTERN.search(text)
+    if match:
+        bounds = float(match.group(1)), float(match.group(2))
+    else:
+        match = NUMBER_PATTERN.search(text)
+        if not match:
+            return None, None
+        bounds = float(match.group(1)), float(match.group(1))
+
+    if 0 < bounds[0] <= bounds[1] <= MAX_EC:
+        return bounds
+    return None, None
+
+
+def parse_maturity_days(value):
+    """Parse days to maturity like '60-80 days' or '8 weeks' into (min, max) days"""
+    text = as_text(value)
+
+    for match in MATURITY_PATTERN.finditer(text):
+        first = int(match.group(1))
+        second = int(match.group(2)) if match.group(2) else first
+        multiplier = 7 if match.group(3).lower().startswith('week') else 1
+        first, second = first * multiplier, second * multiplier
+        if 0 < first <= second <= MAX_MATURITY_DAYS:
+            return first, second
+
+    return None, None
+
+
+def parse_spacing_inches(value):
+    """Parse plant spacing like '18 to 24 inches apart' into the minimum spacing in inches"""
+    text = as_text(value)
+
+    candidates = []
+    for match in SPACING_PATTERN.finditer(text):
+        unit = match.group(3).lower()
+        inches = float(match.group(1)) * INCHES_PER_UNIT.get(unit, 1.0)
+        if 0 < inches <= MAX_SPACING_INCHES:
+            # Prefer measurements described as spacing ("... apart")
+            apart = 'apart' in text[match.end():match.end() + 15].lower()
+            candidates.append((not apart, match.start(), round(inches, 2)))
+
+    if candidates:
+        return min(candidates)[2]
+    return None
+
+
+def parse_npk(value):
+    """Parse an N-P-K ratio like '10-10-10' or '10:10:10' into (n, p, k)"""
+    if isinstance(value, dict):
+        return as_float(value.get('nitrogen')), as_float(value.get('phosphorus')), as_float(value.get('potassium'))
+
+    match = NPK_PATTERN.search(as_text(value))
+    if match:
+        return float(match.group(1)), float(match.group(3)), float(match.group(4))
+
+    return None, None, None
+
+
+def normalize_crop_fields(fields):
+    """Return the typed columns derived from a crop's free-text fields"""
+    ph_min, ph_max = parse_ph_range(fields.get('soil_ph'))
+    maturity_min, maturity_max = parse_maturity_days(fields.get('days_to_maturity'))
+    n, p, k = parse_npk(fields.get('fertilizer_npk'))
+
+    return {
+        'ph_min': ph_min,
+        'ph_max': ph_max,
+        'maturity_days_min': maturity_min,
+        'maturity_days_max': maturity_max,
+        'spacing_in': parse_spacing_inches(fields.get('spacing')),
+        'npk_n': n,
+        'npk_p': p,
+        'npk_k': k,
+    }
+
+
+def normalize_recipe_fields(fields):
+    """Return the typed columns of a nutrient recipe: ppm values and EC/pH bounds"""
+    values = {field: as_float(fields.get(field)) for field in PPM_FIELDS}
+    values['ec_min'], values['ec_max'] = parse_ec_range(fields.get('ec_range'))
+    values['ph_min'], values['ph_max'] = parse_ph_range(fields.get('ph_range'))
+    return values
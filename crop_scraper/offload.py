@@ -0,0 +1,170 @@
+# Process-pool parsing for live crawls.
+#
+# Extraction is CPU-bound and runs on the reactor thread, so a slow page holds
+# up downloads and every other callback. With PARSE_OFFLOAD_ENABLED the
+# callbacks decorated with @offload send the response to a pool of worker
+# processes and yield the items and requests they produce once the worker is
+# done. Only the url, status, Content-Type, encoding, body bytes (deflated,
+# as HTML shrinks several times over) and the request (as a dict) cross the
+# process boundary; workers rebuild the response around them. At most PARSE_OFFLOAD_MAX_PENDING responses are queued or being
+# parsed at once, so bodies don't pile up in memory when downloads outrun the
+# pool.
+#
+# Without the extension, and inside the workers themselves, decorated
+# callbacks run inline exactly as before.
+
+import logging
+import multiprocessing
+import os
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from functools import wraps
+
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+from scrapy.http import TextResponse
+from scrapy.responsetypes import responsetypes
+from scrapy.settings import Settings
+from scrapy.utils.defer import maybe_deferred_to_future
+from scrapy.utils.request import request_from_dict
+
+from crop_scraper.replay import load_spider_class
+
+
+# Per-process spider set up by init_worker()
+worker_spider = None
+
+
+def init_worker(spider_modules, spider_name):
+    """Load the spider once per worker process"""
+    global worker_spider
+    settings = Settings({'SPIDER_MODULES': spider_modules})
+    worker_spider = load_spider_class(settings, spider_name)()
+
+
+def pack_response(response, spider):
+    """The parts of a response a worker needs to rebuild it"""
+    return {
+        'url': response.url,
+        'status': response.status,
+        'content_type': response.headers.get('Content-Type'),
+        'encoding': response.encoding if isinstance(response, TextResponse) else None,
+        'body': zlib.compress(response.body, 1),
+        'request': response.request.to_dict(spider=spider),
+    }
+
+
+def unpack_response(packed, spider):
+    headers = {'Content-Type': packed['content_type']} if packed['content_type'] else {}
+    body = zlib.decompress(packed['body'])
+    cls = responsetypes.from_args(headers=headers, url=packed['url'], body=body)
+    kwargs = {'encoding': packed['encoding']} if packed['encoding'] and issubclass(cls, TextResponse) else {}
+    response = cls(url=packed['url'], status=packed['status'], headers=headers, body=body, **kwargs)
+    response.request = request_from_dict(packed['request'], spider=spider)
+    return response
+
+
+def parse_packed(callback, packed):
+    """Run a spider callback in a worker; requests come back as dicts"""
+    response = unpack_response(packed, worker_spider)
+    results = []
+    for result in getattr(worker_spider, callback)(response) or ():
+        if isinstance(result, Request):
+            results.append(('request', result.to_dict(spider=worker_spider)))
+        else:
+            results.append(('item', result))
+    return results
+
+
+def offload(callback):
+    """Decorator for spider callbacks that may run in the ParseOffload pool"""
+
+    @wraps(callback)
+    def wrapper(self, response):
+        pool = getattr(self, 'parse_offload', None)
+        if pool is None:
+            return callback(self, response)
+        return pool.parse(self, callback.__name__, response)
+
+    return wrapper
+
+
+class ParseOffload:
+    """Extension that owns the worker pool used by @offload callbacks"""
+
+    def __init__(self, crawler, workers=None, max_pending=None):
+        self.crawler = crawler
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.workers
+        self.pool = None
+        self.semaphore = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('PARSE_OFFLOAD_ENABLED'):
+            raise NotConfigured
+        extension = cls(
+            crawler,
+            workers=settings.getint('PARSE_OFFLOAD_WORKERS', 0),
+            max_pending=settings.getint('PARSE_OFFLOAD_MAX_PENDING', 0),
+        )
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        from twisted.internet.defer import DeferredSemaphore
+
+        # Spawned rather than forked: the crawl process already runs threads
+        # (database writer, DNS) whose locks a fork could copy mid-use. Spawned
+        # workers import the main module, so crawl scripts need a __main__ guard.
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=init_worker,
+            initargs=(self.crawler.settings.getlist('SPIDER_MODULES'), spider.name),
+        )
+        self.semaphore = DeferredSemaphore(self.max_pending)
+        spider.parse_offload = self
+        logging.info(f"Parsing in {self.workers} worker processes, at most {self.max_pending} pending")
+
+    def spider_closed(self, spider):
+        from twisted.internet.threads import deferToThread
+
+        spider.parse_offload = None
+        if self.pool is not None:
+            pool, self.pool = self.pool, None
+            # Waiting for the workers blocks, so do it off the reactor thread:
+            # a slow worker must not stall other crawlers in this process
+            return deferToThread(pool.shutdown, wait=True, cancel_futures=True)
+
+    async def parse(self, spider, callback, response):
+        """Async generator of a callback's results, computed in the pool"""
+        await maybe_deferred_to_future(self.semaphore.acquire())
+        try:
+            future = self.pool.submit(parse_packed, callback, pack_response(response, spider))
+            results = await maybe_deferred_to_future(self.wait(future))
+        finally:
+            self.semaphore.release()
+
+        self.crawler.stats.inc_value('parse_offload/responses')
+        for kind, result in results:
+            yield request_from_dict(result, spider=spider) if kind == 'request' else result
+
+    def wait(self, future):
+        """Deferred fired on the reactor thread when a pool future completes"""
+        from twisted.internet import reactor
+        from twisted.internet.defer import Deferred
+
+        deferred = Deferred()
+
+        def done(future):
+            error = future.exception()
+            if error is not None:
+                deferred.errback(error)
+            else:
+                deferred.callback(future.result())
+
+        future.add_done_callback(lambda future: reactor.callFromThread(done, future))
+        return deferred
@@ -0,0 +1,55 @@
+# Run several spiders concurrently in one process and one reactor.
+#
+# Each spider gets its own crawler (scheduler, frontier, downloader slots),
+# but with SHARED_RESOURCES set they feed one DedupPipeline cache and one
+# DatabasePipeline writer, and share the response archive, the validator
+# store, the adaptive throttle and, through SharedFilesystemCacheStorage, one
+# HTTP cache directory (see shared.py). Spiders crawl different domains in
+# parallel, so the run takes about as long as the slowest of them rather
+# than the sum.
+
+import logging
+import time
+
+from scrapy.crawler import CrawlerProcess
+
+DEFAULT_SPIDERS = ['almanac', 'extension', 'gardening_know_how', 'nutrition']
+
+DEFAULT_CACHE_STORAGE = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
+SHARED_CACHE_STORAGE = 'crop_scraper.shared.SharedFilesystemCacheStorage'
+
+
+def orchestrator_settings(settings):
+    """A copy of the project settings with resources shared between crawlers"""
+    settings = settings.copy()
+    settings.set('SHARED_RESOURCES', True, priority='cmdline')
+    if settings.get('HTTPCACHE_STORAGE') == DEFAULT_CACHE_STORAGE:
+        settings.set('HTTPCACHE_STORAGE', SHARED_CACHE_STORAGE, priority='cmdline')
+    return settings
+
+
+def run_spiders(settings, spiders=None):
+    """Crawl with several spiders (names or classes) at once; returns per-spider counts and the total time"""
+    process = CrawlerProcess(orchestrator_settings(settings))
+
+    crawlers = {}
+    for spider in spiders or DEFAULT_SPIDERS:
+        crawler = process.create_crawler(spider)
+        crawlers[crawler.spidercls.name] = crawler
+        process.crawl(crawler)
+
+    logging.info(f"Running {len(crawlers)} spiders in one process: {', '.join(crawlers)}")
+    start = time.monotonic()
+    process.start()
+
+    results = {}
+    for name, crawler in crawlers.items():
+        stats = crawler.stats.get_stats()
+        results[name] = {
+            'pages': stats.get('response_received_count', 0),
+            'items': stats.get('item_scraped_count', 0),
+            'dropped': stats.get('item_dropped_count', 0),
+            'seconds': round(stats.get('elapsed_time_seconds', 0), 1),
+            'finish_reason': stats.get('finish_reason'),
+        }
+    return results, round(time.monotonic() - start, 1)
@@ -0,0 +1,184 @@
+# Compiled regular expressions shared by the spiders' extractors.
+#
+# Spiders register their field patterns once at import time instead of
+# passing pattern strings to re.search() on every call. MultiFieldExtractor
+# groups the patterns of many fields so a page is lowercased once and every
+# field's matches come from that one copy:
+#
+#     FIELDS = MultiFieldExtractor('almanac', {
+#         'spacing': [r'spac(?:ing|e)\s*:?\s*([^.]+)', ...],
+#         ...
+#     })
+#     matches = FIELDS.first_matches(text)   # {'spacing': [match or None, ...], ...}
+#
+# Case-insensitive searches are the slow part of these extractors (re can't
+# use its literal-prefix scan with IGNORECASE), so each pattern also gets a
+# lowercased, case-sensitive twin that is run over the lowercased page. A hit
+# is re-matched with the original pattern at the same offset, so groups and
+# spans refer to the original text and results are identical to re.search().
+#
+# A single alternation of every field's patterns would scan the page once,
+# but with Python's re it is ten times slower or worse than separate
+# searches, because it tries every alternative at every position.
+# benchmark_patterns.py compares the approaches.
+
+import re
+from functools import lru_cache
+
+
+# Every registered group of patterns, by name ('<spider>.<field>')
+PATTERNS = {}
+
+# Escapes whose meaning changes when lowercased (\D, \S, \W, \B, \A, \Z, ...)
+UPPERCASE_ESCAPE = re.compile(r'\\[A-Z]')
+
+# Characters that IGNORECASE matches differently from str.lower()
+CASE_FOLDING_EXCEPTIONS = ('İ', 'ı', 'ſ')
+
+
+@lru_cache(maxsize=1024)
+def compile_pattern(pattern, flags=re.IGNORECASE):
+    """Compile a pattern once; later calls return the cached object"""
+    return re.compile(pattern, flags)
+
+
+def register(name, patterns, flags=re.IGNORECASE):
+    """Compile an ordered group of patterns and register it under a name"""
+    compiled = tuple(compile_pattern(pattern, flags) for pattern in patterns)
+    PATTERNS[name] = compiled
+    return compiled
+
+
+@lru_cache(maxsize=1024)
+def lowered_pattern(pattern):
+    """Case-sensitive twin of an IGNORECASE pattern for searching lowercased text.
+
+    None when the pattern can't be lowercased safely; it is then searched
+    case-insensitively as usual.
+    """
+    source = pattern.pattern
+    if not pattern.flags & re.IGNORECASE or UPPERCASE_ESCAPE.search(source):
+        return None
+    # Non-ASCII letters (µ, é, ...) have case variants str.lower() doesn't map
+    if any(not char.isascii() and char.lower() != char.upper() for char in source):
+        return None
+    try:
+        return re.compile(source.lower(), pattern.flags & ~re.IGNORECASE)
+    except re.error:
+        return None
+
+
+def lowercase_copy(text, lower=None):
+    """text.lower() if offsets line up with text and case folding agrees with re, else None.
+
+    Pass lower when the lowercased text is already at hand.
+    """
+    if lower is None:
+        lower = text.lower()
+    if len(lower) != len(text) or any(char in text for char in CASE_FOLDING_EXCEPTIONS):
+        return None
+    return lower
+
+
+def search(pattern, text, lower=None):
+    """pattern.search(text), using lower (from lowercase_copy()) when possible"""
+    twin = lowered_pattern(pattern) if lower is not None else None
+    if twin is None:
+        return pattern.search(text)
+    match = twin.search(lower)
+    return pattern.match(text, match.start()) if match else None
+
+
+def finditer(pattern, text, lower=None):
+    """pattern.finditer(text), using lower (from lowercase_copy()) when possible"""
+    twin = lowered_pattern(pattern) if lower is not None else None
+    if twin is None:
+        yield from pattern.finditer(text)
+        return
+    for match in twin.finditer(lower):
+        yield pattern.match(text, match.start())
+
+
+def findall(pattern, text, lower=None):
+    """Same result as pattern.findall(text)"""
+    return [findall_value(match) for match in finditer(pattern, text, lower)]
+
+
+def findall_value(match):
+    # Like re.findall(), groups that didn't take part in the match are ''
+    groups = match.groups('')
+    if not groups:
+        return match.group(0)
+    if len(groups) == 1:
+        return groups[0]
+    return groups
+
+
+class MultiFieldExtractor:
+    """The patterns of several fields, searched together over one lowercased copy of a page"""
+
+    def __init__(self, name, fields, flags=re.IGNORECASE):
+        self.name = name
+        self.fields = {
+            field: register(f"{name}.{field}", patterns, flags)
+            for field, patterns in fields.items()
+        }
+
+    def __repr__(self):
+        return f"MultiFieldExtractor({self.name!r}, {len(self.fields)} fields)"
+
+    def first_matches(self, text, lower=None):
+        """First match of each pattern, per field, in pattern order (None where a pattern doesn't match).
+
+        Patterns are only searched once an extractor iterates up to them, so
+        extractors pay for the fields and patterns they actually use.
+        """
+        return FieldMatches(self, text, lowercase_copy(text, lower))
+
+    def findall(self, field, text, lower=None):
+        """re.findall() results of each of a field's patterns, in pattern order"""
+        lower = lowercase_copy(text, lower)
+        return [findall(pattern, text, lower) for pattern in self.fields[field]]
+
+
+class FieldMatches(dict):
+    """Mapping of field to PatternMatches, created on first lookup of each field"""
+
+    def __init__(self, extractor, text, lower):
+        super().__init__()
+        self.extractor = extractor
+        self.text = text
+        self.lower = lower
+
+    def __missing__(self, field):
+        found = self[field] = PatternMatches(self.extractor.fields[field], self.text, self.lower)
+        return found
+
+
+class PatternMatches:
+    """First match (or None) of each pattern in order, searched as iteration reaches it.
+
+    Extractors that stop at the first acceptable match never run the
+    remaining patterns; results are kept for the next extractor.
+    """
+
+    def __init__(self, patterns, text, lower):
+        self.patterns = patterns
+        self.text = text
+        self.lower = lower
+        self.found = []
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def __getitem__(self, index):
+        for position, match in enumerate(self):
+            if position == index:
+                return match
+        raise IndexError(index)
+
+    def __iter__(self):
+        for index, pattern in enumerate(self.patterns):
+            if index == len(self.found):
+                self.found.append(search(pattern, self.text, self.lower))
+            yield self.found[index]
@@ -4,12 +4,22 @@
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
 from itemadapter import ItemAdapter
+import gzip
+import hashlib
 import json
 import sqlite3
 from datetime import datetime
-from scrapy.exceptions import DropItem
+from scrapy.exceptions import DropItem, NotConfigured
+from crop_scraper.items import NutrientRecipeItem
+from crop_scraper.normalizers import PPM_FIELDS, as_text, normalize_crop_fields, normalize_recipe_fields
+from crop_scraper.shared import shared_pipeline
+from crop_scraper.storage import DEFAULT_DATABASE_URL, open_storage
 import logging
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
 
 
 class ValidationPipeline:
@@ -17,7 +27,10 @@ class ValidationPipeline:
         adapter = ItemAdapter(item)
         
         # Validate required fields
-        if not adapter.get('name'):
+        if isinstance(item, NutrientRecipeItem):
+            if not adapter.get('crop_name'):
+                raise DropItem(f"Missing crop name in {item}")
+        elif not adapter.get('name'):
             raise DropItem(f"Missing crop name in {item}")
         
         # Add timestamp
@@ -26,34 +39,457 @@ class ValidationPipeline:
         return item
 
 
+class NormalizationPipeline:
+    """Parse numeric values out of free-text fields into typed item fields.
+
+    Adds ph_min/ph_max, maturity_days_min/maturity_days_max, spacing_in and
+    npk_n/npk_p/npk_k next to the raw text, so storage and analytics can use
+    numbers instead of re-running regexes over every row. Nutrient recipes get
+    float ppm values and ec_min/ec_max, ph_min/ph_max bounds instead.
+    """
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        field_names = set(adapter.field_names())
+
+        if isinstance(item, NutrientRecipeItem):
+            values = normalize_recipe_fields(adapter)
+        else:
+            values = normalize_crop_fields(adapter)
+
+        for field, value in values.items():
+            if field in field_names or isinstance(item, dict):
+                adapter[field] = value
+
+        return item
+
+
+# Typed values parsed from the free-text columns by NormalizationPipeline
+NUMERIC_CROP_COLUMNS = (
+    'ph_min', 'ph_max', 'maturity_days_min', 'maturity_days_max',
+    'spacing_in', 'npk_n', 'npk_p', 'npk_k'
+)
+
+CROP_COLUMNS = (
+    'name', 'common_name', 'scientific_name', 'category', 'planting_depth', 'spacing',
+    'days_to_maturity', 'water_needs', 'irrigation_frequency', 'water_amount_per_week',
+    'soil_ph', 'soil_type', 'nitrogen_requirement', 'phosphorus_requirement',
+    'potassium_requirement', 'fertilizer_npk', 'fertilizer_recommendations',
+    'organic_fertilizer_options', 'secondary_nutrients', 'micronutrients',
+    'sun_requirements', 'temperature_range', 'hardiness_zone', 'companion_plants',
+    'pest_resistance', 'planting_season', 'harvest_time', 'source_url',
+    'scraped_date', 'data_source',
+) + NUMERIC_CROP_COLUMNS
+
+RECIPE_COLUMNS = (
+    'crop_name', 'fertilizer_type', 'npk_ratio', 'application_rate',
+    'application_frequency', 'application_timing', 'nitrogen_requirements',
+    'phosphorus_requirements', 'potassium_requirements', 'calcium_requirements',
+    'magnesium_requirements', 'micronutrients', 'organic_fertilizers',
+    'synthetic_fertilizers', 'compost_recommendations', 'mulching_recommendations',
+    'watering_frequency', 'watering_amount', 'irrigation_method',
+    'source_url', 'scraped_date'
+)
+
+
+# Columns of the recipes table, which stores NutrientRecipeItem
+PPM_RECIPE_COLUMNS = (
+    'crop_name', 'stage_of_growth',
+) + PPM_FIELDS + (
+    'ec_range', 'ec_min', 'ec_max', 'ph_range', 'ph_min', 'ph_max',
+    'application_method', 'frequency', 'source_url', 'reference_document',
+    'author', 'data_source', 'scraped_date',
+)
+
+# Typed columns of the recipes table
+NUMERIC_RECIPE_COLUMNS = PPM_FIELDS + ('ec_min', 'ec_max', 'ph_min', 'ph_max')
+
+
+# Text columns indexed by the crops_fts full-text search table
+SEARCH_COLUMNS = (
+    'name', 'common_name', 'scientific_name', 'category', 'water_needs', 'soil_type',
+    'sun_requirements', 'fertilizer_recommendations', 'organic_fertilizer_options',
+    'planting_season', 'harvest_time'
+)
+
+
+def item_table(adapter):
+    """Name of the table an item is stored in"""
+    if isinstance(adapter.item, NutrientRecipeItem):
+        return 'recipes'
+    if 'fertilizer_type' in adapter or 'npk_ratio' in adapter:
+        return 'nutrient_recipes'
+    return 'crops'
+
+
+# Item columns stored in each table
+TABLE_COLUMNS = {
+    'crops': CROP_COLUMNS,
+    'nutrient_recipes': RECIPE_COLUMNS,
+    'recipes': PPM_RECIPE_COLUMNS,
+}
+
+# Columns identifying a row, matching each table's UNIQUE constraint
+TABLE_KEYS = {
+    'crops': ('name', 'source_url'),
+    'nutrient_recipes': ('crop_name', 'fertilizer_type', 'source_url'),
+    'recipes': ('crop_name', 'stage_of_growth', 'source_url'),
+}
+
+# Columns that change on every crawl and must not affect the content hash
+UNHASHED_COLUMNS = {'scraped_date'}
+
+# Bookkeeping columns written after the item's own columns
+TRACKING_COLUMNS = ('content_hash', 'last_seen')
+
+
+def compute_content_hash(columns, row):
+    """Stable hash of an item's extracted fields, ignoring crawl timestamps"""
+    content = [value for column, value in zip(columns, row) if column not in UNHASHED_COLUMNS]
+    payload = json.dumps(content, ensure_ascii=False, default=str, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def column_value(value):
+    """Convert an item value into something every database driver can bind"""
+    if isinstance(value, (list, tuple)):
+        return as_text(value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False, sort_keys=True)
+    return value
+
+
+def table_row(adapter, table):
+    """Values of an item in the column order of its table"""
+    return tuple(column_value(adapter.get(column)) for column in TABLE_COLUMNS[table])
+
+
+def build_update_sql(table, columns, key, equals='IS'):
+    """Build an UPDATE of every column for the row matching the key"""
+    assignments = ', '.join(f"{column} = ?" for column in columns)
+    condition = ' AND '.join(f"{column} {equals} ?" for column in key)
+    return f"UPDATE {table} SET {assignments} WHERE {condition}"
+
+
+def build_touch_sql(table, key, equals='IS'):
+    """Build an UPDATE that only bumps last_seen for the row matching the key"""
+    condition = ' AND '.join(f"{column} {equals} ?" for column in key)
+    return f"UPDATE {table} SET last_seen = ? WHERE {condition}"
+
+
+# Ways a queued row can be written
+WRITE_OPERATIONS = ('insert', 'update', 'touch')
+
+
+def build_statements(table_columns, storage):
+    """Build the insert, update and touch statements for each table"""
+    statements = {}
+    for table, columns in table_columns.items():
+        key = TABLE_KEYS[table]
+        equals = storage.null_safe_equals
+        statements[(table, 'insert')] = storage.insert_ignore_sql(table, columns + TRACKING_COLUMNS)
+        statements[(table, 'update')] = build_update_sql(table, columns + TRACKING_COLUMNS, key, equals)
+        statements[(table, 'touch')] = build_touch_sql(table, key, equals)
+    return statements
+
+
+class DedupPipeline:
+    """Drop duplicate items before they reach storage.
+
+    Items are keyed like the database rows: (name, source_url) for crops and
+    (crop_name, fertilizer_type, source_url) for nutrient recipes. A key seen
+    earlier in the crawl (e.g. the same almanac.com page emitted by several
+    spiders) is dropped outright. The cache is warmed with the keys and
+    content hashes already in the database, which tells a page recrawled
+    without changes from a changed one. Both pass through: the exports
+    (JSON Lines, Parquet) must see every item of the crawl, and
+    DatabasePipeline only bumps last_seen for an unchanged row.
+
+    The cache is an LRU holding at most DEDUP_CACHE_SIZE keys, so memory stays
+    bounded on large databases; an evicted key just falls back to the
+    database pipeline's own hash check. Spiders run together by the
+    orchestrator share one cache (SHARED_RESOURCES).
+    """
+
+    def __init__(self, database_url=DEFAULT_DATABASE_URL, cache_size=100000):
+        self.database_url = database_url
+        self.cache_size = max(1, cache_size)
+        # (table, key) -> (content_hash, seen in this crawl)
+        self.cache = OrderedDict()
+        self.unchanged = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        database_url = settings.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+        return shared_pipeline(crawler, (cls, database_url), lambda: cls(
+            database_url=database_url,
+            cache_size=settings.getint('DEDUP_CACHE_SIZE', 100000),
+        ))
+
+    def open_spider(self, spider):
+        """Warm the cache with the rows already stored"""
+        try:
+            storage = open_storage(self.database_url, pool_size=1)
+        except Exception as e:
+            logging.warning(f"Dedup cache not warmed, database unavailable: {e}")
+            return
+
+        per_table = self.cache_size // len(TABLE_KEYS)
+        try:
+            with storage.transaction() as cursor:
+                for table, key in TABLE_KEYS.items():
+                    if 'content_hash' not in storage.column_names(cursor, table):
+                        continue
+                    # Most recently stored rows first, in case the cache can't hold them all
+                    cursor.execute(storage.sql(
+                        f"SELECT {', '.join(key)}, content_hash FROM {table} ORDER BY id DESC LIMIT ?"
+                    ), (per_table,))
+                    for row in reversed(cursor.fetchall()):
+                        self.cache[(table, tuple(row[:-1]))] = (row[-1], False)
+        finally:
+            storage.close()
+        logging.info(f"Dedup cache warmed with {len(self.cache)} stored rows")
+
+    def close_spider(self, spider):
+        logging.info(f"Dedup dropped {self.dropped} duplicate items; "
+                     f"{self.unchanged} items unchanged since the last crawl")
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        table = item_table(adapter)
+        key = tuple(adapter.get(column) for column in TABLE_KEYS[table])
+        content_hash = compute_content_hash(TABLE_COLUMNS[table], table_row(adapter, table))
+
+        cached = self.cache.get((table, key))
+        self.remember((table, key), content_hash)
+
+        if cached is None:
+            return item
+        stored_hash, seen = cached
+        if seen:
+            self.dropped += 1
+            raise DropItem(f"Duplicate item {key} already scraped in this crawl")
+        if stored_hash == content_hash:
+            self.unchanged += 1
+        return item
+
+    def remember(self, cache_key, content_hash):
+        """Mark a key as seen in this crawl, evicting the least recently used key"""
+        self.cache[cache_key] = (content_hash, True)
+        self.cache.move_to_end(cache_key)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+
+# Sentinels telling the database writer thread to flush and exit, or just flush
+WRITER_STOP = object()
+WRITER_FLUSH = object()
+
+
 class DatabasePipeline:
-    def __init__(self):
-        self.database_name = 'crops.db'
-        self.connection = None
+    """Store items in the DATABASE_URL database, grouping inserts into batched transactions.
+
+    Rows are buffered per table and written in a single transaction once
+    DATABASE_BATCH_SIZE rows are pending or the oldest pending row is
+    DATABASE_BATCH_MAX_AGE seconds old, whichever comes first. Inserts use the
+    backend's bulk path (``executemany`` on SQLite, ``COPY`` on PostgreSQL).
+
+    Every row carries a content hash of its extracted fields. A recrawled row
+    whose hash matches the stored one only gets its last_seen bumped; a
+    changed row is updated in place; a new row is inserted. The known hashes
+    are loaded once when the connection opens, so the comparison is a dict
+    lookup rather than a query; hashes of queued rows only join them once
+    their rows are committed, so a row that failed to write is inserted
+    again the next time it is seen.
+
+    When DATABASE_WRITER_QUEUE_SIZE is set, all database work happens on a
+    dedicated writer thread fed through a bounded queue, so slow inserts never
+    block the reactor. If the queue is full, process_item returns a Deferred
+    that only fires once the row has been queued, which holds Scrapy back
+    instead of piling items up in memory. A row the writer can't store is
+    logged and skipped; if the writer itself dies, waiting and later items
+    are dropped rather than left hanging.
+
+    Spiders run together by the orchestrator (SHARED_RESOURCES) share one
+    pipeline, so one connection and one writer serve them all; it is
+    flushed and closed when the last spider closes.
+    """
+
+    table_columns = TABLE_COLUMNS
+
+    def __init__(self, database_url=DEFAULT_DATABASE_URL, batch_size=100, batch_max_age=5.0,
+                 queue_size=0, pool_size=5, stop_timeout=60.0):
+        self.database_url = database_url
+        self.batch_size = max(1, batch_size)
+        self.batch_max_age = batch_max_age
+        self.queue_size = queue_size
+        self.pool_size = pool_size
+        self.stop_timeout = stop_timeout
+        self.storage = None
+        self.statements = {}
+        self.pending = self.empty_batch()
+        self.batch_started = None
+        self.known_hashes = {table: {} for table in self.table_columns}
+        # Hashes of the rows in the pending batch, by key, until they are committed
+        self.pending_hashes = {table: {} for table in self.table_columns}
+        self.use_flush_timer = False
+        self.flush_timer = None
+        self.queue = None
+        self.writer_thread = None
+        self.writer_error = None
+        self.waiting = deque()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        database_url = settings.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+
+        def build():
+            pipeline = cls(
+                database_url=database_url,
+                batch_size=settings.getint('DATABASE_BATCH_SIZE', 100),
+                batch_max_age=settings.getfloat('DATABASE_BATCH_MAX_AGE', 5.0),
+                queue_size=settings.getint('DATABASE_WRITER_QUEUE_SIZE', 0),
+                pool_size=settings.getint('DATABASE_POOL_SIZE', 5),
+                stop_timeout=settings.getfloat('DATABASE_WRITER_STOP_TIMEOUT', 60.0),
+            )
+            # Only schedule the age-based flush when running inside a reactor
+            pipeline.use_flush_timer = True
+            return pipeline
+
+        return shared_pipeline(crawler, (cls, database_url), build)
         
     def open_spider(self, spider):
         """Initialize database connection and create tables if they don't exist"""
+        if self.queue_size > 0:
+            self.start_writer()
+            return
+
+        self.connect()
+        if self.use_flush_timer and self.batch_max_age > 0:
+            from twisted.internet import task
+            self.flush_timer = task.LoopingCall(self.flush_if_stale)
+            self.flush_timer.start(self.batch_max_age, now=False)
+
+    def connect(self):
         try:
-            self.connection = sqlite3.connect(self.database_name)
-            self.create_tables()
-            logging.info(f"Database connection established: {self.database_name}")
+            self.storage = open_storage(self.database_url, self.pool_size)
+            self.statements = build_statements(self.table_columns, self.storage)
+            with self.storage.transaction() as cursor:
+                self.create_tables(cursor)
+                self.load_known_hashes(cursor)
+            logging.info(f"Database connection established: {self.storage.display_url}")
         except Exception as e:
             logging.error(f"Error opening database: {e}")
+            if self.storage:
+                self.storage.close()
+                self.storage = None
             raise
     
     def close_spider(self, spider):
-        """Close database connection"""
-        if self.connection:
-            self.connection.close()
+        """Flush pending rows and close database connection"""
+        if self.writer_thread:
+            from twisted.internet import threads
+            return threads.deferToThread(self.stop_writer)
+
+        if self.flush_timer and self.flush_timer.running:
+            self.flush_timer.stop()
+        self.disconnect()
+
+    def disconnect(self):
+        if self.storage:
+            self.flush()
+            self.storage.close()
+            self.storage = None
             logging.info("Database connection closed")
+
+    def start_writer(self):
+        """Start the writer thread and wait until the database is ready"""
+        self.queue = queue.Queue(maxsize=self.queue_size)
+        ready = threading.Event()
+        errors = []
+        self.writer_thread = threading.Thread(
+            target=self.writer_loop, args=(ready, errors),
+            name='DatabaseWriter', daemon=True,
+        )
+        self.writer_thread.start()
+        ready.wait()
+        if errors:
+            self.writer_thread = None
+            raise errors[0]
+
+    def stop_writer(self):
+        """Drain the queue, flush and close the connection (blocks for at most stop_timeout)"""
+        deadline = time.monotonic() + self.stop_timeout
+        if self.writer_thread.is_alive():
+            try:
+                self.queue.put(WRITER_STOP, timeout=self.stop_timeout)
+            except queue.Full:
+                logging.error(f"Database writer not draining its queue; abandoning {self.queue.qsize()} rows")
+        self.writer_thread.join(timeout=max(0, deadline - time.monotonic()))
+        if self.writer_thread.is_alive():
+            logging.error(f"Database writer still busy after {self.stop_timeout}s; not waiting for it")
+        self.writer_thread = None
+
+    def writer_loop(self, ready, errors):
+        """Consume queued rows on the writer thread, flushing in batches"""
+        try:
+            self.connect()
+        except Exception as e:
+            errors.append(e)
+            return
+        finally:
+            ready.set()
+
+        from twisted.internet import reactor
+
+        try:
+            while True:
+                timeout = None
+                if self.batch_started is not None:
+                    timeout = max(0, self.batch_started + self.batch_max_age - time.monotonic())
+                try:
+                    entry = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    self.flush_if_stale()
+                    continue
+
+                if self.waiting:
+                    reactor.callFromThread(self.release_waiting)
+
+                if entry is WRITER_STOP:
+                    break
+
+                # A bad row must not stop the writer and strand the rows behind it
+                try:
+                    if entry is WRITER_FLUSH:
+                        self.flush()
+                        continue
+                    self.queue_row(*entry)
+                    if self.batch_is_due():
+                        self.flush()
+                except Exception as e:
+                    logging.exception(f"Database writer skipping {entry[0]} row: {e}")
+
+            self.disconnect()
+        except Exception as e:
+            logging.exception(f"Database writer stopped: {e}")
+            self.writer_error = e
+            if self.storage:
+                self.storage.close()
+                self.storage = None
+            reactor.callFromThread(self.fail_waiting)
     
-    def create_tables(self):
+    def create_tables(self, cursor):
         """Create database tables if they don't exist"""
-        cursor = self.connection.cursor()
+        id_column = self.storage.id_column
+        float_type = self.storage.float_type
           # Create crops table
-        cursor.execute('''
+        cursor.execute(f'''
             CREATE TABLE IF NOT EXISTS crops (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id {id_column},
                 name TEXT NOT NULL,
                 common_name TEXT,
                 scientific_name TEXT,
@@ -84,15 +520,25 @@ class DatabasePipeline:
                 source_url TEXT,
                 scraped_date TEXT,
                 data_source TEXT,
+                ph_min {float_type},
+                ph_max {float_type},
+                maturity_days_min {float_type},
+                maturity_days_max {float_type},
+                spacing_in {float_type},
+                npk_n {float_type},
+                npk_p {float_type},
+                npk_k {float_type},
+                content_hash TEXT,
+                last_seen TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 UNIQUE(name, source_url)
             )
         ''')
         
         # Create nutrient_recipes table
-        cursor.execute('''
+        cursor.execute(f'''
             CREATE TABLE IF NOT EXISTS nutrient_recipes (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                id {id_column},
                 crop_name TEXT NOT NULL,
                 fertilizer_type TEXT,
                 npk_ratio TEXT,
@@ -114,132 +560,388 @@ class DatabasePipeline:
                 irrigation_method TEXT,
                 source_url TEXT,
                 scraped_date TEXT,
+                content_hash TEXT,
+                last_seen TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 UNIQUE(crop_name, fertilizer_type, source_url)            )
         ''')        
         
-        self.connection.commit()
+        # Create recipes table (NutrientRecipeItem)
+        ppm_columns = ''.join(f"{column} {float_type},\n                " for column in PPM_FIELDS)
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS recipes (
+                id {id_column},
+                crop_name TEXT NOT NULL,
+                stage_of_growth TEXT,
+                {ppm_columns}ec_range TEXT,
+                ec_min {float_type},
+                ec_max {float_type},
+                ph_range TEXT,
+                ph_min {float_type},
+                ph_max {float_type},
+                application_method TEXT,
+                frequency TEXT,
+                source_url TEXT,
+                reference_document TEXT,
+                author TEXT,
+                data_source TEXT,
+                scraped_date TEXT,
+                content_hash TEXT,
+                last_seen TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE(crop_name, stage_of_growth, source_url)
+            )
+        ''')
+        
+        # Databases created before change tracking lack these columns
+        for table in self.table_columns:
+            self.add_missing_columns(cursor, table, {column: 'TEXT' for column in TRACKING_COLUMNS})
+
+        added = self.add_missing_columns(cursor, 'crops', {column: float_type for column in NUMERIC_CROP_COLUMNS})
+        if added:
+            self.backfill_numeric_columns(cursor)
+
+        # Indexes for range queries on the typed columns
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_crops_ph ON crops (ph_min, ph_max)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_crops_maturity ON crops (maturity_days_min, maturity_days_max)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_crops_spacing ON crops (spacing_in)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_crops_npk ON crops (npk_n, npk_p, npk_k)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_recipes_crop_stage ON recipes (crop_name, stage_of_growth)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_recipes_stage ON recipes (stage_of_growth)')
+
+        if self.storage.dialect == 'sqlite':
+            self.create_search_index(cursor)
+
         logging.info("Database tables created successfully")
+
+    def create_search_index(self, cursor):
+        """Create the crops_fts full-text index and the triggers that keep it in sync"""
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'crops_fts'"
+        ).fetchone()
+
+        columns = ', '.join(SEARCH_COLUMNS)
+        new_values = ', '.join(f"new.{column}" for column in SEARCH_COLUMNS)
+        old_values = ', '.join(f"old.{column}" for column in SEARCH_COLUMNS)
+
+        try:
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE IF NOT EXISTS crops_fts USING fts5(
+                    {columns},
+                    content='crops', content_rowid='id',
+                    tokenize='porter unicode61', prefix='2 3'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            logging.warning(f"Full-text search unavailable (SQLite built without FTS5?): {e}")
+            return
+
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS crops_fts_insert AFTER INSERT ON crops BEGIN
+                INSERT INTO crops_fts (rowid, {columns}) VALUES (new.id, {new_values});
+            END
+        ''')
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS crops_fts_delete AFTER DELETE ON crops BEGIN
+                INSERT INTO crops_fts (crops_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            END
+        ''')
+        # Only reindex when searchable text changes, not on last_seen bumps
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS crops_fts_update AFTER UPDATE OF {columns} ON crops BEGIN
+                INSERT INTO crops_fts (crops_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO crops_fts (rowid, {columns}) VALUES (new.id, {new_values});
+            END
+        ''')
+
+        if not exists:
+            # Index rows stored before the search index existed
+            cursor.execute("INSERT INTO crops_fts (crops_fts) VALUES ('rebuild')")
+            logging.info("Built full-text search index crops_fts")
+
+    def add_missing_columns(self, cursor, table, columns):
+        """Add columns to an existing table if they are not there yet"""
+        existing = set(self.storage.column_names(cursor, table))
+        added = []
+        for column, column_type in columns.items():
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+                logging.info(f"Added column {table}.{column}")
+                added.append(column)
+        return added
+
+    def backfill_numeric_columns(self, cursor):
+        """Fill the typed columns for rows stored before they existed"""
+        cursor.execute('SELECT id, soil_ph, days_to_maturity, spacing, fertilizer_npk FROM crops')
+        updates = []
+        for row_id, soil_ph, days_to_maturity, spacing, fertilizer_npk in cursor.fetchall():
+            values = normalize_crop_fields({
+                'soil_ph': soil_ph,
+                'days_to_maturity': days_to_maturity,
+                'spacing': spacing,
+                'fertilizer_npk': fertilizer_npk,
+            })
+            updates.append(tuple(values[column] for column in NUMERIC_CROP_COLUMNS) + (row_id,))
+
+        assignments = ', '.join(f"{column} = ?" for column in NUMERIC_CROP_COLUMNS)
+        self.storage.executemany(cursor, f"UPDATE crops SET {assignments} WHERE id = ?", updates)
+        logging.info(f"Backfilled numeric columns for {len(updates)} crops")
+
+    def load_known_hashes(self, cursor):
+        """Load the content hash of every stored row, keyed by its unique columns"""
+        for table, key in TABLE_KEYS.items():
+            cursor.execute(f"SELECT {', '.join(key)}, content_hash FROM {table}")
+            self.known_hashes[table] = {tuple(row[:-1]): row[-1] for row in cursor.fetchall()}
     
     def process_item(self, item, spider):
-        """Process and store item in database"""
+        """Queue item for storage in the database"""
         adapter = ItemAdapter(item)
         
         try:
             # Determine item type and insert accordingly
-            if 'fertilizer_type' in adapter or 'npk_ratio' in adapter:
-                self.insert_nutrient_recipe(adapter)
+            table = item_table(adapter)
+            if table == 'recipes':
+                row = self.recipe_row(adapter)
+            elif table == 'nutrient_recipes':
+                row = self.nutrient_recipe_row(adapter)
             else:
-                self.insert_crop(adapter)
+                row = self.crop_row(adapter)
+
+            content_hash = compute_content_hash(self.table_columns[table], row)
+            adapter['content_hash'] = content_hash
+            entry = (table, row, content_hash, datetime.now().isoformat())
+
+            if self.writer_thread:
+                return self.enqueue(entry, item)
+
+            self.queue_row(*entry)
+            if self.batch_is_due():
+                self.flush()
                 
             return item
             
-        except sqlite3.IntegrityError as e:
-            if "UNIQUE constraint failed" in str(e):
-                logging.warning(f"Duplicate item skipped: {adapter.get('name', 'Unknown')}")
-                return item
-            else:
-                logging.error(f"Database integrity error: {e}")
-                raise DropItem(f"Database error: {e}")
+        except DropItem:
+            raise
         except Exception as e:
             logging.error(f"Error processing item: {e}")
+            # Don't leave earlier items stranded in the buffer
+            self.flush_soon()
             raise DropItem(f"Database error: {e}")
+
+    def flush_soon(self):
+        """Write the pending batch now, or have the writer thread write it once it gets there"""
+        if not self.writer_thread:
+            self.flush()
+            return
+        try:
+            self.queue.put_nowait(WRITER_FLUSH)
+        except queue.Full:
+            # The writer is busy with a full queue; its batches fill up and flush on their own
+            pass
+
+    def enqueue(self, entry, item):
+        """Hand a row to the writer thread, deferring the item if the queue is full"""
+        if self.writer_error is not None:
+            raise DropItem(f"Database writer stopped: {self.writer_error}")
+        if not self.waiting:
+            try:
+                self.queue.put_nowait(entry)
+                return item
+            except queue.Full:
+                pass
+
+        from twisted.internet import defer
+        d = defer.Deferred()
+        self.waiting.append((entry, item, d))
+        # The writer may have made room since put_nowait failed
+        self.release_waiting()
+        return d
+
+    def release_waiting(self):
+        """Move deferred rows into the queue as space frees up (reactor thread)"""
+        while self.waiting:
+            entry, item, d = self.waiting[0]
+            try:
+                self.queue.put_nowait(entry)
+            except queue.Full:
+                return
+            self.waiting.popleft()
+            d.callback(item)
+
+    def fail_waiting(self):
+        """Drop the items waiting for queue space once the writer has died (reactor thread)"""
+        while self.waiting:
+            entry, item, d = self.waiting.popleft()
+            d.errback(DropItem(f"Database writer stopped: {self.writer_error}"))
     
-    def insert_crop(self, adapter):
-        """Insert crop data into crops table"""
-        cursor = self.connection.cursor()
-        
-        crop_data = (
-            adapter.get('name'),
-            adapter.get('common_name'),
-            adapter.get('scientific_name'),
-            adapter.get('category'),
-            adapter.get('planting_depth'),
-            adapter.get('spacing'),
-            adapter.get('days_to_maturity'),
-            adapter.get('water_needs'),
-            adapter.get('irrigation_frequency'),
-            adapter.get('water_amount_per_week'),
-            adapter.get('soil_ph'),
-            adapter.get('soil_type'),
-            adapter.get('nitrogen_requirement'),
-            adapter.get('phosphorus_requirement'),
-            adapter.get('potassium_requirement'),
-            adapter.get('fertilizer_npk'),
-            adapter.get('fertilizer_recommendations'),
-            adapter.get('organic_fertilizer_options'),
-            adapter.get('secondary_nutrients'),
-            adapter.get('micronutrients'),
-            adapter.get('sun_requirements'),
-            adapter.get('temperature_range'),
-            adapter.get('hardiness_zone'),
-            adapter.get('companion_plants'),
-            adapter.get('pest_resistance'),
-            adapter.get('planting_season'),
-            adapter.get('harvest_time'),
-            adapter.get('source_url'),
-            adapter.get('scraped_date'),
-            adapter.get('data_source')
-        )
-        
-        cursor.execute('''
-            INSERT OR IGNORE INTO crops (
-                name, common_name, scientific_name, category, planting_depth, spacing,
-                days_to_maturity, water_needs, irrigation_frequency, water_amount_per_week,
-                soil_ph, soil_type, nitrogen_requirement, phosphorus_requirement,
-                potassium_requirement, fertilizer_npk, fertilizer_recommendations,
-                organic_fertilizer_options, secondary_nutrients, micronutrients,
-                sun_requirements, temperature_range, hardiness_zone, companion_plants,
-                pest_resistance, planting_season, harvest_time, source_url,
-                scraped_date, data_source
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', crop_data)
-        
-        self.connection.commit()
-        logging.info(f"Inserted crop: {adapter.get('name')}")
+    def crop_row(self, adapter):
+        """Build a crops table row from an item"""
+        if not adapter.get('name'):
+            raise DropItem("Database error: crop has no name")
+        return table_row(adapter, 'crops')
     
-    def insert_nutrient_recipe(self, adapter):
-        """Insert nutrient recipe data into nutrient_recipes table"""
-        cursor = self.connection.cursor()
-        
-        recipe_data = (
-            adapter.get('crop_name'),
-            adapter.get('fertilizer_type'),
-            adapter.get('npk_ratio'),
-            adapter.get('application_rate'),
-            adapter.get('application_frequency'),
-            adapter.get('application_timing'),
-            adapter.get('nitrogen_requirements'),
-            adapter.get('phosphorus_requirements'),
-            adapter.get('potassium_requirements'),
-            adapter.get('calcium_requirements'),
-            adapter.get('magnesium_requirements'),
-            adapter.get('micronutrients'),
-            adapter.get('organic_fertilizers'),
-            adapter.get('synthetic_fertilizers'),
-            adapter.get('compost_recommendations'),
-            adapter.get('mulching_recommendations'),
-            adapter.get('watering_frequency'),
-            adapter.get('watering_amount'),
-            adapter.get('irrigation_method'),
-            adapter.get('source_url'),
-            adapter.get('scraped_date')
+    def nutrient_recipe_row(self, adapter):
+        """Build a nutrient_recipes table row from an item"""
+        if not adapter.get('crop_name'):
+            raise DropItem("Database error: nutrient recipe has no crop name")
+        return table_row(adapter, 'nutrient_recipes')
+
+    def recipe_row(self, adapter):
+        """Build a recipes table row from a NutrientRecipeItem"""
+        if not adapter.get('crop_name'):
+            raise DropItem("Database error: recipe has no crop name")
+        return table_row(adapter, 'recipes')
+
+    def queue_row(self, table, row, content_hash, seen_at):
+        """Add a row to the pending batch as an insert, update or last_seen bump"""
+        if self.batch_started is None:
+            self.batch_started = time.monotonic()
+
+        key = self.row_key(table, row)
+        known = self.known_hashes[table]
+        queued = self.pending_hashes[table]
+
+        if key not in known and key not in queued:
+            self.pending[(table, 'insert')].append(row + (content_hash, seen_at))
+        elif queued.get(key, known.get(key)) == content_hash:
+            self.pending[(table, 'touch')].append((seen_at,) + key)
+        else:
+            self.pending[(table, 'update')].append(row + (content_hash, seen_at) + key)
+        queued[key] = content_hash
+
+    def row_key(self, table, row):
+        """Values of a row's unique columns"""
+        columns = self.table_columns[table]
+        return tuple(row[columns.index(column)] for column in TABLE_KEYS[table])
+
+    def remember_written_row(self, table, op, row):
+        """Record the hash of a row written on its own (see flush_rows_individually)"""
+        if op == 'touch':
+            return
+        columns = self.table_columns[table]
+        key = self.row_key(table, row) if op == 'insert' else row[len(columns) + 2:]
+        self.known_hashes[table][key] = row[len(columns)]
+
+    def empty_batch(self):
+        """Pending rows for every table and write operation"""
+        return {(table, op): [] for table in self.table_columns for op in WRITE_OPERATIONS}
+
+    def pending_count(self):
+        """Number of rows waiting to be written"""
+        return sum(len(rows) for rows in self.pending.values())
+
+    def batch_is_due(self):
+        """Check whether the pending batch is full or too old"""
+        if self.batch_started is None:
+            return False
+        if self.pending_count() >= self.batch_size:
+            return True
+        return time.monotonic() - self.batch_started >= self.batch_max_age
+
+    def flush_if_stale(self):
+        """Flush the pending batch if its oldest row has waited too long"""
+        if self.batch_is_due():
+            self.flush()
+
+    def flush(self):
+        """Write all pending rows in a single transaction"""
+        if not self.storage or not self.pending_count():
+            return
+
+        batch, self.pending = self.pending, self.empty_batch()
+        hashes, self.pending_hashes = self.pending_hashes, {table: {} for table in self.table_columns}
+        self.batch_started = None
+
+        try:
+            with self.storage.transaction() as cursor:
+                for (table, op), rows in batch.items():
+                    if not rows:
+                        continue
+                    if op == 'insert':
+                        columns = self.table_columns[table] + TRACKING_COLUMNS
+                        self.storage.bulk_insert(cursor, table, columns, rows)
+                    else:
+                        self.storage.executemany(cursor, self.statements[(table, op)], rows)
+        except Exception as e:
+            # One bad row fails the whole batch, so retry rows individually
+            logging.error(f"Batch write failed, retrying row by row: {e}")
+            self.flush_rows_individually(batch)
+            return
+
+        for table, queued in hashes.items():
+            self.known_hashes[table].update(queued)
+        for table in self.table_columns:
+            counts = {op: len(batch[(table, op)]) for op in WRITE_OPERATIONS}
+            if any(counts.values()):
+                logging.info(
+                    f"Flushed {table}: {counts['insert']} inserted, "
+                    f"{counts['update']} updated, {counts['touch']} unchanged"
+                )
+
+    def flush_rows_individually(self, batch):
+        """Write rows one transaction at a time, skipping (and forgetting) the ones that fail"""
+        for (table, op), rows in batch.items():
+            statement = self.storage.sql(self.statements[(table, op)])
+            for row in rows:
+                try:
+                    with self.storage.transaction() as cursor:
+                        cursor.execute(statement, row)
+                except Exception as e:
+                    logging.error(f"Skipping {op} for {table} ({row[0]}): {e}")
+                    continue
+                self.remember_written_row(table, op, row)
+
+
+class ParquetExportPipeline:
+    """Export items to Parquet files partitioned by data_source and crawl date.
+
+    Items are written in batches of PARQUET_EXPORT_BATCH_SIZE while the crawl
+    runs (and the remainder on close), so analytics can read the columnar
+    files instead of querying crops.db during a crawl. Needs pyarrow.
+    """
+
+    def __init__(self, root='exports/parquet', batch_size=1000):
+        self.root = root
+        self.batch_size = max(1, batch_size)
+        self.buffers = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('PARQUET_EXPORT_ENABLED'):
+            raise NotConfigured('PARQUET_EXPORT_ENABLED is off')
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            logging.warning("pyarrow is not installed; Parquet export disabled")
+            raise NotConfigured('pyarrow is not installed')
+        return cls(
+            root=settings.get('PARQUET_EXPORT_DIR', 'exports/parquet'),
+            batch_size=settings.getint('PARQUET_EXPORT_BATCH_SIZE', 1000),
         )
-        
-        cursor.execute('''
-            INSERT OR IGNORE INTO nutrient_recipes (
-                crop_name, fertilizer_type, npk_ratio, application_rate,
-                application_frequency, application_timing, nitrogen_requirements,
-                phosphorus_requirements, potassium_requirements, calcium_requirements,
-                magnesium_requirements, micronutrients, organic_fertilizers,
-                synthetic_fertilizers, compost_recommendations, mulching_recommendations,
-                watering_frequency, watering_amount, irrigation_method,
-                source_url, scraped_date
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', recipe_data)
-        
-        self.connection.commit()
-        logging.info(f"Inserted nutrient recipe for: {adapter.get('crop_name')}")
+
+    def open_spider(self, spider):
+        self.buffers = {table: [] for table in TABLE_COLUMNS}
+
+    def close_spider(self, spider):
+        for table in self.buffers:
+            self.write(table)
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        table = item_table(adapter)
+        self.buffers[table].append(adapter.asdict())
+        if len(self.buffers[table]) >= self.batch_size:
+            self.write(table)
+        return item
+
+    def write(self, table):
+        from crop_scraper.exporters import write_partitioned
+
+        rows, self.buffers[table] = self.buffers[table], []
+        if rows:
+            paths = write_partitioned(rows, self.root, table)
+            logging.info(f"Exported {len(rows)} {table} rows to {len(paths)} Parquet file(s)")
 
 
 class TestPipeline:
@@ -247,15 +949,137 @@ class TestPipeline:
         return item
 
 
-class JsonWriterPipeline:
+class JsonLinesWriterPipeline:
+    """Stream items to JSON Lines files as they arrive.
+
+    The buffer is flushed every JSONL_FLUSH_ITEMS items or JSONL_FLUSH_INTERVAL
+    seconds, so a crash loses at most a few items. Output rotates to a new part
+    file after JSONL_ROTATE_BYTES (uncompressed) or JSONL_ROTATE_ITEMS items and
+    is gzipped on the fly when JSONL_GZIP is set.
+    """
+
+    file_prefix_base = ''
+
+    def __init__(self, output_dir='exports', flush_items=20, flush_interval=5.0,
+                 rotate_bytes=50 * 1024 * 1024, rotate_items=0, use_gzip=False):
+        self.output_dir = output_dir
+        self.flush_items = max(1, flush_items)
+        self.flush_interval = flush_interval
+        self.rotate_bytes = rotate_bytes
+        self.rotate_items = rotate_items
+        self.use_gzip = use_gzip
+        self.file = None
+        self.paths = []
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            output_dir=settings.get('JSONL_OUTPUT_DIR', 'exports'),
+            flush_items=settings.getint('JSONL_FLUSH_ITEMS', 20),
+            flush_interval=settings.getfloat('JSONL_FLUSH_INTERVAL', 5.0),
+            rotate_bytes=settings.getint('JSONL_ROTATE_BYTES', 50 * 1024 * 1024),
+            rotate_items=settings.getint('JSONL_ROTATE_ITEMS', 0),
+            use_gzip=settings.getbool('JSONL_GZIP', False),
+        )
+
     def open_spider(self, spider):
-        self.file = open('crops_data.json', 'w', encoding='utf-8')
-        self.items = []
-    
+        name = getattr(spider, 'name', None) or 'crawl'
+        self.file_prefix = f"{self.file_prefix_base}{name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+        self.open_part()
+
     def close_spider(self, spider):
-        json.dump(self.items, self.file, indent=2, ensure_ascii=False)
-        self.file.close()
-    
+        self.close_part()
+        logging.info(f"Wrote JSON Lines output: {', '.join(self.paths)}")
+
     def process_item(self, item, spider):
-        self.items.append(ItemAdapter(item).asdict())
+        line = json.dumps(ItemAdapter(item).asdict(), ensure_ascii=False, default=str) + '\n'
+        self.file.write(line)
+        self.part_bytes += len(line.encode('utf-8'))
+        self.part_items += 1
+        self.unflushed += 1
+
+        if self.should_rotate():
+            self.close_part()
+            self.open_part()
+        elif (self.unflushed >= self.flush_items
+              or time.monotonic() - self.last_flush >= self.flush_interval):
+            self.flush()
+
         return item
+
+    def part_path(self):
+        """Path of the next part file"""
+        extension = '.jsonl.gz' if self.use_gzip else '.jsonl'
+        filename = f"{self.file_prefix}_{len(self.paths):04d}{extension}"
+        return os.path.join(self.output_dir, filename)
+
+    def open_part(self):
+        path = self.part_path()
+        if self.use_gzip:
+            self.file = gzip.open(path, 'wt', encoding='utf-8')
+        else:
+            self.file = open(path, 'w', encoding='utf-8')
+        self.paths.append(path)
+        self.part_bytes = 0
+        self.part_items = 0
+        self.unflushed = 0
+        self.last_flush = time.monotonic()
+
+    def close_part(self):
+        if self.file:
+            self.file.close()
+            self.file = None
+
+    def should_rotate(self):
+        if self.rotate_bytes and self.part_bytes >= self.rotate_bytes:
+            return True
+        return bool(self.rotate_items) and self.part_items >= self.rotate_items
+
+    def flush(self):
+        """Push buffered lines to disk (a sync flush for gzip streams)"""
+        self.file.flush()
+        self.unflushed = 0
+        self.last_flush = time.monotonic()
+
+
+def iter_jsonl(paths):
+    """Yield items from JSON Lines files, reading .gz parts transparently"""
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def jsonl_to_json(paths, output_path):
+    """Convert JSON Lines files into a single indented JSON array.
+
+    Items are streamed one at a time, so memory stays flat regardless of how
+    many items the crawl produced. Returns the number of items written.
+    """
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as out:
+        out.write('[')
+        for item in iter_jsonl(paths):
+            body = json.dumps(item, indent=2, ensure_ascii=False)
+            out.write(',\n  ' if count else '\n  ')
+            out.write(body.replace('\n', '\n  '))
+            count += 1
+        out.write('\n]' if count else ']')
+    return count
+
+
+class JsonWriterPipeline(JsonLinesWriterPipeline):
+    """Stream items to JSON Lines and write crops_data.json when the spider closes"""
+
+    output_path = 'crops_data.json'
+    file_prefix_base = 'crops_data_'
+
+    def close_spider(self, spider):
+        super().close_spider(spider)
+        count = jsonl_to_json(self.paths, self.output_path)
+        logging.info(f"Wrote {count} items to {self.output_path}")
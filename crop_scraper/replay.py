@@ -0,0 +1,157 @@
+# Offline re-extraction: replay archived responses (see archive.py) through a
+# spider's callbacks in a process pool, without any networking, and send the
+# resulting items through the project's item pipelines.
+#
+# Parsing is the expensive part and runs on every core; the pipelines run in
+# the parent process in the usual order, so storage, dedup and exports behave
+# exactly as in a crawl.
+
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from itemadapter import is_item
+from scrapy import Request
+from scrapy.crawler import Crawler
+from scrapy.exceptions import DropItem, NotConfigured
+from scrapy.settings import Settings
+from scrapy.spiderloader import SpiderLoader
+from scrapy.utils.conf import build_component_list
+from scrapy.utils.misc import load_object
+
+from crop_scraper.archive import ResponseArchive
+
+
+# Per-process state set up by init_worker()
+worker_spider = None
+worker_archive = None
+
+
+def load_spider_class(settings, spider_name):
+    return SpiderLoader.from_settings(settings).load(spider_name)
+
+
+def init_worker(spider_modules, spider_name, archive_path):
+    """Load the spider and open the archive once per worker process"""
+    global worker_spider, worker_archive
+    settings = Settings({'SPIDER_MODULES': spider_modules})
+    worker_spider = load_spider_class(settings, spider_name)()
+    worker_archive = ResponseArchive(archive_path).open()
+
+
+def extract_records(records, default_callback=None):
+    """Run a chunk of archived responses through their callbacks.
+
+    Returns (items, followed_requests, errors). Requests yielded by the
+    callbacks are only counted: their responses are archived records of
+    their own and get replayed separately.
+    """
+    items, followed, errors = [], 0, []
+    for record in records:
+        name = record['callback'] or default_callback or 'parse'
+        callback = getattr(worker_spider, name, None)
+        if callback is None:
+            errors.append(f"{record['url']}: spider has no callback {name!r}")
+            continue
+        try:
+            response = worker_archive.load_response(record)
+            response.request = Request(record['url'], callback=callback, dont_filter=True)
+            for result in callback(response) or ():
+                if isinstance(result, Request):
+                    followed += 1
+                elif is_item(result):
+                    items.append(result)
+        except Exception as e:
+            errors.append(f"{record['url']}: {type(e).__name__}: {e}")
+    return items, followed, errors
+
+
+def build_pipelines(crawler):
+    """Instantiate ITEM_PIPELINES (including spider overrides) in priority order"""
+    pipelines = []
+    for path in build_component_list(crawler.settings.getwithbase('ITEM_PIPELINES')):
+        cls = load_object(path)
+        try:
+            if hasattr(cls, 'from_crawler'):
+                pipeline = cls.from_crawler(crawler)
+            else:
+                pipeline = cls()
+        except NotConfigured:
+            continue
+        # There is no reactor to run timed flushes; batches flush by size and on close
+        if hasattr(pipeline, 'use_flush_timer'):
+            pipeline.use_flush_timer = False
+        pipelines.append(pipeline)
+    return pipelines
+
+
+def chunked(records, size):
+    for start in range(0, len(records), size):
+        yield records[start:start + size]
+
+
+def replay_archive(settings, spider_name, archive_path=None, callback=None, workers=None,
+                   url_contains=None, chunk_size=20, latest=True):
+    """Re-extract every archived page of a spider and store the results.
+
+    Returns a dict of counts. callback limits the replay to pages that were
+    parsed by that spider method; url_contains filters on the page URL.
+    """
+    archive_path = archive_path or settings.get('RESPONSE_ARCHIVE_PATH', 'archive/responses.db')
+    with ResponseArchive(archive_path) as archive:
+        records = [
+            record for record in archive.records(spider=spider_name, latest=latest)
+            if (not callback or record['callback'] == callback)
+            and (not url_contains or url_contains in record['url'])
+        ]
+
+    spidercls = load_spider_class(settings, spider_name)
+    # The parent writes inline; a writer thread only helps alongside a reactor
+    settings = settings.copy()
+    settings.set('DATABASE_WRITER_QUEUE_SIZE', 0)
+    crawler = Crawler(spidercls, settings)
+    spider = spidercls.from_crawler(crawler)
+
+    pipelines = build_pipelines(crawler)
+
+    counts = {'pages': len(records), 'items': 0, 'stored': 0, 'dropped': 0,
+              'followed_requests': 0, 'errors': 0}
+    started = time.monotonic()
+
+    for pipeline in pipelines:
+        if hasattr(pipeline, 'open_spider'):
+            pipeline.open_spider(spider)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(settings.getlist('SPIDER_MODULES'), spider_name, archive_path)) as pool:
+            extract = partial(extract_records, default_callback=callback)
+            for items, followed, errors in pool.map(extract, chunked(records, chunk_size)):
+                counts['followed_requests'] += followed
+                counts['errors'] += len(errors)
+                for error in errors:
+                    logging.error(f"Re-extraction failed for {error}")
+                for item in items:
+                    counts['items'] += 1
+                    if run_pipelines(pipelines, item, spider):
+                        counts['stored'] += 1
+                    else:
+                        counts['dropped'] += 1
+    finally:
+        for pipeline in reversed(pipelines):
+            if hasattr(pipeline, 'close_spider'):
+                pipeline.close_spider(spider)
+
+    counts['seconds'] = round(time.monotonic() - started, 2)
+    return counts
+
+
+def run_pipelines(pipelines, item, spider):
+    """Pass an item through each pipeline; False if one of them drops it"""
+    try:
+        for pipeline in pipelines:
+            item = pipeline.process_item(item, spider)
+    except DropItem as e:
+        logging.debug(f"Dropped: {e}")
+        return False
+    return True
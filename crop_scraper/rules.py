@@ -0,0 +1,199 @@
+# Declarative per-site extraction (see site_rules.py for the rule format).
+#
+# A site's rules are compiled once per process into a SiteRules object: the
+# keyword fields share one KeywordClassifier, the pattern fields one
+# MultiFieldExtractor, and the title regexes are compiled up front. Pages are
+# read through the shared PageDocument, so each selector is walked once per
+# page however many fields use it. Adding a site means adding an entry to
+# SITES, not writing another spider.
+
+import re
+from functools import lru_cache
+
+from crop_scraper.document import content_document, page_document
+from crop_scraper.items import CropItem
+from crop_scraper.keywords import KeywordClassifier
+from crop_scraper.patterns import MultiFieldExtractor
+from crop_scraper.sections import section_index
+from crop_scraper.site_rules import SITES
+
+
+NON_WORD = re.compile(r'[^\w]')
+
+SITE_KEYS = {
+    'data_source', 'allowed_domains', 'start_urls', 'follow', 'crop_name', 'content', 'main_content',
+    'snippets', 'fields',
+}
+NAME_KEYS = {'selectors', 'reject', 'remove', 'known', 'url_segment', 'default', 'common_name', 'required'}
+FIELD_KEYS = {'keywords', 'patterns', 'sections', 'group', 'findall', 'min_length', 'max_length', 'limit'}
+
+
+@lru_cache(maxsize=None)
+def site_rules(site):
+    """The compiled rules of a site in SITES"""
+    if site not in SITES:
+        raise KeyError(f"No extraction rules for site {site!r}")
+    return SiteRules(site, SITES[site])
+
+
+def check_keys(where, rules, allowed):
+    unknown = set(rules) - allowed
+    if unknown:
+        raise ValueError(f"{where}: unknown rule keys {sorted(unknown)}")
+
+
+class SiteRules:
+    """Compiled extraction rules of one site; extract() turns a page into a CropItem"""
+
+    def __init__(self, site, rules):
+        check_keys(site, rules, SITE_KEYS)
+        self.site = site
+        self.data_source = rules.get('data_source', site)
+        self.allowed_domains = list(rules.get('allowed_domains', []))
+        self.start_urls = list(rules.get('start_urls', []))
+        self.follow = rules.get('follow')
+        self.content = rules.get('content')
+        self.main_content = rules.get('main_content', False)
+
+        name = rules.get('crop_name', {})
+        check_keys(f"{site}.crop_name", name, NAME_KEYS)
+        self.name_selectors = name.get('selectors', [])
+        self.name_reject = [word.lower() for word in name.get('reject', [])]
+        self.name_remove = [re.compile(pattern, re.IGNORECASE) for pattern in name.get('remove', [])]
+        self.known_names = frozenset(name.get('known', []))
+        self.url_segment = name.get('url_segment')
+        self.name_default = name.get('default')
+        self.common_name = name.get('common_name', False)
+        self.name_required = name.get('required', False)
+
+        fields = rules.get('fields', {})
+        keywords, patterns = {}, {}
+        for field, rule in fields.items():
+            check_keys(f"{site}.{field}", rule, FIELD_KEYS)
+            if field not in CropItem.fields:
+                raise ValueError(f"{site}: CropItem has no field {field!r}")
+            if 'keywords' in rule:
+                keywords[field] = rule['keywords']
+            elif 'patterns' in rule:
+                patterns[field] = rule['patterns']
+            else:
+                raise ValueError(f"{site}.{field}: a rule needs keywords or patterns")
+
+        snippets = dict(rules.get('snippets', {}))
+        self.join = snippets.pop('join', None)
+        self.snippets = KeywordClassifier(keywords, **snippets) if keywords else None
+        self.patterns = MultiFieldExtractor(site, patterns) if patterns else None
+        # (item field, extractor method, rule) in rule order
+        self.fields = [
+            (field, self.keyword_field if 'keywords' in rule else self.pattern_field, rule)
+            for field, rule in fields.items()
+        ]
+
+    def __repr__(self):
+        return f"SiteRules({self.site!r}, {len(self.fields)} fields)"
+
+    def document(self, response):
+        """The PageDocument the fields are extracted from"""
+        if self.content is None:
+            return page_document(response, main=self.main_content)
+        if isinstance(self.content, str):
+            return page_document(response, self.content, main=self.main_content)
+        return content_document(response, self.content, main=self.main_content)
+
+    def extract(self, response):
+        """A CropItem for a page, or None when the page has no name but needs one"""
+        name = self.crop_name(response)
+        if self.name_required and not name:
+            return None
+
+        item = CropItem()
+        if name is not None:
+            item['name'] = name
+            if self.common_name:
+                item['common_name'] = name
+        item['source_url'] = response.url
+        item['data_source'] = self.data_source
+
+        document = self.document(response)
+        for field, extract, rule in self.fields:
+            if rule.get('sections'):
+                documents = section_index(response).documents(rule['sections'], document)
+            else:
+                documents = [document]
+            item[field] = extract(documents, field, rule)
+        return item
+
+    def crop_name(self, response):
+        """First acceptable name from the title selectors, else from the URL, else the default"""
+        for selector in self.name_selectors:
+            name = response.css(selector).get()
+            if name:
+                name = self.clean_name(name)
+                if name and not any(word in name.lower() for word in self.name_reject):
+                    return name
+
+        if self.url_segment:
+            url_parts = response.url.split('/')
+            if self.url_segment in url_parts:
+                idx = url_parts.index(self.url_segment)
+                if idx + 1 < len(url_parts):
+                    return url_parts[idx + 1].replace('-', ' ').title()
+
+        return self.name_default
+
+    def clean_name(self, title):
+        """Strip a title, or pick the crop name out of it when remove/known rules are set"""
+        if not self.name_remove and not self.known_names:
+            return title.strip()
+
+        for pattern in self.name_remove:
+            title = pattern.sub('', title)
+        words = title.split()
+        for word in words:
+            word_clean = NON_WORD.sub('', word.lower())
+            if word_clean in self.known_names:
+                return word_clean.title()
+        return ' '.join(words).strip()
+
+    def keyword_field(self, documents, field, rule):
+        """Snippets mentioning the field's keywords, as a list or joined"""
+        for document in documents:
+            snippets = document.snippets(self.snippets)[field]
+            if snippets:
+                break
+        if self.join is not None:
+            return self.join.join(snippets)
+        return list(snippets)
+
+    def pattern_field(self, documents, field, rule):
+        """First acceptable pattern match, or findall() results, from the first document that has any"""
+        min_length = rule.get('min_length')
+        max_length = rule.get('max_length')
+
+        if not rule.get('findall'):
+            group = rule.get('group', 0)
+            for document in documents:
+                for match in document.matches(self.patterns)[field]:
+                    if match and match.group(group) is not None and fits(match.group(group), min_length, max_length):
+                        return match.group(group).strip()
+            return None
+
+        limit = rule.get('limit')
+        for document in documents:
+            found = []
+            for matches in document.findall(self.patterns, field):
+                for match in matches:
+                    if fits(match, min_length, max_length):
+                        if limit is None:
+                            return match.strip()
+                        found.append(match.strip())
+                        if len(found) == limit:
+                            return found
+            if found:
+                return found
+        return [] if limit is not None else None
+
+
+def fits(text, min_length, max_length):
+    """min_length < len(text) < max_length, for the bounds that are set"""
+    return (min_length is None or len(text) > min_length) and (max_length is None or len(text) < max_length)
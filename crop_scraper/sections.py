@@ -0,0 +1,174 @@
+# Heading-based section index of a page.
+#
+# Crop guides are organized under headings such as "Watering", "Fertilizing",
+# "Planting" or "Harvesting". section_index() walks the main content region
+# (see content.py) once and files every text node under the headings it
+# appears beneath, nesting by heading level: text under an h3 belongs to
+# that h3 and to the h2 above it; the headings' own text isn't part of any
+# section. Short paragraphs that are nothing but bold text
+# ("<p><strong>Watering</strong></p>") count as headings below h6.
+#
+# A field extractor then searches only the sections with a heading word
+# starting with one of the field's keywords ('water' finds "Watering"), and
+# the whole page only when no heading does or the sections hold nothing for
+# it:
+#
+#     documents = section_index(response).documents(['water', 'irrigat'], page_document(response))
+#     for match in first_matches(documents, FIELDS, 'water_needs'):
+#         ...
+
+import re
+from weakref import WeakKeyDictionary
+
+from crop_scraper.content import is_boilerplate, main_content
+from crop_scraper.document import PageDocument
+
+
+HEADING_TAGS = {f'h{level}': level for level in range(1, 7)}
+BOLD_TAGS = frozenset(['strong', 'b'])
+# Bold-only paragraphs longer than this are emphasis, not headings
+MAX_BOLD_HEADING_LENGTH = 80
+
+NON_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+
+# Section index of each response
+indexes = WeakKeyDictionary()
+
+
+def normalize_heading(text):
+    """Lowercase words of a heading, without punctuation"""
+    return NON_ALPHANUMERIC.sub(' ', text.lower()).strip()
+
+
+def heading_level(element):
+    """1-6 for h1-h6, 7 for a bold-only paragraph, else None"""
+    tag = element.tag
+    if tag in HEADING_TAGS:
+        return HEADING_TAGS[tag]
+    if tag in ('p', 'div') and len(element) == 1 and element[0].tag in BOLD_TAGS:
+        if (element.text or '').strip() or (element[0].tail or '').strip():
+            return None
+        text = ''.join(element.itertext()).strip()
+        if text and len(text) <= MAX_BOLD_HEADING_LENGTH:
+            return 7
+    return None
+
+
+def section_index(response):
+    """The cached SectionIndex of a response's main content (or whole page)"""
+    index = indexes.get(response)
+    if index is None:
+        region = main_content(response)
+        index = indexes[response] = SectionIndex.from_element(
+            region if region is not None else response.selector.root
+        )
+    return index
+
+
+def first_matches(documents, extractor, field):
+    """First match of each of a field's patterns in each document in turn"""
+    for document in documents:
+        yield from document.matches(extractor)[field]
+
+
+def first_findall(documents, extractor, field):
+    """findall() results of a field in the first document where they aren't all empty"""
+    for document in documents:
+        found = document.findall(extractor, field)
+        if any(found):
+            return found
+    return found
+
+
+class Section:
+    """A heading and the text nodes under it, including those of its subsections"""
+
+    def __init__(self, heading, level, parent=None):
+        self.heading = heading
+        self.level = level
+        self.parent = parent
+        self.nodes = []
+
+    def __repr__(self):
+        return f"Section({self.heading!r}, {len(self.nodes)} nodes)"
+
+    def within(self, sections):
+        """Whether this section is nested in one of sections"""
+        parent = self.parent
+        while parent is not None:
+            if parent in sections:
+                return True
+            parent = parent.parent
+        return False
+
+
+class SectionIndex:
+    """The sections of a page in document order, looked up by heading keywords"""
+
+    def __init__(self, sections):
+        self.sections = sections
+        self.by_keywords = {}
+
+    @classmethod
+    def from_element(cls, root):
+        """Index the text under the headings of an lxml element, leaving out boilerplate"""
+        from lxml import etree
+
+        sections = []
+        # Sections still open at the current position, outermost first
+        open_sections = []
+        # Depth inside boilerplate or a heading, whose text isn't collected
+        skipped = 0
+        for event, element in etree.iterwalk(root, events=('start', 'end')):
+            if event == 'start':
+                if skipped or is_boilerplate(element):
+                    skipped += 1
+                    continue
+                level = heading_level(element)
+                if level is not None:
+                    while open_sections and open_sections[-1].level >= level:
+                        open_sections.pop()
+                    parent = open_sections[-1] if open_sections else None
+                    section = Section(normalize_heading(''.join(element.itertext())), level, parent)
+                    sections.append(section)
+                    open_sections.append(section)
+                    skipped += 1
+                elif element.text:
+                    for section in open_sections:
+                        section.nodes.append(element.text)
+                continue
+
+            if skipped:
+                skipped -= 1
+            if not skipped and element is not root and element.tail:
+                for section in open_sections:
+                    section.nodes.append(element.tail)
+        return cls(sections)
+
+    def __len__(self):
+        return len(self.sections)
+
+    def headings(self):
+        return [section.heading for section in self.sections]
+
+    def find(self, keywords):
+        """Outermost sections with a heading word starting with any keyword"""
+        keywords = [' ' + keyword.lower() for keyword in keywords]
+        found = [
+            section for section in self.sections
+            if any(keyword in ' ' + section.heading for keyword in keywords)
+        ]
+        return [section for section in found if not section.within(found)]
+
+    def document(self, keywords):
+        """PageDocument of the sections a keyword heads, or None; cached per keyword list"""
+        key = tuple(keywords)
+        if key not in self.by_keywords:
+            found = self.find(keywords)
+            self.by_keywords[key] = PageDocument([node for section in found for node in section.nodes]) if found else None
+        return self.by_keywords[key]
+
+    def documents(self, keywords, fallback):
+        """The documents to search for a field: its sections if any, then fallback"""
+        document = self.document(keywords)
+        return [fallback] if document is None else [document, fallback]
@@ -0,0 +1,88 @@
+# Resources shared by the crawlers of one process (see orchestrator.py).
+#
+# With SHARED_RESOURCES set, components that own a file or a connection ask
+# shared() for it instead of building their own, so every crawler in the
+# process gets the same object: one database writer, one dedup cache, one
+# response archive, one validator store, one adaptive throttle. Users are
+# counted; the first crawler to open a resource opens it and the last one to
+# close it closes it:
+#
+#     self.archive = shared(crawler, ('archive', path), lambda: ResponseArchive(path))
+#     ...
+#     if open_user(self.archive):
+#         self.archive.open()
+#     ...
+#     if close_user(self.archive):
+#         self.archive.close()
+#
+# Without the setting, shared() just builds a private object and the counts
+# are always 1, so components behave exactly as in a single-spider crawl.
+
+import os
+from collections import Counter
+
+from scrapy.extensions.httpcache import FilesystemCacheStorage
+
+
+# Process-wide objects by key
+objects = {}
+
+# Open users of each object
+users = Counter()
+
+
+def shared(crawler, key, build):
+    """build(), or with SHARED_RESOURCES the process-wide object for key, built on first use"""
+    if not crawler.settings.getbool('SHARED_RESOURCES'):
+        return build()
+    if key not in objects:
+        objects[key] = build()
+    return objects[key]
+
+
+def open_user(resource):
+    """Count a user of a resource; True for the first one, which opens it"""
+    users[resource] += 1
+    return users[resource] == 1
+
+
+def close_user(resource):
+    """Uncount a user of a resource; True for the last one, which closes it"""
+    users[resource] -= 1
+    if users[resource] > 0:
+        return False
+    del users[resource]
+    return True
+
+
+def shared_pipeline(crawler, key, build):
+    """An item pipeline, wrapped in a SharedPipeline under SHARED_RESOURCES"""
+    if not crawler.settings.getbool('SHARED_RESOURCES'):
+        return build()
+    return SharedPipeline(shared(crawler, key, build))
+
+
+class SharedPipeline:
+    """One crawler's handle on a pipeline that every crawler in the process feeds"""
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def open_spider(self, spider):
+        if open_user(self.pipeline) and hasattr(self.pipeline, 'open_spider'):
+            return self.pipeline.open_spider(spider)
+
+    def close_spider(self, spider):
+        if close_user(self.pipeline) and hasattr(self.pipeline, 'close_spider'):
+            return self.pipeline.close_spider(spider)
+
+    def process_item(self, item, spider):
+        return self.pipeline.process_item(item, spider)
+
+
+class SharedFilesystemCacheStorage(FilesystemCacheStorage):
+    """HTTP cache with one directory for all spiders, so a page one spider fetched is a cache hit for the others"""
+
+    def _get_request_path(self, spider, request):
+        key = self._fingerprinter.fingerprint(request).hex()
+        return os.path.join(self.cachedir, 'shared', key[0:2], key)
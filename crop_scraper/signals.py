@@ -0,0 +1,7 @@
+# Signals sent by crop_scraper components, alongside Scrapy's own (scrapy.signals).
+
+# All of a response's callback output has been handled: its items went
+# through the pipelines and its requests were scheduled. Sent by
+# RequestFinishedMiddleware with request, response and failed (the callback
+# or a spider middleware raised).
+request_finished = object()
@@ -0,0 +1,226 @@
+# Extraction rules of the sites crawled by RulesSpider (spiders/rules_spider.py),
+# one entry per site. rules.py compiles an entry into a SiteRules extractor
+# the first time a spider uses it.
+#
+# Keys of an entry:
+#
+#   data_source        value of CropItem.data_source
+#   allowed_domains    spider allowed_domains
+#   start_urls         pages the crawl starts from
+#   follow             optional; start pages are listings whose links lead to
+#                      the crop pages:
+#                        links        CSS selector of the link hrefs
+#                        url_contains keep links containing any of these words
+#                        next_page    CSS selector of the pagination href
+#   crop_name          how CropItem.name is found:
+#                        selectors    CSS selectors, tried in order
+#                        reject       skip names containing any of these words
+#                        remove       regexes removed from the title
+#                        known        crop names picked out of the title
+#                        url_segment  else the URL segment after this one
+#                        default      else this value
+#                        common_name  also store the name as common_name
+#                        required     drop pages without a name
+#   content            text the fields are extracted from: a CSS selector,
+#                      a list of selectors (the first one with any text wins,
+#                      else the whole page) or None for the whole page
+#   main_content       read content from the page's main region only (see
+#                      content.py), leaving out navigation and footers
+#   snippets           options of the KeywordClassifier shared by the keyword
+#                      fields: exclude, min_length, max_length,
+#                      max_snippet_length and limit, plus join to store the
+#                      snippets as one string instead of a list
+#   fields             CropItem field -> rule. A keyword rule
+#                      {'keywords': [...]} collects snippets mentioning any of
+#                      the keywords. A pattern rule {'patterns': [...]} takes
+#                      the first match (group, default 0) shorter than
+#                      max_length; with 'findall': True it takes the
+#                      re.findall() results between min_length and max_length,
+#                      the first one or, with limit, up to limit of them.
+#                      Either rule may name sections: heading words (see
+#                      sections.py) of the parts of the page searched first,
+#                      before the whole content.
+
+ALMANAC_CROPS = [
+    'tomatoes', 'carrots', 'lettuce', 'onions', 'peppers', 'cucumbers',
+    'beans', 'peas', 'corn', 'potatoes', 'cabbage', 'broccoli',
+    'spinach', 'radishes', 'beets', 'squash', 'zucchini', 'herbs',
+    'basil', 'parsley', 'cilantro', 'thyme', 'oregano', 'mint'
+]
+
+SITES = {
+    'almanac_focused': {
+        'data_source': 'almanac.com',
+        'allowed_domains': ['almanac.com'],
+        'start_urls': [f'https://www.almanac.com/plant/{crop}' for crop in ALMANAC_CROPS],
+        'crop_name': {
+            'selectors': ['h1.page-title::text', 'h1::text', '.plant-name::text', '.crop-name::text'],
+            'url_segment': 'plant',
+            'default': '',
+        },
+        'content': None,
+        'main_content': True,
+        'snippets': {'min_length': 10, 'max_length': None, 'max_snippet_length': 500, 'limit': 5},
+        'fields': {
+            'water_needs': {'keywords': ['water', 'watering', 'irrigation', 'moisture', 'drought']},
+            'soil_ph': {'keywords': ['ph', 'pH', 'acid', 'alkaline', 'neutral']},
+            'fertilizer_recommendations': {'keywords': [
+                'fertilizer', 'fertiliser', 'feed', 'nutrients', 'compost', 'npk',
+                'nitrogen', 'phosphorus', 'potassium'
+            ]},
+            'sun_requirements': {'keywords': ['sun', 'light', 'shade', 'partial', 'full sun', 'bright']},
+            'planting_depth': {'keywords': ['depth', 'deep', 'plant', 'sow', 'seed', 'inch', 'inches', 'cm']},
+            'spacing': {'keywords': ['space', 'spacing', 'apart', 'distance', 'inches', 'feet', 'cm']},
+            'days_to_maturity': {'keywords': ['days', 'maturity', 'harvest', 'ready', 'weeks']},
+            'planting_season': {'keywords': ['spring', 'summer', 'fall', 'winter', 'season', 'month', 'plant']},
+            'harvest_time': {'keywords': ['harvest', 'pick', 'ready', 'ripe', 'mature']},
+            'soil_type': {'keywords': ['soil', 'clay', 'sandy', 'loam', 'drainage', 'well-drained']},
+            'temperature_range': {'keywords': ['temperature', 'degrees', 'hot', 'cold', 'frost', 'hardy', 'zone']},
+        },
+    },
+
+    'mini_test': {
+        'data_source': 'almanac.com',
+        'allowed_domains': ['almanac.com'],
+        'start_urls': [
+            'https://www.almanac.com/plant/tomatoes',
+            'https://www.almanac.com/plant/carrots',
+            'https://www.almanac.com/plant/lettuce',
+            'https://www.almanac.com/plant/sweet-peppers',
+            'https://www.almanac.com/plant/beans',
+        ],
+        'crop_name': {
+            'selectors': [
+                'h1.page-title::text', 'h1::text', '.plant-name::text',
+                '.crop-name::text', 'h1 span::text', '.entry-title::text'
+            ],
+            # Page headings that aren't crop names
+            'reject': ['almanac', 'calendar', 'growing', 'planting'],
+            'url_segment': 'plant',
+            'default': 'Unknown',
+        },
+        'content': [
+            '.article-content p::text',
+            '.content p::text',
+            '.plant-content p::text',
+            'main p::text',
+            '.entry-content p::text',
+            'p::text'
+        ],
+        'main_content': True,
+        'snippets': {
+            'exclude': [
+                # Navigation and header text
+                'navigation', 'menu', 'calendar', 'holiday', 'moon', 'sun',
+                'almanac', 'store', 'sunrise', 'set times', 'best days'
+            ],
+            'min_length': 20,
+            'limit': 3,
+            # Stored as one string for database compatibility
+            'join': ' | ',
+        },
+        'fields': {
+            'water_needs': {'keywords': ['water', 'watering', 'irrigation']},
+            'soil_ph': {'keywords': ['ph', 'pH', 'acid', 'alkaline']},
+            'fertilizer_recommendations': {'keywords': ['fertilizer', 'feed', 'nutrients']},
+            'sun_requirements': {'keywords': ['sun', 'light', 'shade']},
+            'planting_depth': {'keywords': ['depth', 'plant', 'sow']},
+            'spacing': {'keywords': ['space', 'spacing', 'apart']},
+            'days_to_maturity': {'keywords': ['days', 'maturity', 'harvest']},
+        },
+    },
+
+    'gardening_know_how': {
+        'data_source': 'Gardening Know How',
+        'allowed_domains': ['gardeningknowhow.com'],
+        'start_urls': [
+            'https://www.gardeningknowhow.com/edible/vegetables',
+            'https://www.gardeningknowhow.com/edible/herbs',
+            'https://www.gardeningknowhow.com/edible/fruits'
+        ],
+        'follow': {
+            'links': 'a[href*="/edible/"]::attr(href)',
+            'url_contains': [
+                'growing', 'plant', 'care', 'fertiliz', 'water', 'soil',
+                'tomato', 'lettuce', 'pepper', 'bean', 'carrot', 'onion'
+            ],
+            'next_page': 'a.next::attr(href)',
+        },
+        'crop_name': {
+            'selectors': ['h1::text'],
+            # Article titles: "How to grow tomato plants", "Tomato care tips", ...
+            'remove': [r'(how to|growing|care|tips|guide|information)', r'(plant|plants)'],
+            'known': [
+                'tomato', 'lettuce', 'carrot', 'bean', 'pea', 'corn', 'pepper',
+                'cucumber', 'squash', 'onion', 'garlic', 'potato', 'cabbage',
+                'broccoli', 'cauliflower', 'spinach', 'kale', 'radish', 'beet',
+                'basil', 'parsley', 'cilantro', 'oregano', 'thyme', 'sage'
+            ],
+            'common_name': True,
+            'required': True,
+        },
+        'content': '.entry-content *::text',
+        'fields': {
+            'water_needs': {
+                'sections': ['water', 'irrigat', 'moisture'],
+                'patterns': [r'water[ing]*[^.]*\.', r'irrigation[^.]*\.', r'moisture[^.]*\.'],
+                'findall': True, 'min_length': 20, 'max_length': 200,
+            },
+            'soil_ph': {
+                'sections': ['soil', 'ph'],
+                'patterns': [
+                    r'ph[^.]*\d+[^.]*\.',
+                    r'soil[^.]*ph[^.]*\.',
+                    r'acid[ic]*[^.]*soil[^.]*\.',
+                    r'alkaline[^.]*soil[^.]*\.'
+                ],
+                'max_length': 150,
+            },
+            'fertilizer_recommendations': {
+                'sections': ['fertiliz', 'feed', 'nutrient', 'compost'],
+                'patterns': [
+                    r'fertiliz[er]*[^.]*\.',
+                    r'feed[ing]*[^.]*\.',
+                    r'compost[^.]*\.',
+                    r'nutrient[s]*[^.]*\.',
+                    r'\d+-\d+-\d+[^.]*\.'
+                ],
+                'findall': True, 'min_length': 20, 'max_length': 250, 'limit': 5,
+            },
+            'sun_requirements': {
+                'sections': ['sun', 'light', 'location'],
+                'patterns': [
+                    r'full sun[^.]*\.',
+                    r'partial shade[^.]*\.',
+                    r'full shade[^.]*\.',
+                    r'sun[light]*[^.]*hours[^.]*\.',
+                    r'light[^.]*requirements[^.]*\.'
+                ],
+                'max_length': 150,
+            },
+            'planting_depth': {
+                'sections': ['plant', 'sow'],
+                'patterns': [r'plant[^.]*depth[^.]*\.', r'sow[^.]*deep[^.]*\.', r'bury[^.]*inch[^.]*\.'],
+                'max_length': 150,
+            },
+            'spacing': {
+                'sections': ['spac', 'plant'],
+                'patterns': [
+                    r'spac[ing]*[^.]*apart[^.]*\.',
+                    r'plant[^.]*inches[^.]*apart[^.]*\.',
+                    r'distance[^.]*between[^.]*\.'
+                ],
+                'max_length': 150,
+            },
+            'days_to_maturity': {
+                'sections': ['harvest', 'matur'],
+                'patterns': [
+                    r'matur[ity]*[^.]*\d+[^.]*days[^.]*\.',
+                    r'harvest[^.]*\d+[^.]*days[^.]*\.',
+                    r'ready[^.]*\d+[^.]*weeks[^.]*\.'
+                ],
+                'max_length': 150,
+            },
+        },
+    },
+}
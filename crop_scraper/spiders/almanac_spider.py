@@ -1,9 +1,115 @@
 import scrapy
 from scrapy import Request
+from crop_scraper.document import page_document
 from crop_scraper.items import CropItem
+from crop_scraper.offload import offload
+from crop_scraper.patterns import MultiFieldExtractor
+from crop_scraper.sections import first_findall, first_matches, section_index
 import re
 
 
+# Patterns for every text field, searched together once per page
+FIELDS = MultiFieldExtractor('almanac', {
+    'planting_depth': [
+        r'plant(?:ing)?\s+(?:depth|deep)\s*:?\s*([^.]+)',
+        r'(?:sow|plant)\s+(\d+[^.]*(?:inch|in|cm|centimeter|deep))',
+        r'depth\s*:?\s*([^.]+)'
+    ],
+    'spacing': [
+        r'spac(?:ing|e)\s*:?\s*([^.]+)',
+        r'plant\s+(\d+[^.]*(?:inch|in|cm|feet|ft|apart))',
+        r'distance\s*:?\s*([^.]+)'
+    ],
+    'days_to_maturity': [
+        r'(?:days?\s+to\s+)?matur(?:ity|e)\s*:?\s*(\d+[^.]*days?)',
+        r'harvest\s+in\s+(\d+[^.]*days?)',
+        r'ready\s+in\s+(\d+[^.]*days?)'
+    ],
+    'water_needs': [
+        r'water(?:ing)?\s*:?\s*([^.]+)',
+        r'moisture\s*:?\s*([^.]+)',
+        r'irrigation\s*:?\s*([^.]+)'
+    ],
+    'irrigation_frequency': [
+        r'water\s+([^.]*(?:daily|weekly|twice|once|every))',
+        r'irrigat(?:e|ion)\s+([^.]*(?:daily|weekly|twice|once|every))'
+    ],
+    'soil_ph': [
+        r'ph\s*:?\s*([^.]+)',
+        r'soil\s+ph\s*:?\s*([^.]+)',
+        r'acidity\s*:?\s*([^.]+)'
+    ],
+    'soil_type': [
+        r'soil\s+type\s*:?\s*([^.]+)',
+        r'soil\s*:?\s*([^.]*(?:clay|sand|loam|well.drain))',
+        r'growing\s+medium\s*:?\s*([^.]+)'
+    ],
+    'sun_requirements': [
+        r'sun(?:light)?\s*:?\s*([^.]+)',
+        r'light\s*:?\s*([^.]+)',
+        r'(?:full|partial|shade)\s+sun',
+        r'(?:full|partial)\s+shade'
+    ],
+    'temperature_range': [
+        r'temperature\s*:?\s*([^.]+)',
+        r'(\d+[-–]\d+\s*°?[CF])',
+        r'warm\s+season|cool\s+season|cold\s+hardy'
+    ],
+    'hardiness_zone': [
+        r'(?:hardiness\s+)?zone(?:s)?\s*:?\s*(\d+[ab]?[-–]\d+[ab]?)',
+        r'zone\s+(\d+[ab]?)',
+        r'usda\s+(?:zone\s+)?(\d+[ab]?[-–]\d+[ab]?)'
+    ],
+    'planting_season': [
+        r'plant(?:ing)?\s+(?:time|season)\s*:?\s*([^.]+)',
+        r'sow\s*:?\s*([^.]+)',
+        r'start\s+(?:seeds?\s+)?(?:in|during)\s+([^.]+)'
+    ],
+    'harvest_time': [
+        r'harvest\s*:?\s*([^.]+)',
+        r'ready\s+(?:to\s+harvest|for\s+harvest)\s*:?\s*([^.]+)',
+        r'pick\s*:?\s*([^.]+)'
+    ],
+    'fertilizer': [
+        r'fertili[sz]er?\s*:?\s*([^.]+)',
+        r'feed(?:ing)?\s*:?\s*([^.]+)',
+        r'nutrient(?:s)?\s*:?\s*([^.]+)',
+        r'compost\s*:?\s*([^.]+)'
+    ],
+    'fertilizer_npk': [
+        r'(\d+[-:]\d+[-:]\d+)',
+        r'n[-:]?p[-:]?k\s*:?\s*(\d+[-:]\d+[-:]\d+)',
+        r'nitrogen\s*:?\s*(\d+).*phosph(?:orus|ate)\s*:?\s*(\d+).*potassium\s*:?\s*(\d+)'
+    ],
+    'organic_fertilizer': [
+        r'organic\s+fertilizer\s*:?\s*([^.]+)',
+        r'compost\s*:?\s*([^.]+)',
+        r'manure\s*:?\s*([^.]+)',
+        r'organic\s+matter\s*:?\s*([^.]+)'
+    ],
+})
+
+
+# Heading words of the sections each field is looked for in first
+SECTIONS = {
+    'planting_depth': ['plant', 'sow', 'depth'],
+    'spacing': ['spac', 'plant'],
+    'days_to_maturity': ['harvest', 'matur', 'days'],
+    'water_needs': ['water', 'irrigat', 'moisture'],
+    'irrigation_frequency': ['water', 'irrigat'],
+    'soil_ph': ['soil', 'ph', 'acidity'],
+    'soil_type': ['soil'],
+    'sun_requirements': ['sun', 'light', 'site', 'location'],
+    'temperature_range': ['temperature', 'climate', 'frost', 'zone'],
+    'hardiness_zone': ['zone', 'hardiness', 'climate'],
+    'planting_season': ['plant', 'sow', 'when'],
+    'harvest_time': ['harvest'],
+    'fertilizer': ['fertiliz', 'feed', 'nutrient', 'compost'],
+    'fertilizer_npk': ['fertiliz', 'feed', 'nutrient'],
+    'organic_fertilizer': ['fertiliz', 'compost', 'organic', 'soil'],
+}
+
+
 class AlmanacSpider(scrapy.Spider):
     name = 'almanac'
     allowed_domains = ['almanac.com']
@@ -18,6 +124,9 @@ class AlmanacSpider(scrapy.Spider):
         'DOWNLOAD_DELAY': 3,
         'RANDOMIZE_DOWNLOAD_DELAY': True,
     }
+
+    # Crop pages are skipped on recrawls when unchanged (ConditionalRequestMiddleware)
+    incremental_callbacks = ['parse_crop']
     
     def parse(self, response):
         """Parse the main plants page to find individual crop pages"""
@@ -46,6 +155,7 @@ class AlmanacSpider(scrapy.Spider):
                     meta={'source_page': response.url}
                 )
     
+    @offload
     def parse_crop(self, response):
         """Parse individual crop/plant pages for nutrition and care information"""
         
@@ -156,18 +266,21 @@ class AlmanacSpider(scrapy.Spider):
         
         return None
     
+    def field_documents(self, response, field):
+        """The field's sections, if any heading matches, then the page's main content"""
+        return section_index(response).documents(SECTIONS[field], page_document(response, main=True))
+    
+    def field_matches(self, response, field):
+        """First match of each of a field's patterns, in its sections first"""
+        return first_matches(self.field_documents(response, field), FIELDS, field)
+    
+    def field_findall(self, response, field):
+        """findall() results of a field's patterns from its sections, else the whole page"""
+        return first_findall(self.field_documents(response, field), FIELDS, field)
+    
     def extract_planting_depth(self, response):
         """Extract planting depth information"""
-        text = ' '.join(response.css('*::text').getall())
-        
-        depth_patterns = [
-            r'plant(?:ing)?\s+(?:depth|deep)\s*:?\s*([^.]+)',
-            r'(?:sow|plant)\s+(\d+[^.]*(?:inch|in|cm|centimeter|deep))',
-            r'depth\s*:?\s*([^.]+)'
-        ]
-        
-        for pattern in depth_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'planting_depth'):
             if match:
                 return match.group(1).strip()
         
@@ -175,16 +288,7 @@ class AlmanacSpider(scrapy.Spider):
     
     def extract_spacing(self, response):
         """Extract plant spacing information"""
-        text = ' '.join(response.css('*::text').getall())
-        
-        spacing_patterns = [
-            r'spac(?:ing|e)\s*:?\s*([^.]+)',
-            r'plant\s+(\d+[^.]*(?:inch|in|cm|feet|ft|apart))',
-            r'distance\s*:?\s*([^.]+)'
-        ]
-        
-        for pattern in spacing_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'spacing'):
             if match:
                 return match.group(1).strip()
         
@@ -192,16 +296,7 @@ class AlmanacSpider(scrapy.Spider):
     
     def extract_days_to_maturity(self, response):
         """Extract days to maturity"""
-        text = ' '.join(response.css('*::text').getall())
-        
-        maturity_patterns = [
-            r'(?:days?\s+to\s+)?matur(?:ity|e)\s*:?\s*(\d+[^.]*days?)',
-            r'harvest\s+in\s+(\d+[^.]*days?)',
-            r'ready\s+in\s+(\d+[^.]*days?)'
-        ]
-        
-        for pattern in maturity_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'days_to_maturity'):
             if match:
                 return match.group(1).strip()
         
@@ -209,16 +304,7 @@ class AlmanacSpider(scrapy.Spider):
     
     def extract_water_needs(self, response):
         """Extract water requirements"""
-        text = ' '.join(response.css('*::text').getall())
-        
-        water_patterns = [
-            r'water(?:ing)?\s*:?\s*([^.]+)',
-            r'moisture\s*:?\s*([^.]+)',
-            r'irrigation\s*:?\s*([^.]+)'
-        ]
-        
-        for pattern in water_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'water_needs'):
             if match:
                 water_info = match.group(1).strip()
                 # Filter out very long matches that might be paragraphs
@@ -229,15 +315,7 @@ class AlmanacSpider(scrapy.Spider):
     
     def extract_irrigation_frequency(self, response):
         """Extract irrigation frequency"""
-        text = ' '.join(response.css('*::text').getall())
-        
-        freq_patterns = [
-            r'water\s+([^.]*(?:daily|weekly|twice|once|every))',
-            r'irrigat(?:e|ion)\s+([^.]*(?:daily|weekly|twice|once|every))'
-        ]
-        
-        for pattern in freq_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'irrigation_frequency'):
             if match:
                 return match.group(1).strip()
         
@@ -245,16 +323,7 @@ class AlmanacSpider(scrapy.Spider):
     
     def extract_soil_ph(self, response):
         """Extract soil pH requirements"""
-        text = ' '.join(response.css('*::text').getall())
-        
-        ph_patterns = [
-            r'ph\s*:?\s*([^.]+)',
-            r'soil\s+ph\s*:?\s*([^.]+)',
-            r'acidity\s*:?\s*([^.]+)'
-        ]
-        
-        for pattern in ph_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'soil_ph'):
             if match:
                 ph_info = match.group(1).strip()
                 if len(ph_info) < 100:  # Reasonable length
@@ -264,16 +333,7 @@ class AlmanacSpider(scrapy.Spider):
     
     def extract_soil_type(self, response):
         """Extract soil type requirements"""
-        text = ' '.join(response.css('*::text').getall())
-        
-        soil_patterns = [
-            r'soil\s+type\s*:?\s*([^.]+)',
-            r'soil\s*:?\s*([^.]*(?:clay|sand|loam|well.drain))',
-            r'growing\s+medium\s*:?\s*([^.]+)'
-        ]
-        
-        for pattern in soil_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'soil_type'):
             if match:
                 soil_info = match.group(1).strip()
                 if len(soil_info) < 200:
@@ -283,7 +343,6 @@ class AlmanacSpider(scrapy.Spider):
     
     def extract_fertilizer_info(self, response):
         """Extract fertilizer and nutrient information"""
-        text = ' '.join(response.css('*::text').getall())
         result = {
             'recommendations': [],
             'organic_options': [],
@@ -291,28 +350,13 @@ class AlmanacSpider(scrapy.Spider):
         }
         
         # Look for fertilizer recommendations
-        fertilizer_patterns = [
-            r'fertili[sz]er?\s*:?\s*([^.]+)',
-            r'feed(?:ing)?\s*:?\s*([^.]+)',
-            r'nutrient(?:s)?\s*:?\s*([^.]+)',
-            r'compost\s*:?\s*([^.]+)'
-        ]
-        
-        for pattern in fertilizer_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for matches in self.field_findall(response, 'fertilizer'):
             for match in matches:
                 if len(match.strip()) < 300:  # Reasonable length
                     result['recommendations'].append(match.strip())
         
         # Look for NPK ratios
-        npk_patterns = [
-            r'(\d+[-:]\d+[-:]\d+)',
-            r'n[-:]?p[-:]?k\s*:?\s*(\d+[-:]\d+[-:]\d+)',
-            r'nitrogen\s*:?\s*(\d+).*phosph(?:orus|ate)\s*:?\s*(\d+).*potassium\s*:?\s*(\d+)'
-        ]
-        
-        for pattern in npk_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'fertilizer_npk'):
             if match:
                 if len(match.groups()) == 1:
                     result['npk'] = match.group(1)
@@ -321,15 +365,7 @@ class AlmanacSpider(scrapy.Spider):
                 break
         
         # Look for organic fertilizer options
-        organic_patterns = [
-            r'organic\s+fertilizer\s*:?\s*([^.]+)',
-            r'compost\s*:?\s*([^.]+)',
-            r'manure\s*:?\s*([^.]+)',
-            r'organic\s+matter\s*:?\s*([^.]+)'
-        ]
-        
-        for pattern in organic_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for matches in self.field_findall(response, 'organic_fertilizer'):
             for match in matches:
                 if len(match.strip()) < 200:
                     result['organic_options'].append(match.strip())
@@ -338,17 +374,7 @@ class AlmanacSpider(scrapy.Spider):
     
     def extract_sun_requirements(self, response):
         """Extract sun/light requirements"""
-        text = ' '.join(response.css('*::text').getall())
-        
-        sun_patterns = [
-            r'sun(?:light)?\s*:?\s*([^.]+)',
-            r'light\s*:?\s*([^.]+)',
-            r'(?:full|partial|shade)\s+sun',
-            r'(?:full|partial)\s+shade'
-        ]
-        
-        for pattern in sun_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'sun_requirements'):
             if match:
                 sun_info = match.group(1).strip() if hasattr(match, 'group') else match.group(0)
                 if len(sun_info) < 100:
@@ -358,16 +384,7 @@ class AlmanacSpider(scrapy.Spider):
     
     def extract_temperature_range(self, response):
         """Extract temperature requirements"""
-        text = ' '.join(response.css('*::text').getall())
-        
-        temp_patterns = [
-            r'temperature\s*:?\s*([^.]+)',
-            r'(\d+[-–]\d+\s*°?[CF])',
-            r'warm\s+season|cool\s+season|cold\s+hardy'
-        ]
-        
-        for pattern in temp_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'temperature_range'):
             if match:
                 temp_info = match.group(1) if hasattr(match, 'groups') and match.groups() else match.group(0)
                 if len(temp_info.strip()) < 100:
@@ -377,16 +394,7 @@ class AlmanacSpider(scrapy.Spider):
     
     def extract_hardiness_zone(self, response):
         """Extract USDA hardiness zone"""
-        text = ' '.join(response.css('*::text').getall())
-        
-        zone_patterns = [
-            r'(?:hardiness\s+)?zone(?:s)?\s*:?\s*(\d+[ab]?[-–]\d+[ab]?)',
-            r'zone\s+(\d+[ab]?)',
-            r'usda\s+(?:zone\s+)?(\d+[ab]?[-–]\d+[ab]?)'
-        ]
-        
-        for pattern in zone_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'hardiness_zone'):
             if match:
                 return match.group(1).strip()
         
@@ -394,16 +402,7 @@ class AlmanacSpider(scrapy.Spider):
     
     def extract_planting_season(self, response):
         """Extract planting season/timing"""
-        text = ' '.join(response.css('*::text').getall())
-        
-        planting_patterns = [
-            r'plant(?:ing)?\s+(?:time|season)\s*:?\s*([^.]+)',
-            r'sow\s*:?\s*([^.]+)',
-            r'start\s+(?:seeds?\s+)?(?:in|during)\s+([^.]+)'
-        ]
-        
-        for pattern in planting_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'planting_season'):
             if match:
                 timing = match.group(1).strip()
                 if len(timing) < 200:
@@ -413,16 +412,7 @@ class AlmanacSpider(scrapy.Spider):
     
     def extract_harvest_time(self, response):
         """Extract harvest timing"""
-        text = ' '.join(response.css('*::text').getall())
-        
-        harvest_patterns = [
-            r'harvest\s*:?\s*([^.]+)',
-            r'ready\s+(?:to\s+harvest|for\s+harvest)\s*:?\s*([^.]+)',
-            r'pick\s*:?\s*([^.]+)'
-        ]
-        
-        for pattern in harvest_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in self.field_matches(response, 'harvest_time'):
             if match:
                 harvest_info = match.group(1).strip()
                 if len(harvest_info) < 200:
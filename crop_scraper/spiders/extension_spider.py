@@ -1,10 +1,98 @@
 import scrapy
 from scrapy import Request
+from crop_scraper.document import PageDocument, page_document
 from crop_scraper.items import CropItem, NutrientRecipeItem
-import re
+from crop_scraper.offload import offload
+from crop_scraper.patterns import MultiFieldExtractor, compile_pattern
+from crop_scraper.sections import first_findall, first_matches, section_index
 import json
 
 
+# Patterns for the page and nutrient-section fields
+FIELDS = MultiFieldExtractor('extension', {
+    'nutrient_indicators': [
+        r'\d+\s*ppm', r'parts\s+per\s+million', r'mg/L', r'mg/l',
+        r'nitrogen.*\d+', r'phosphorus.*\d+', r'potassium.*\d+',
+        r'N[-:]P[-:]K', r'\d+[-:]\d+[-:]\d+',
+        r'EC.*\d+', r'electrical\s+conductivity'
+    ],
+    'growth_stage': [
+        r'(seedling|transplant|vegetative|flowering|fruiting|harvest)',
+        r'(germination|establishment|growth|reproductive)',
+        r'week\s+(\d+)', r'stage\s+(\d+)'
+    ],
+    'ec_range': [
+        r'EC[^\\d]*([\\d.]+[-–][\\d.]+)',
+        r'electrical\\s+conductivity[^\\d]*([\\d.]+[-–][\\d.]+)',
+        r'([\\d.]+[-–][\\d.]+)\\s*(?:mS|dS|µS)'
+    ],
+    'ph_range': [
+        r'pH[^\\d]*([\\d.]+[-–][\\d.]+)',
+        r'([\\d.]+[-–][\\d.]+)\\s*pH'
+    ],
+    'application_frequency': [
+        r'(daily|weekly|monthly|bi-weekly)',
+        r'every\\s+(\\d+)\\s+(day|week|month)',
+        r'(once|twice)\\s+per\\s+(week|month)'
+    ],
+    'soil_ph': [
+        r'soil\\s+pH[^\\d]*([\\d.]+[-–][\\d.]+)',
+        r'pH[^\\d]*([\\d.]+[-–][\\d.]+)'
+    ],
+    'water_needs': [
+        r'water[^.]*inch[^.]*\\.',
+        r'irrigation[^.]*\\.',
+        r'moisture[^.]*\\.'
+    ],
+    'planting_depth': [
+        r'plant[^.]*depth[^.]*\\.',
+        r'sow[^.]*deep[^.]*\\.'
+    ],
+    'spacing': [
+        r'spac[^.]*apart[^.]*\\.',
+        r'plant[^.]*inches?[^.]*apart[^.]*\\.'
+    ],
+    'maturity': [
+        r'matur[^.]*\\d+[^.]*days?[^.]*\\.',
+        r'harvest[^.]*\\d+[^.]*days?[^.]*\\.'
+    ],
+    'fertilizer': [
+        r'fertilizer[^.]*\\.',
+        r'apply[^.]*fertilizer[^.]*\\.',
+        r'\\d+[-:]\\d+[-:]\\d+[^.]*\\.'
+    ],
+})
+
+NPK_PATTERN = compile_pattern(r'(\\d+[-:]\\d+[-:]\\d+)', 0)
+
+# Nutrient name alternations passed to extract_ppm_value()
+NUTRIENT_PATTERNS = [
+    'nitrogen|N', 'phosphorus|P', 'potassium|K',
+    'calcium|Ca', 'magnesium|Mg', 'sulfur|S',
+    'iron|Fe', 'manganese|Mn', 'zinc|Zn', 'copper|Cu', 'boron|B', 'molybdenum|Mo',
+]
+
+# "<nutrient> ... 150 ppm", "<nutrient> ... 150 mg/L" and "<nutrient> 150" for every nutrient
+PPM_FIELDS = MultiFieldExtractor('extension_ppm', {
+    nutrient_pattern: [
+        f'{nutrient_pattern}[^\\d]*([\\d.]+)\\s*ppm',
+        f'{nutrient_pattern}[^\\d]*([\\d.]+)\\s*mg/L',
+        f'({nutrient_pattern})\\s*([\\d.]+)',
+    ]
+    for nutrient_pattern in NUTRIENT_PATTERNS
+})
+
+
+# Heading words of the sections each basic field is looked for in first
+SECTIONS = {
+    'fertilizer': ['fertiliz', 'nutrient', 'feed'],
+    'soil_ph': ['soil', 'ph', 'lime'],
+    'water_needs': ['water', 'irrigat', 'moisture'],
+    'planting_depth': ['plant', 'seed', 'sow'],
+    'spacing': ['spac', 'plant'],
+    'maturity': ['harvest', 'matur'],
+}
+
 class ExtensionSpider(scrapy.Spider):
     name = 'extension'
     allowed_domains = [
@@ -29,6 +117,9 @@ class ExtensionSpider(scrapy.Spider):
         'RANDOMIZE_DOWNLOAD_DELAY': True,
         'ROBOTSTXT_OBEY': True,
     }
+
+    # Guides are skipped on recrawls when unchanged (ConditionalRequestMiddleware)
+    incremental_callbacks = ['parse_crop_guide', 'parse_pdf_guide']
     
     def parse(self, response):
         """Parse extension main pages to find crop-specific guides"""
@@ -80,17 +171,18 @@ class ExtensionSpider(scrapy.Spider):
         url_lower = url.lower()
         return any(keyword in url_lower for keyword in relevant_keywords)
     
+    @offload
     def parse_crop_guide(self, response):
         """Parse individual crop guide pages"""
         
         # Determine if this contains detailed nutrient recipes
-        text_content = ' '.join(response.css('*::text').getall())
+        document = page_document(response, main=True)
         
-        if self.contains_detailed_nutrients(text_content):
-            yield from self.extract_nutrient_recipes(response, text_content)
+        if self.contains_detailed_nutrients(document):
+            yield from self.extract_nutrient_recipes(response, document)
         else:
             # Extract basic crop information
-            item = self.extract_basic_crop_info(response, text_content)
+            item = self.extract_basic_crop_info(response, document)
             if item:
                 yield item
     
@@ -107,26 +199,20 @@ class ExtensionSpider(scrapy.Spider):
         
         pass
     
-    def contains_detailed_nutrients(self, text):
+    def contains_detailed_nutrients(self, document):
         """Check if text contains detailed nutrient information"""
-        nutrient_indicators = [
-            r'\d+\s*ppm', r'parts\s+per\s+million', r'mg/L', r'mg/l',
-            r'nitrogen.*\d+', r'phosphorus.*\d+', r'potassium.*\d+',
-            r'N[-:]P[-:]K', r'\d+[-:]\d+[-:]\d+',
-            r'EC.*\d+', r'electrical\s+conductivity'
-        ]
-        
-        return any(re.search(pattern, text, re.IGNORECASE) for pattern in nutrient_indicators)
+        return any(document.matches(FIELDS)['nutrient_indicators'])
     
-    def extract_nutrient_recipes(self, response, text):
+    def extract_nutrient_recipes(self, response, document):
         """Extract detailed nutrient recipes from extension guides"""
         
         crop_name = self.extract_crop_name_from_url_or_title(response)
         
         # Look for nutrient tables or detailed recommendations
-        nutrient_sections = self.find_nutrient_sections(text)
+        nutrient_sections = self.find_nutrient_sections(document.text)
         
         for section in nutrient_sections:
+            section = PageDocument([section])
             recipe_item = NutrientRecipeItem()
             
             recipe_item['crop_name'] = crop_name
@@ -168,7 +254,7 @@ class ExtensionSpider(scrapy.Spider):
                    recipe_item.get('potassium_ppm')]):
                 yield recipe_item
     
-    def extract_basic_crop_info(self, response, text):
+    def extract_basic_crop_info(self, response, document):
         """Extract basic crop information from extension pages"""
         
         crop_name = self.extract_crop_name_from_url_or_title(response)
@@ -179,17 +265,20 @@ class ExtensionSpider(scrapy.Spider):
         item['name'] = crop_name
         item['common_name'] = crop_name
         
+        # Each field is looked for under its own headings before the whole page
+        sections = section_index(response)
+        
         # Extract fertilizer recommendations
-        fertilizer_info = self.extract_extension_fertilizer_info(text)
+        fertilizer_info = self.extract_extension_fertilizer_info(sections.documents(SECTIONS['fertilizer'], document))
         item['fertilizer_recommendations'] = fertilizer_info.get('recommendations', [])
         item['fertilizer_npk'] = fertilizer_info.get('npk', '')
         
         # Extract other growing information
-        item['soil_ph'] = self.extract_soil_ph_extension(text)
-        item['water_needs'] = self.extract_water_needs_extension(text)
-        item['planting_depth'] = self.extract_planting_depth_extension(text)
-        item['spacing'] = self.extract_spacing_extension(text)
-        item['days_to_maturity'] = self.extract_maturity_extension(text)
+        item['soil_ph'] = self.extract_soil_ph_extension(sections.documents(SECTIONS['soil_ph'], document))
+        item['water_needs'] = self.extract_water_needs_extension(sections.documents(SECTIONS['water_needs'], document))
+        item['planting_depth'] = self.extract_planting_depth_extension(sections.documents(SECTIONS['planting_depth'], document))
+        item['spacing'] = self.extract_spacing_extension(sections.documents(SECTIONS['spacing'], document))
+        item['days_to_maturity'] = self.extract_maturity_extension(sections.documents(SECTIONS['maturity'], document))
         
         # Metadata
         item['source_url'] = response.url
@@ -246,33 +335,19 @@ class ExtensionSpider(scrapy.Spider):
         
         return sections
     
-    def extract_growth_stage(self, text):
+    def extract_growth_stage(self, document):
         """Extract growth stage from nutrient section"""
         
-        stage_patterns = [
-            r'(seedling|transplant|vegetative|flowering|fruiting|harvest)',
-            r'(germination|establishment|growth|reproductive)',
-            r'week\s+(\d+)', r'stage\s+(\d+)'
-        ]
-        
-        for pattern in stage_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in document.matches(FIELDS)['growth_stage']:
             if match:
                 return match.group(1)
         
         return 'general'
     
-    def extract_ppm_value(self, text, nutrient_pattern):
+    def extract_ppm_value(self, section, nutrient_pattern):
         """Extract PPM value for a specific nutrient"""
         
-        patterns = [
-            f'{nutrient_pattern}[^\\d]*([\\d.]+)\\s*ppm',
-            f'{nutrient_pattern}[^\\d]*([\\d.]+)\\s*mg/L',
-            f'({nutrient_pattern})\\s*([\\d.]+)',
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in section.matches(PPM_FIELDS)[nutrient_pattern]:
             if match:
                 try:
                     # Get the numeric part
@@ -285,38 +360,25 @@ class ExtensionSpider(scrapy.Spider):
         
         return None
     
-    def extract_ec_range(self, text):
+    def extract_ec_range(self, document):
         """Extract EC (electrical conductivity) range"""
         
-        ec_patterns = [
-            r'EC[^\\d]*([\\d.]+[-–][\\d.]+)',
-            r'electrical\\s+conductivity[^\\d]*([\\d.]+[-–][\\d.]+)',
-            r'([\\d.]+[-–][\\d.]+)\\s*(?:mS|dS|µS)'
-        ]
-        
-        for pattern in ec_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in document.matches(FIELDS)['ec_range']:
             if match:
                 return match.group(1)
         
         return None
     
-    def extract_ph_range(self, text):
+    def extract_ph_range(self, document):
         """Extract pH range"""
         
-        ph_patterns = [
-            r'pH[^\\d]*([\\d.]+[-–][\\d.]+)',
-            r'([\\d.]+[-–][\\d.]+)\\s*pH'
-        ]
-        
-        for pattern in ph_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in document.matches(FIELDS)['ph_range']:
             if match:
                 return match.group(1)
         
         return None
     
-    def extract_application_method(self, text):
+    def extract_application_method(self, section):
         """Extract application method"""
         
         method_keywords = [
@@ -325,121 +387,78 @@ class ExtensionSpider(scrapy.Spider):
         ]
         
         for keyword in method_keywords:
-            if keyword.lower() in text.lower():
+            if keyword.lower() in section.lower:
                 return keyword.title()
         
         return None
     
-    def extract_application_frequency(self, text):
+    def extract_application_frequency(self, document):
         """Extract application frequency"""
         
-        freq_patterns = [
-            r'(daily|weekly|monthly|bi-weekly)',
-            r'every\\s+(\\d+)\\s+(day|week|month)',
-            r'(once|twice)\\s+per\\s+(week|month)'
-        ]
-        
-        for pattern in freq_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in document.matches(FIELDS)['application_frequency']:
             if match:
                 return match.group(0)
         
         return None
     
-    def extract_extension_fertilizer_info(self, text):
+    def extract_extension_fertilizer_info(self, documents):
         """Extract fertilizer information from extension text"""
         
         result = {'recommendations': [], 'npk': ''}
         
         # Look for fertilizer recommendations
-        fertilizer_patterns = [
-            r'fertilizer[^.]*\\.',
-            r'apply[^.]*fertilizer[^.]*\\.',
-            r'\\d+[-:]\\d+[-:]\\d+[^.]*\\.'
-        ]
-        
-        for pattern in fertilizer_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
+        for matches in first_findall(documents, FIELDS, 'fertilizer'):
             result['recommendations'].extend([match.strip() for match in matches])
         
         # Look for NPK ratios
-        npk_match = re.search(r'(\\d+[-:]\\d+[-:]\\d+)', text)
-        if npk_match:
-            result['npk'] = npk_match.group(1)
+        for document in documents:
+            npk_match = NPK_PATTERN.search(document.text)
+            if npk_match:
+                result['npk'] = npk_match.group(1)
+                break
         
         return result
     
-    def extract_soil_ph_extension(self, text):
+    def extract_soil_ph_extension(self, documents):
         """Extract soil pH from extension text"""
         
-        ph_patterns = [
-            r'soil\\s+pH[^\\d]*([\\d.]+[-–][\\d.]+)',
-            r'pH[^\\d]*([\\d.]+[-–][\\d.]+)'
-        ]
-        
-        for pattern in ph_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in first_matches(documents, FIELDS, 'soil_ph'):
             if match:
                 return match.group(1)
         
         return None
     
-    def extract_water_needs_extension(self, text):
+    def extract_water_needs_extension(self, documents):
         """Extract water needs from extension text"""
         
-        water_patterns = [
-            r'water[^.]*inch[^.]*\\.',
-            r'irrigation[^.]*\\.',
-            r'moisture[^.]*\\.'
-        ]
-        
-        for pattern in water_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in first_matches(documents, FIELDS, 'water_needs'):
             if match:
                 return match.group(0).strip()
         
         return None
     
-    def extract_planting_depth_extension(self, text):
+    def extract_planting_depth_extension(self, documents):
         """Extract planting depth from extension text"""
         
-        depth_patterns = [
-            r'plant[^.]*depth[^.]*\\.',
-            r'sow[^.]*deep[^.]*\\.'
-        ]
-        
-        for pattern in depth_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in first_matches(documents, FIELDS, 'planting_depth'):
             if match:
                 return match.group(0).strip()
         
         return None
     
-    def extract_spacing_extension(self, text):
+    def extract_spacing_extension(self, documents):
         """Extract plant spacing from extension text"""
         
-        spacing_patterns = [
-            r'spac[^.]*apart[^.]*\\.',
-            r'plant[^.]*inches?[^.]*apart[^.]*\\.'
-        ]
-        
-        for pattern in spacing_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in first_matches(documents, FIELDS, 'spacing'):
             if match:
                 return match.group(0).strip()
         
         return None
     
-    def extract_maturity_extension(self, text):
+    def extract_maturity_extension(self, documents):
         """Extract days to maturity from extension text"""
         
-        maturity_patterns = [
-            r'matur[^.]*\\d+[^.]*days?[^.]*\\.',
-            r'harvest[^.]*\\d+[^.]*days?[^.]*\\.'
-        ]
-        
-        for pattern in maturity_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for match in first_matches(documents, FIELDS, 'maturity'):
             if match:
                 return match.group(0).strip()
         
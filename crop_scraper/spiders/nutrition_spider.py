@@ -1,10 +1,86 @@
 # filepath: c:\Users\PC\byu classwork\wd330\project\crop_scraper\spiders\nutrition_spider.py
 import scrapy
-import re
+from crop_scraper.document import SentenceIndex, content_document, page_document
 from crop_scraper.items import CropItem
+from crop_scraper.keywords import KeywordClassifier
+from crop_scraper.offload import offload
+from crop_scraper.patterns import compile_pattern, finditer, lowercase_copy, register
 from urllib.parse import urljoin
 
 
+NPK_PATTERNS = register('nutrition.npk', [
+    r'(\d+)-(\d+)-(\d+)',  # 10-10-10 format
+    r'N[:\s]*(\d+).*P[:\s]*(\d+).*K[:\s]*(\d+)',  # N:10 P:10 K:10 format
+    r'nitrogen[:\s]*(\d+).*phosphorus[:\s]*(\d+).*potassium[:\s]*(\d+)',
+])
+
+TIMING_PATTERNS = register('nutrition.timing', [
+    r'week (\d+)', r'day (\d+)', r'(\d+) weeks?',
+    r'seedling', r'vegetative', r'flowering', r'fruiting'
+])
+
+RATE_PATTERNS = register('nutrition.rate', [
+    r'(\d+(?:\.\d+)?)\s*(?:ppm|mg/l|g/l)',
+    r'(\d+(?:\.\d+)?)\s*(?:tablespoons?|tbsp|tsp|cups?)',
+    r'(\d+(?:\.\d+)?)\s*(?:grams?|ounces?|lbs?)'
+])
+
+SCHEDULE_NPK_PATTERN = compile_pattern(r'(\d+)-(\d+)-(\d+)', 0)
+
+# Growth stage keywords to look for
+STAGE_KEYWORDS = {
+    'seedling': ['seedling', 'germination', 'emergence', 'transplant'],
+    'vegetative': ['vegetative', 'growth', 'leaf', 'foliage', 'vegetative growth'],
+    'flowering': ['flowering', 'bloom', 'flower', 'bud', 'reproductive'],
+    'fruiting': ['fruit', 'harvest', 'maturity', 'production', 'yield'],
+    'general': ['fertilizer', 'nutrient', 'feed', 'nutrition']
+}
+
+# Keywords of every snippet field, classified together in one pass per page
+SNIPPETS = KeywordClassifier({
+    **STAGE_KEYWORDS,
+    'schedule': [
+        'fertilizer schedule', 'feeding schedule', 'nutrient schedule',
+        'fertilizer program', 'feeding program', 'weekly feeding',
+        'application rate', 'fertilizer rate', 'ppm', 'ec'
+    ],
+    'fertilizer_recommendations': [
+        'fertilizer', 'fertilize', 'feed', 'feeding', 'nutrient', 'nutrition',
+        'compost', 'manure', 'organic', 'npk', 'nitrogen', 'phosphorus', 'potassium'
+    ],
+    'water': [
+        'water', 'watering', 'irrigation', 'moisture', 'humid', 'wet', 'dry',
+        'inches per week', 'gallons', 'liters'
+    ],
+    'soil': ['ph', 'pH', 'acid', 'alkaline', 'soil', 'loam', 'clay', 'sand'],
+    'planting': ['depth', 'plant', 'sow', 'seed', 'inch', 'cm', 'deep'],
+    'spacing': ['space', 'spacing', 'apart', 'distance', 'inch', 'feet', 'cm'],
+    'maturity': ['days', 'maturity', 'harvest', 'ready', 'weeks'],
+    'sun': ['sun', 'light', 'shade', 'full sun', 'partial', 'hours'],
+}, exclude=[
+    # Navigation and header text
+    'navigation', 'menu', 'calendar', 'holiday', 'moon', 'sun times',
+    'almanac', 'store', 'sunrise', 'set times', 'best days', 'copyright',
+    'privacy', 'terms', 'subscribe', 'newsletter'
+], min_length=15)
+
+# Enhanced content selectors for better nutrition data extraction
+CONTENT_SELECTORS = [
+    'div.content *::text',
+    'article *::text',
+    '.entry-content *::text',
+    '.post-content *::text',
+    '.main-content *::text',
+    'main *::text',
+    '.fertilizer *::text',
+    '.nutrition *::text',
+    '.feeding *::text',
+    'table *::text',  # Tables often contain nutrition schedules
+    '.schedule *::text',
+    '.chart *::text'
+]
+
+
 class NutritionSpider(scrapy.Spider):
     name = 'nutrition'
     allowed_domains = [
@@ -35,7 +111,6 @@ class NutritionSpider(scrapy.Spider):
     
     custom_settings = {
         'DOWNLOAD_DELAY': 3,
-        'CONCURRENT_REQUESTS': 1,
         'FEED_EXPORT_ENCODING': 'utf-8',
         'FEEDS': {
             'nutrition_data.json': {
@@ -45,7 +120,11 @@ class NutritionSpider(scrapy.Spider):
             },
         },
     }
+
+    # Start pages are skipped on recrawls when unchanged (ConditionalRequestMiddleware)
+    incremental_callbacks = ['parse']
     
+    @offload
     def parse(self, response):
         """Parse crop pages for nutrition data"""
         self.logger.info(f"Parsing nutrition page: {response.url}")
@@ -100,28 +179,14 @@ class NutritionSpider(scrapy.Spider):
             'micronutrients': []
         }
         
-        # Growth stage keywords to look for
-        stage_keywords = {
-            'seedling': ['seedling', 'germination', 'emergence', 'transplant'],
-            'vegetative': ['vegetative', 'growth', 'leaf', 'foliage', 'vegetative growth'],
-            'flowering': ['flowering', 'bloom', 'flower', 'bud', 'reproductive'],
-            'fruiting': ['fruit', 'harvest', 'maturity', 'production', 'yield'],
-            'general': ['fertilizer', 'nutrient', 'feed', 'nutrition']
-        }
-        
-        # NPK ratio patterns
-        npk_patterns = [
-            r'(\d+)-(\d+)-(\d+)',  # 10-10-10 format
-            r'N[:\s]*(\d+).*P[:\s]*(\d+).*K[:\s]*(\d+)',  # N:10 P:10 K:10 format
-            r'nitrogen[:\s]*(\d+).*phosphorus[:\s]*(\d+).*potassium[:\s]*(\d+)',
-        ]
-        
         # Extract all text content
-        all_text = ' '.join(response.css('*::text').getall())
+        document = page_document(response, main=True)
+        all_text = document.text
+        lower = lowercase_copy(all_text, document.lower)
         
         # Look for NPK ratios
-        for pattern in npk_patterns:
-            matches = re.finditer(pattern, all_text, re.IGNORECASE)
+        for pattern in NPK_PATTERNS:
+            matches = finditer(pattern, all_text, lower)
             for match in matches:
                 try:
                     n, p, k = match.groups()
@@ -132,32 +197,33 @@ class NutritionSpider(scrapy.Spider):
                     continue
         
         # Look for stage-specific nutrition info
-        for stage, keywords in stage_keywords.items():
-            stage_content = self.extract_text_containing(response, keywords)
+        for stage in STAGE_KEYWORDS:
+            stage_content = self.extract_text_containing(response, stage)
+            stage_sentences = SentenceIndex.from_text(' '.join(stage_content))
             
             # Extract nitrogen info for this stage
-            nitrogen_info = self.extract_nutrient_info(stage_content, ['nitrogen', 'N', 'nitrate'])
+            nitrogen_info = self.extract_nutrient_info(stage_sentences, ['nitrogen', 'N', 'nitrate'])
             if nitrogen_info:
                 nutrition_data['nitrogen'].extend([f"{stage}: {info}" for info in nitrogen_info])
             
             # Extract phosphorus info
-            phosphorus_info = self.extract_nutrient_info(stage_content, ['phosphorus', 'P', 'phosphate'])
+            phosphorus_info = self.extract_nutrient_info(stage_sentences, ['phosphorus', 'P', 'phosphate'])
             if phosphorus_info:
                 nutrition_data['phosphorus'].extend([f"{stage}: {info}" for info in phosphorus_info])
             
             # Extract potassium info
-            potassium_info = self.extract_nutrient_info(stage_content, ['potassium', 'K', 'potash'])
+            potassium_info = self.extract_nutrient_info(stage_sentences, ['potassium', 'K', 'potash'])
             if potassium_info:
                 nutrition_data['potassium'].extend([f"{stage}: {info}" for info in potassium_info])
         
         # Look for secondary nutrients (Ca, Mg, S)
-        secondary_nutrients = self.extract_nutrient_info(all_text, 
+        secondary_nutrients = self.extract_nutrient_info(document.sentence_index,
             ['calcium', 'magnesium', 'sulfur', 'Ca', 'Mg', 'S'])
         if secondary_nutrients:
             nutrition_data['secondary'].extend(secondary_nutrients)
         
         # Look for micronutrients
-        micronutrients = self.extract_nutrient_info(all_text,
+        micronutrients = self.extract_nutrient_info(document.sentence_index,
             ['iron', 'manganese', 'zinc', 'copper', 'boron', 'molybdenum', 'Fe', 'Mn', 'Zn', 'Cu', 'B', 'Mo'])
         if micronutrients:
             nutrition_data['micronutrients'].extend(micronutrients)
@@ -169,37 +235,21 @@ class NutritionSpider(scrapy.Spider):
         return nutrition_data
     
     def extract_nutrient_info(self, text_content, nutrient_keywords):
-        """Extract specific nutrient information from text"""
-        nutrient_info = []
-        
-        if isinstance(text_content, list):
-            text_content = ' '.join(text_content)
-        
-        for keyword in nutrient_keywords:
-            # Look for sentences containing the nutrient keyword
-            sentences = re.split(r'[.!?]', text_content)
-            for sentence in sentences:
-                if keyword.lower() in sentence.lower():
-                    clean_sentence = sentence.strip()
-                    if len(clean_sentence) > 20 and len(clean_sentence) < 300:
-                        # Look for numbers and measurements
-                        if any(char.isdigit() for char in clean_sentence):
-                            nutrient_info.append(clean_sentence)
-        
-        return nutrient_info
+        """Extract specific nutrient information from text, a list of snippets or a SentenceIndex"""
+        if not isinstance(text_content, SentenceIndex):
+            if isinstance(text_content, list):
+                text_content = ' '.join(text_content)
+            text_content = SentenceIndex.from_text(text_content)
+        
+        # Sentences with numbers and measurements that mention a nutrient keyword
+        return text_content.find(nutrient_keywords)
     
     def extract_nutrient_recipes(self, response, crop_name):
         """Extract detailed nutrient recipes for different growth stages"""
         recipes = []
         
         # Look for fertilizer schedules or feeding charts
-        schedule_keywords = [
-            'fertilizer schedule', 'feeding schedule', 'nutrient schedule',
-            'fertilizer program', 'feeding program', 'weekly feeding',
-            'application rate', 'fertilizer rate', 'ppm', 'ec'
-        ]
-        
-        schedule_content = self.extract_text_containing(response, schedule_keywords)
+        schedule_content = self.extract_text_containing(response, 'schedule')
         
         if schedule_content:
             # Try to parse into structured recipes
@@ -214,32 +264,21 @@ class NutritionSpider(scrapy.Spider):
         """Parse fertilizer schedule text into structured data"""
         from crop_scraper.items import CropItem
         
-        # Look for timing indicators
-        timing_patterns = [
-            r'week (\d+)', r'day (\d+)', r'(\d+) weeks?',
-            r'seedling', r'vegetative', r'flowering', r'fruiting'
-        ]
-        
         # Look for NPK values
-        npk_match = re.search(r'(\d+)-(\d+)-(\d+)', content)
-        
-        # Look for application rates
-        rate_patterns = [
-            r'(\d+(?:\.\d+)?)\s*(?:ppm|mg/l|g/l)',
-            r'(\d+(?:\.\d+)?)\s*(?:tablespoons?|tbsp|tsp|cups?)',
-            r'(\d+(?:\.\d+)?)\s*(?:grams?|ounces?|lbs?)'
-        ]
+        npk_match = SCHEDULE_NPK_PATTERN.search(content)
         
         timing = None
-        for pattern in timing_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
+        # Look for timing indicators
+        for pattern in TIMING_PATTERNS:
+            match = pattern.search(content)
             if match:
                 timing = match.group()
                 break
         
         rate = None
-        for pattern in rate_patterns:
-            match = re.search(pattern, content, re.IGNORECASE)
+        # Look for application rates
+        for pattern in RATE_PATTERNS:
+            match = pattern.search(content)
             if match:
                 rate = match.group()
                 break
@@ -268,110 +307,44 @@ class NutritionSpider(scrapy.Spider):
     
     def extract_fertilizer_recommendations(self, response):
         """Extract general fertilizer recommendations"""
-        keywords = [
-            'fertilizer', 'fertilize', 'feed', 'feeding', 'nutrient', 'nutrition',
-            'compost', 'manure', 'organic', 'npk', 'nitrogen', 'phosphorus', 'potassium'
-        ]
-        
-        recommendations = self.extract_text_containing(response, keywords)
+        recommendations = self.extract_text_containing(response, 'fertilizer_recommendations')
         return ' | '.join(recommendations) if recommendations else ''
     
     def extract_water_requirements(self, response):
         """Extract water and irrigation requirements"""
-        keywords = [
-            'water', 'watering', 'irrigation', 'moisture', 'humid', 'wet', 'dry',
-            'inches per week', 'gallons', 'liters'
-        ]
-        
-        water_info = self.extract_text_containing(response, keywords)
+        water_info = self.extract_text_containing(response, 'water')
         return ' | '.join(water_info) if water_info else ''
     
     def extract_soil_requirements(self, response):
         """Extract soil pH and soil requirements"""
-        keywords = ['ph', 'pH', 'acid', 'alkaline', 'soil', 'loam', 'clay', 'sand']
-        
-        soil_info = self.extract_text_containing(response, keywords)
+        soil_info = self.extract_text_containing(response, 'soil')
         return ' | '.join(soil_info) if soil_info else ''
     
     def extract_planting_info(self, response):
         """Extract planting depth and method"""
-        keywords = ['depth', 'plant', 'sow', 'seed', 'inch', 'cm', 'deep']
-        
-        planting_info = self.extract_text_containing(response, keywords)
+        planting_info = self.extract_text_containing(response, 'planting')
         return ' | '.join(planting_info) if planting_info else ''
     
     def extract_spacing_info(self, response):
         """Extract spacing requirements"""
-        keywords = ['space', 'spacing', 'apart', 'distance', 'inch', 'feet', 'cm']
-        
-        spacing_info = self.extract_text_containing(response, keywords)
+        spacing_info = self.extract_text_containing(response, 'spacing')
         return ' | '.join(spacing_info) if spacing_info else ''
     
     def extract_maturity_info(self, response):
         """Extract days to maturity"""
-        keywords = ['days', 'maturity', 'harvest', 'ready', 'weeks']
-        
-        maturity_info = self.extract_text_containing(response, keywords)
+        maturity_info = self.extract_text_containing(response, 'maturity')
         return ' | '.join(maturity_info) if maturity_info else ''
     
     def extract_sun_requirements(self, response):
         """Extract sun and light requirements"""
-        keywords = ['sun', 'light', 'shade', 'full sun', 'partial', 'hours']
-        
-        sun_info = self.extract_text_containing(response, keywords)
+        sun_info = self.extract_text_containing(response, 'sun')
         return ' | '.join(sun_info) if sun_info else ''
     
-    def extract_text_containing(self, response, keywords):
-        """Extract text snippets containing specific keywords"""
-        results = []
-        
-        # Enhanced content selectors for better nutrition data extraction
-        content_selectors = [
-            'div.content *::text',
-            'article *::text',
-            '.entry-content *::text',
-            '.post-content *::text',
-            '.main-content *::text',
-            'main *::text',
-            '.fertilizer *::text',
-            '.nutrition *::text',
-            '.feeding *::text',
-            'table *::text',  # Tables often contain nutrition schedules
-            '.schedule *::text',
-            '.chart *::text'
-        ]
-        
-        # Try to get text from structured content first
-        texts = []
-        for selector in content_selectors:
-            texts = response.css(selector).getall()
-            if texts:
-                break
-        else:
-            # Fallback to all text
-            texts = response.css('*::text').getall()
-        
-        for text in texts:
-            if not text:
-                continue
-            text = text.strip()
-            # Look for substantial text chunks
-            if len(text) > 15 and len(text) < 1000:  
-                for keyword in keywords:
-                    if keyword.lower() in text.lower():
-                        # Clean up the text
-                        cleaned_text = ' '.join(text.split())
-                        # Filter out navigation and header text
-                        if not any(nav_word in cleaned_text.lower() for nav_word in [
-                            'navigation', 'menu', 'calendar', 'holiday', 'moon', 'sun times',
-                            'almanac', 'store', 'sunrise', 'set times', 'best days', 'copyright',
-                            'privacy', 'terms', 'subscribe', 'newsletter'
-                        ]):
-                            if cleaned_text not in results:
-                                results.append(cleaned_text)
-                        break
-        
-        return results[:5]  # Limit to top 5 relevant pieces
+    def extract_text_containing(self, response, field):
+        """Extract text snippets containing one of a snippet field's keywords"""
+        # Try structured content in the main content region first, falling back to all of its text
+        document = content_document(response, CONTENT_SELECTORS, main=True)
+        return list(document.snippets(SNIPPETS)[field])
     
     def extract_name(self, response):
         """Extract crop name"""
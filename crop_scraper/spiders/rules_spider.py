@@ -0,0 +1,67 @@
+import scrapy
+from scrapy import Request
+from crop_scraper.rules import site_rules
+
+
+class RulesSpider(scrapy.Spider):
+    """Crawls a site described in site_rules.SITES.
+
+    scrapy crawl site_rules -a site=<name>, or subclass it with site set.
+    """
+    name = 'site_rules'
+    site = None
+    # Crop pages are skipped on recrawls when unchanged (ConditionalRequestMiddleware)
+    incremental_callbacks = ['parse_page']
+
+    def __init__(self, site=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.site = site or self.site or self.name
+        self.rules = site_rules(self.site)
+        if not getattr(self, 'allowed_domains', None):
+            self.allowed_domains = self.rules.allowed_domains
+        if not getattr(self, 'start_urls', None):
+            self.start_urls = self.rules.start_urls
+        if not self.rules.follow:
+            # The start pages are the crop pages
+            self.incremental_callbacks = self.incremental_callbacks + ['parse']
+
+    def parse(self, response):
+        """Follow listing pages to crop pages, or parse the start pages directly"""
+        if self.rules.follow:
+            yield from self.follow_links(response)
+        else:
+            yield from self.parse_page(response)
+
+    def follow_links(self, response):
+        follow = self.rules.follow
+        url_contains = [word.lower() for word in follow.get('url_contains', [])]
+
+        for link in response.css(follow['links']).getall():
+            if link and (not url_contains or any(word in link.lower() for word in url_contains)):
+                yield Request(
+                    url=response.urljoin(link),
+                    callback=self.parse_page,
+                    meta={'source_page': response.url}
+                )
+
+        next_page = response.css(follow['next_page']).get() if follow.get('next_page') else None
+        if next_page:
+            yield Request(
+                url=response.urljoin(next_page),
+                callback=self.parse
+            )
+
+    def parse_page(self, response):
+        """Extract a CropItem from a crop page"""
+        self.logger.info(f"Parsing crop page: {response.url}")
+
+        if response.status != 200:
+            self.logger.warning(f"Page not found: {response.url}")
+            return
+
+        item = self.rules.extract(response)
+        if item is None:
+            return
+
+        self.logger.info(f"Successfully extracted data for: {item.get('name', 'Unknown')}")
+        yield item
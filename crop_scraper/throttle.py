@@ -0,0 +1,144 @@
+# Adaptive per-domain concurrency and delay (AIMD), replacing AutoThrottle.
+#
+# Every host gets its own downloader slot (Scrapy's default), and this module
+# keeps one HostState per slot: an exponentially weighted moving average of
+# download latency, the lowest such average seen (the host's baseline) and an
+# average error rate. After each response or download error the slot is
+# retuned on its own:
+#
+#     healthy response (error rate below ADAPTIVE_ERROR_THRESHOLD, latency
+#     within ADAPTIVE_LATENCY_TOLERANCE of the baseline)
+#         concurrency grows additively, about +1 per window of requests,
+#         up to ADAPTIVE_MAX_CONCURRENCY, and any backoff decays
+#     slow response (latency above tolerance)
+#         concurrency shrinks by a quarter
+#     overload (a 429/503, or an error that takes the error rate above the
+#     threshold)
+#         concurrency halves and the delay backoff doubles
+#
+# The slot delay is latency / concurrency (keeping about `concurrency`
+# requests in flight), never below ADAPTIVE_MIN_DELAY or the delay the host
+# started with (DOWNLOAD_DELAY, or the spider's download_delay), times the
+# backoff, so each host stays polite while the crawl as a whole scales with
+# the number of domains.
+#
+# When several crawlers of one process share the controller (see shared.py),
+# each has its own slot for a host; the host's concurrency is split between
+# them and the delay multiplied, so the host sees the same load as from one.
+
+# Statuses that mean the server wants fewer requests
+OVERLOAD_STATUSES = frozenset([429, 503])
+# Other statuses counted as errors of the host
+ERROR_STATUSES = frozenset([408, 500, 502, 504, 520, 521, 522, 524])
+
+
+class HostState:
+    """Latency and error averages of one host, and the concurrency they allow"""
+
+    def __init__(self, concurrency):
+        self.concurrency = float(concurrency)
+        # Delay of the slot before it was first retuned
+        self.start_delay = None
+        self.latency = None
+        self.baseline = None
+        self.error_rate = 0.0
+        self.backoff = 1.0
+        self.responses = 0
+        self.errors = 0
+        # Crawlers currently downloading from the host, each through its own slot
+        self.users = set()
+
+    def __repr__(self):
+        latency = f"{self.latency:.2f}s" if self.latency is not None else '-'
+        return (f"HostState(concurrency={self.concurrency:.1f}, latency={latency}, "
+                f"error_rate={self.error_rate:.2f}, backoff={self.backoff:.1f})")
+
+
+class AdaptiveThrottle:
+    """AIMD controller of per-host downloader slots"""
+
+    def __init__(self, start_concurrency=1, max_concurrency=4, min_delay=1.0, max_delay=30.0,
+                 alpha=0.3, latency_tolerance=2.0, error_threshold=0.1):
+        self.start_concurrency = max(1, start_concurrency)
+        self.max_concurrency = max(self.start_concurrency, max_concurrency)
+        self.min_delay = min_delay
+        self.max_delay = max(min_delay, max_delay)
+        self.alpha = alpha
+        self.latency_tolerance = latency_tolerance
+        self.error_threshold = error_threshold
+        self.hosts = {}
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            start_concurrency=settings.getint('ADAPTIVE_START_CONCURRENCY', 1),
+            max_concurrency=settings.getint('ADAPTIVE_MAX_CONCURRENCY', 4),
+            min_delay=settings.getfloat('ADAPTIVE_MIN_DELAY', 1.0),
+            max_delay=settings.getfloat('ADAPTIVE_MAX_DELAY', 30.0),
+            alpha=settings.getfloat('ADAPTIVE_EWMA_ALPHA', 0.3),
+            latency_tolerance=settings.getfloat('ADAPTIVE_LATENCY_TOLERANCE', 2.0),
+            error_threshold=settings.getfloat('ADAPTIVE_ERROR_THRESHOLD', 0.1),
+        )
+
+    def host(self, key):
+        if key not in self.hosts:
+            self.hosts[key] = HostState(self.start_concurrency)
+        return self.hosts[key]
+
+    def response(self, key, status, latency=None):
+        """Record a response of a host; returns its HostState"""
+        if status in OVERLOAD_STATUSES:
+            return self.record(key, latency, error=True, overload=True)
+        return self.record(key, latency, error=status in ERROR_STATUSES)
+
+    def error(self, key):
+        """Record a download error (timeout, refused connection, ...) of a host"""
+        return self.record(key, None, error=True)
+
+    def record(self, key, latency, error=False, overload=False):
+        state = self.host(key)
+        state.responses += 1
+        state.errors += error
+        state.error_rate += self.alpha * (float(error) - state.error_rate)
+        if latency is not None and not error:
+            state.latency = latency if state.latency is None else state.latency + self.alpha * (latency - state.latency)
+            state.baseline = state.latency if state.baseline is None else min(state.baseline, state.latency)
+
+        if error:
+            if overload or state.error_rate > self.error_threshold:
+                state.concurrency = max(1.0, state.concurrency / 2)
+                state.backoff = min(state.backoff * 2, self.max_delay / self.min_delay if self.min_delay else 64.0)
+        elif self.slowing_down(state):
+            state.concurrency = max(1.0, state.concurrency * 0.75)
+        elif state.error_rate <= self.error_threshold:
+            state.concurrency = min(float(self.max_concurrency), state.concurrency + 1 / state.concurrency)
+            state.backoff = max(1.0, state.backoff * 0.8)
+        return state
+
+    def slowing_down(self, state):
+        """Latency above tolerance of the baseline (and above the minimum delay, where it matters)"""
+        return (state.latency is not None
+                and state.latency > max(self.latency_tolerance * state.baseline, self.min_delay))
+
+    def delay(self, state):
+        """Slot delay for a host: latency / concurrency (at least the minimum and start delay) times backoff"""
+        floor = max(self.min_delay, state.start_delay or 0.0)
+        if state.latency is None:
+            delay = floor
+        else:
+            delay = max(floor, state.latency / state.concurrency)
+        return min(self.max_delay, delay * state.backoff)
+
+    def apply(self, slot, state, user=None):
+        """Retune a user's (crawler's) downloader slot from a host's state"""
+        if state.start_delay is None:
+            state.start_delay = slot.delay
+        state.users.add(user)
+        crawlers = len(state.users)
+        slot.concurrency = max(1, int(state.concurrency / crawlers))
+        slot.delay = min(self.max_delay, self.delay(state) * crawlers)
+
+    def leave(self, user):
+        """Stop counting a crawler that has finished against its hosts"""
+        for state in self.hosts.values():
+            state.users.discard(user)
@@ -0,0 +1,99 @@
+# Per-URL validators for incremental recrawls.
+#
+# For every page a spider extracts from, the store keeps the ETag and
+# Last-Modified headers and the SHA-256 of the body last seen, keyed by the
+# spider and the canonical URL (see frontier.canonicalize_url); spiders that
+# read the same page extract different items from it, so each needs its own
+# copy. ConditionalRequestMiddleware sends them back as If-None-Match /
+# If-Modified-Since; a 304, or a 200 whose body hashes the same, means the
+# page is unchanged and only its freshness columns are updated:
+#
+#     fetched_at  when the current body was first seen
+#     checked_at  when the page was last confirmed (fetched or revalidated)
+#     unchanged   recrawls since fetched_at that found the page unchanged
+
+import os
+import sqlite3
+from datetime import datetime
+
+from crop_scraper.frontier import canonicalize_url
+
+
+class ValidatorStore:
+    """ETag, Last-Modified and body hash of each spider's URLs in a single SQLite file"""
+
+    def __init__(self, path='archive/validators.db'):
+        self.path = path
+        self.connection = None
+
+    def open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS validators (
+                spider TEXT NOT NULL,
+                url TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                sha256 TEXT,
+                fetched_at TEXT NOT NULL,
+                checked_at TEXT NOT NULL,
+                unchanged INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (spider, url)
+            );
+        ''')
+        return self
+
+    def close(self):
+        if self.connection:
+            self.connection.commit()
+            self.connection.close()
+            self.connection = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def commit(self):
+        self.connection.commit()
+
+    def get(self, spider, url):
+        """The stored validators of a spider's URL as a dict, or None"""
+        row = self.connection.execute(
+            '''SELECT etag, last_modified, sha256, fetched_at, checked_at, unchanged FROM validators
+               WHERE spider = ? AND url = ?''',
+            (spider, canonicalize_url(url))
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            'etag': row[0],
+            'last_modified': row[1],
+            'sha256': row[2],
+            'fetched_at': row[3],
+            'checked_at': row[4],
+            'unchanged': row[5],
+        }
+
+    def changed(self, spider, url, sha256, etag=None, last_modified=None):
+        """Record a new body of a spider's URL"""
+        now = datetime.now().isoformat()
+        self.connection.execute(
+            '''INSERT OR REPLACE INTO validators
+                   (spider, url, etag, last_modified, sha256, fetched_at, checked_at, unchanged)
+               VALUES (?, ?, ?, ?, ?, ?, ?, 0)''',
+            (spider, canonicalize_url(url), etag, last_modified, sha256, now, now)
+        )
+
+    def unchanged(self, spider, url, etag=None, last_modified=None):
+        """Record that a spider's URL was found unchanged, keeping validators the server didn't resend"""
+        self.connection.execute(
+            '''UPDATE validators SET checked_at = ?, unchanged = unchanged + 1,
+                   etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+               WHERE spider = ? AND url = ?''',
+            (datetime.now().isoformat(), etag, last_modified, spider, canonicalize_url(url))
+        )
@@ -2,20 +2,35 @@
 """
 Simple web dashboard for viewing crop nutrition data
 """
-import sqlite3
 import json
+import html
+import re
+import time
 from http.server import HTTPServer, SimpleHTTPRequestHandler
 import urllib.parse
 import os
 
+from crop_scraper.storage import open_storage
+
+# Markers wrapped around matched terms by FTS5 snippet(); replaced with <mark>
+# after the snippet text has been HTML-escaped
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
 class CropDataHandler(SimpleHTTPRequestHandler):
     """Custom handler for crop data API and web interface"""
+
+    # Shared by every request; set up in start_server()
+    storage = None
     
     def do_GET(self):
+        parsed = urllib.parse.urlsplit(self.path)
         if self.path == '/':
             self.serve_dashboard()
         elif self.path == '/api/crops':
             self.serve_crops_api()
+        elif parsed.path == '/api/search':
+            self.serve_search_api(urllib.parse.parse_qs(parsed.query))
         elif self.path == '/api/crop-detail':
             self.serve_crop_detail()
         elif self.path.startswith('/api/'):
@@ -80,6 +95,8 @@ class CropDataHandler(SimpleHTTPRequestHandler):
                     margin: 0 5px; border-radius: 4px; cursor: pointer; transition: all 0.2s; 
                 }
                 .filter-btn:hover, .filter-btn.active { background: #2d5016; color: white; }
+                .snippet { color: #555; font-style: italic; }
+                .snippet mark { background: #fff3a8; font-style: normal; }
             </style>
         </head>
         <body>
@@ -135,6 +152,25 @@ class CropDataHandler(SimpleHTTPRequestHandler):
                     }
                 }
                 
+                let searchTimer = null;
+                
+                async function searchCrops(term) {
+                    if (!term.trim()) {
+                        displayCrops(cropsData);
+                        return;
+                    }
+                    try {
+                        const response = await fetch('/api/search?q=' + encodeURIComponent(term));
+                        const data = await response.json();
+                        if (document.getElementById('search').value === term) {
+                            displayCrops(data.results || []);
+                        }
+                    } catch (error) {
+                        document.getElementById('crops').innerHTML = 
+                            '<div class="loading">Search failed. Is the server running?</div>';
+                    }
+                }
+                
                 function displayCrops(crops) {
                     const container = document.getElementById('crops');
                     if (crops.length === 0) {
@@ -149,6 +185,7 @@ class CropDataHandler(SimpleHTTPRequestHandler):
                             <div class="crop-detail"><strong>Soil pH:</strong> ${truncateText(crop.soil_ph || 'Not specified', 40)}</div>
                             <div class="crop-detail"><strong>Sun:</strong> ${truncateText(crop.sun_requirements || 'Not specified', 40)}</div>
                             <div class="crop-detail"><strong>Fertilizer:</strong> ${truncateText(crop.fertilizer_recommendations || 'Not specified', 60)}</div>
+                            ${crop.snippet ? `<div class="crop-detail snippet">${crop.snippet}</div>` : ''}
                             <span class="data-source">${crop.data_source}</span>
                         </div>
                     `).join('');
@@ -185,15 +222,11 @@ class CropDataHandler(SimpleHTTPRequestHandler):
                     displayCrops(filtered);
                 }
                 
-                // Search functionality
+                // Search functionality (ranked full-text search on the server)
                 document.getElementById('search').addEventListener('input', function(e) {
-                    const searchTerm = e.target.value.toLowerCase();
-                    const filtered = cropsData.filter(crop => 
-                        crop.name.toLowerCase().includes(searchTerm) ||
-                        (crop.water_needs && crop.water_needs.toLowerCase().includes(searchTerm)) ||
-                        (crop.fertilizer_recommendations && crop.fertilizer_recommendations.toLowerCase().includes(searchTerm))
-                    );
-                    displayCrops(filtered);
+                    const searchTerm = e.target.value;
+                    clearTimeout(searchTimer);
+                    searchTimer = setTimeout(() => searchCrops(searchTerm), 150);
                 });
                 
                 // Load data when page loads
@@ -211,86 +244,174 @@ class CropDataHandler(SimpleHTTPRequestHandler):
     def serve_crops_api(self):
         """Serve crops data as JSON API"""
         try:
-            conn = sqlite3.connect('crops.db')
-            cursor = conn.cursor()
-            
-            # Get all crops
-            cursor.execute('''
-                SELECT name, water_needs, soil_ph, sun_requirements, 
-                       fertilizer_recommendations, data_source, created_at
-                FROM crops 
-                ORDER BY name
-            ''')
-            
-            crops = []
-            for row in cursor.fetchall():
-                crops.append({
-                    'name': row[0],
-                    'water_needs': row[1],
-                    'soil_ph': row[2],                    'sun_requirements': row[3],
-                    'fertilizer_recommendations': row[4],
-                    'data_source': row[5],
-                    'created_at': row[6]
-                })
-            
-            # Get stats
-            cursor.execute('SELECT COUNT(*) FROM crops')
-            total_crops = cursor.fetchone()[0]
-            
-            cursor.execute('SELECT COUNT(DISTINCT data_source) FROM crops')
-            data_sources = cursor.fetchone()[0]
-            
-            # Calculate completeness
-            cursor.execute('''
-                SELECT 
-                    (COUNT(CASE WHEN water_needs IS NOT NULL AND water_needs != '' THEN 1 END) +
-                     COUNT(CASE WHEN soil_ph IS NOT NULL AND soil_ph != '' THEN 1 END) +
-                     COUNT(CASE WHEN fertilizer_recommendations IS NOT NULL AND fertilizer_recommendations != '' THEN 1 END) +
-                     COUNT(CASE WHEN sun_requirements IS NOT NULL AND sun_requirements != '' THEN 1 END)) * 100.0 / (COUNT(*) * 4)
-                FROM crops
-            ''')
-            result = cursor.fetchone()
-            avg_completeness = round(result[0], 1) if result and result[0] is not None else 0
-            
-            conn.close()
-            
-            response_data = {
-                'crops': crops,
-                'stats': {
-                    'total_crops': total_crops,
-                    'data_sources': data_sources,
-                    'avg_completeness': avg_completeness
-                }
-            }
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                response_data = self.crops_summary(cursor)
             
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
             self.send_header('Access-Control-Allow-Origin', '*')
             self.end_headers()
-            self.wfile.write(json.dumps(response_data, indent=2).encode('utf-8'))
+            self.wfile.write(json.dumps(response_data, indent=2, default=str).encode('utf-8'))
             
         except Exception as e:
             self.send_response(500)
             self.send_header('Content-type', 'application/json')
             self.end_headers()
             self.wfile.write(json.dumps({'error': str(e)}).encode('utf-8'))
+    
+    def crops_summary(self, cursor):
+        """All crops plus dashboard statistics"""
+        # Get all crops
+        cursor.execute('''
+            SELECT name, water_needs, soil_ph, sun_requirements, 
+                   fertilizer_recommendations, data_source, created_at
+            FROM crops 
+            ORDER BY name
+        ''')
+        
+        crops = []
+        for row in cursor.fetchall():
+            crops.append({
+                'name': row[0],
+                'water_needs': row[1],
+                'soil_ph': row[2],                    'sun_requirements': row[3],
+                'fertilizer_recommendations': row[4],
+                'data_source': row[5],
+                'created_at': row[6]
+            })
+        
+        # Get stats
+        cursor.execute('SELECT COUNT(*) FROM crops')
+        total_crops = cursor.fetchone()[0]
+        
+        cursor.execute('SELECT COUNT(DISTINCT data_source) FROM crops')
+        data_sources = cursor.fetchone()[0]
+        
+        # Calculate completeness
+        cursor.execute('''
+            SELECT 
+                (COUNT(CASE WHEN water_needs IS NOT NULL AND water_needs != '' THEN 1 END) +
+                 COUNT(CASE WHEN soil_ph IS NOT NULL AND soil_ph != '' THEN 1 END) +
+                 COUNT(CASE WHEN fertilizer_recommendations IS NOT NULL AND fertilizer_recommendations != '' THEN 1 END) +
+                 COUNT(CASE WHEN sun_requirements IS NOT NULL AND sun_requirements != '' THEN 1 END)) * 100.0 / NULLIF(COUNT(*) * 4, 0)
+            FROM crops
+        ''')
+        result = cursor.fetchone()
+        avg_completeness = round(float(result[0]), 1) if result and result[0] is not None else 0
+        
+        return {
+            'crops': crops,
+            'stats': {
+                'total_crops': total_crops,
+                'data_sources': data_sources,
+                'avg_completeness': avg_completeness
+            }
+        }
+
+    def serve_search_api(self, params):
+        """Serve ranked full-text search results from the crops_fts index"""
+        query = (params.get('q') or [''])[0]
+        try:
+            limit = min(max(int((params.get('limit') or ['20'])[0]), 1), 100)
+        except ValueError:
+            limit = 20
+        
+        terms = re.findall(r'\w+', query.lower())
+        if not terms:
+            self.send_json({'query': query, 'results': [], 'took_ms': 0})
+            return
+        
+        try:
+            with self.storage.connection() as conn:
+                cursor = conn.cursor()
+                started = time.perf_counter()
+                if self.storage.dialect == 'sqlite':
+                    rows = self.search_fts(cursor, terms, limit)
+                else:
+                    rows = self.search_like(cursor, terms, limit)
+                took_ms = (time.perf_counter() - started) * 1000
+            
+            results = []
+            for row in rows:
+                snippet = html.escape(row[7] or '')
+                snippet = snippet.replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
+                results.append({
+                    'name': row[0],
+                    'water_needs': row[1],
+                    'soil_ph': row[2],
+                    'sun_requirements': row[3],
+                    'fertilizer_recommendations': row[4],
+                    'data_source': row[5],
+                    'source_url': row[6],
+                    'snippet': snippet
+                })
+            
+            self.send_json({'query': query, 'results': results, 'took_ms': round(took_ms, 3)})
+            
+        except Exception as e:
+            self.send_json({'error': str(e)}, status=500)
+    
+    def search_fts(self, cursor, terms, limit):
+        """Ranked full-text search using the SQLite crops_fts index"""
+        # bm25 weights follow SEARCH_COLUMNS order; matches in the name count most
+        cursor.execute(f'''
+            SELECT c.name, c.water_needs, c.soil_ph, c.sun_requirements,
+                   c.fertilizer_recommendations, c.data_source, c.source_url,
+                   snippet(crops_fts, -1, '{MATCH_START}', '{MATCH_END}', '…', 16)
+            FROM crops_fts
+            JOIN crops c ON c.id = crops_fts.rowid
+            WHERE crops_fts MATCH ?
+            ORDER BY bm25(crops_fts, 10.0, 8.0, 5.0, 2.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0)
+            LIMIT ?
+        ''', (build_fts_query(terms), limit))
+        return cursor.fetchall()
+    
+    def search_like(self, cursor, terms, limit):
+        """Unranked substring search for backends without the FTS5 index"""
+        searched = "LOWER(COALESCE(name, '') || ' ' || COALESCE(fertilizer_recommendations, '') || ' ' || COALESCE(water_needs, ''))"
+        conditions = ' AND '.join(f"{searched} LIKE ?" for _ in terms)
+        cursor.execute(self.storage.sql(f'''
+            SELECT name, water_needs, soil_ph, sun_requirements,
+                   fertilizer_recommendations, data_source, source_url, ''
+            FROM crops
+            WHERE {conditions}
+            ORDER BY name
+            LIMIT ?
+        '''), [f"%{term}%" for term in terms] + [limit])
+        return cursor.fetchall()
+    
+    def send_json(self, data, status=200):
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(json.dumps(data, indent=2).encode('utf-8'))
+
+def build_fts_query(terms):
+    """Turn search words into an FTS5 query: every word must match, as a prefix"""
+    return ' '.join(f'"{term}"*' for term in terms)
 
 def start_server(port=8000):
     """Start the web server"""
     print(f"🌱 Starting Agricultural Nutrition Database Server...")
     print(f"📊 Dashboard: http://localhost:{port}")
     print(f"🔗 API: http://localhost:{port}/api/crops")
+    print(f"🔎 Search: http://localhost:{port}/api/search?q=tomato")
     print(f"⚡ Press Ctrl+C to stop\n")
     
     # Change to project directory
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
     
+    CropDataHandler.storage = open_storage()
     server = HTTPServer(('localhost', port), CropDataHandler)
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         print(f"\n👋 Server stopped")
         server.shutdown()
+    finally:
+        CropDataHandler.storage.close()
 
 if __name__ == "__main__":
     start_server()
@@ -2,20 +2,46 @@
 """
 Enhanced data analysis and visualization for the crop nutrition project
 """
-import sqlite3
 import json
 import matplotlib.pyplot as plt
 import pandas as pd
 from collections import defaultdict
 import re
+import os
+
+from crop_scraper.storage import open_storage
+
+PARQUET_EXPORT_DIR = 'exports/parquet'
+
+# Columns used by the analysis below
+ANALYSIS_COLUMNS = [
+    'name', 'category', 'data_source', 'water_needs', 'soil_ph', 'ph_min', 'ph_max',
+    'fertilizer_recommendations', 'sun_requirements', 'days_to_maturity', 'maturity_days_min',
+]
+
+def load_crops():
+    """Load crop data, preferring the Parquet export over the live database"""
+    if os.path.isdir(os.path.join(PARQUET_EXPORT_DIR, 'crops')):
+        try:
+            from crop_scraper.exporters import read_crops
+            df = read_crops(PARQUET_EXPORT_DIR, columns=ANALYSIS_COLUMNS)
+            print(f"Loaded {len(df)} crops from {PARQUET_EXPORT_DIR}")
+            return df
+        except ImportError:
+            print("⚠️  pyarrow not available - reading the database instead")
+    
+    storage = open_storage()
+    try:
+        with storage.connection() as conn:
+            return pd.read_sql_query("SELECT * FROM crops", conn)
+    finally:
+        storage.close()
 
 def create_data_analysis():
     """Analyze the collected crop data and create visualizations"""
     
-    conn = sqlite3.connect('crops.db')
-    
     # Read crop data into pandas
-    df = pd.read_sql_query("SELECT * FROM crops", conn)
+    df = load_crops()
     
     print("=== CROP NUTRITION DATA ANALYSIS ===\n")
     
@@ -48,8 +74,6 @@ def create_data_analysis():
     # Generate crop comparison report
     generate_crop_comparison(df)
     
-    conn.close()
-    
     print(f"\n✅ Analysis complete! Check generated files:")
     print("- crop_analysis_charts.png")
     print("- crop_comparison_report.html")
@@ -80,7 +104,16 @@ def analyze_ph_requirements(df):
         crop_name = row['name']
         ph_text = str(row['soil_ph']) if row['soil_ph'] else ""
         
-        if 'acid' in ph_text.lower():
+        # Prefer the typed columns filled in by NormalizationPipeline
+        ph_min, ph_max = row.get('ph_min'), row.get('ph_max')
+        if pd.notna(ph_min) and pd.notna(ph_max):
+            if ph_max < 7.0:
+                ph_data['Acidic (< 7.0)'].append(crop_name)
+            elif ph_min > 7.0:
+                ph_data['Alkaline (> 7.0)'].append(crop_name)
+            else:
+                ph_data['Neutral (6.0-7.5)'].append(crop_name)
+        elif 'acid' in ph_text.lower():
             ph_data['Acidic (< 7.0)'].append(crop_name)
         elif 'alkaline' in ph_text.lower() or 'basic' in ph_text.lower():
             ph_data['Alkaline (> 7.0)'].append(crop_name)
@@ -137,12 +170,15 @@ def create_visualizations(df):
         ax2.set_title('Crops by Data Source')
         
         # Chart 3: Days to maturity distribution (if we have numeric data)
-        maturity_data = []
-        for maturity in df['days_to_maturity'].dropna():
-            # Extract numbers from text
-            numbers = re.findall(r'\d+', str(maturity))
-            if numbers:
-                maturity_data.append(int(numbers[0]))
+        if 'maturity_days_min' in df:
+            maturity_data = df['maturity_days_min'].dropna().astype(int).tolist()
+        else:
+            # Older databases without the typed columns
+            maturity_data = []
+            for maturity in df['days_to_maturity'].dropna():
+                numbers = re.findall(r'\d+', str(maturity))
+                if numbers:
+                    maturity_data.append(int(numbers[0]))
         
         if maturity_data:
             ax3.hist(maturity_data, bins=8, color='#9370DB', alpha=0.7, edgecolor='black')
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Export the crop database (DATABASE_URL) to partitioned Parquet files for analytics
+"""
+import argparse
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from crop_scraper.exporters import export_database
+from crop_scraper.storage import default_database_url, sqlite_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database', help='Database URL or SQLite file to export (default: DATABASE_URL)')
+    parser.add_argument('--output', default='exports/parquet', help='Root directory of the export')
+    args = parser.parse_args()
+
+    database_url = args.database or default_database_url()
+    if '://' not in database_url:
+        database_url = f"sqlite:///{database_url}"
+    path = sqlite_path(database_url)
+    if path is not None and not os.path.exists(path):
+        print(f"❌ Database not found: {path}")
+        return 1
+
+    counts = export_database(database_url, args.output)
+    for table, count in counts.items():
+        print(f"✅ {table}: {count} rows exported to {os.path.join(args.output, table)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Convert streamed JSON Lines exports back into the single-array JSON format
+(crops_data.json) used by the older scripts and reports
+"""
+import argparse
+import glob
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from crop_scraper.pipelines import jsonl_to_json
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('inputs', nargs='*', default=['exports/*.jsonl*'],
+                        help='JSON Lines files or glob patterns (.gz parts are supported)')
+    parser.add_argument('-o', '--output', default='crops_data.json',
+                        help='Path of the JSON array to write')
+    args = parser.parse_args()
+
+    paths = []
+    for pattern in args.inputs:
+        paths.extend(sorted(glob.glob(pattern)) or [pattern])
+    paths = [path for path in paths if os.path.exists(path)]
+
+    if not paths:
+        print("❌ No JSON Lines files found")
+        return 1
+
+    count = jsonl_to_json(paths, args.output)
+    print(f"✅ Wrote {count} items from {len(paths)} file(s) to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Re-run a spider's extraction over archived pages (see RESPONSE_ARCHIVE_PATH)
+on all CPU cores, without recrawling, and store the results through the
+normal item pipelines
+"""
+import argparse
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapy.utils.project import get_project_settings
+
+from crop_scraper.replay import replay_archive
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('spider', help='Spider whose archived pages are replayed, e.g. almanac')
+    parser.add_argument('--callback', help='Only replay pages parsed by this method, e.g. parse_crop')
+    parser.add_argument('--url-contains', help='Only replay pages whose URL contains this text')
+    parser.add_argument('--archive', help='Archive file (default: RESPONSE_ARCHIVE_PATH)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--all-fetches', action='store_true',
+                        help='Replay every archived fetch, not just the latest per URL')
+    args = parser.parse_args()
+
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'crop_scraper.settings')
+    settings = get_project_settings()
+
+    print(f"🔁 Re-extracting archived pages for spider '{args.spider}'...")
+    counts = replay_archive(
+        settings, args.spider,
+        archive_path=args.archive,
+        callback=args.callback,
+        workers=args.workers,
+        url_contains=args.url_contains,
+        latest=not args.all_fetches,
+    )
+
+    if not counts['pages']:
+        print("❌ No archived pages found - crawl with RESPONSE_ARCHIVE_ENABLED = True first")
+        return 1
+
+    rate = counts['pages'] / counts['seconds'] if counts['seconds'] else counts['pages']
+    print(f"✅ {counts['pages']} pages -> {counts['items']} items "
+          f"({counts['stored']} passed the pipelines, {counts['dropped']} dropped) "
+          f"in {counts['seconds']}s ({rate:.0f} pages/s)")
+    if counts['errors']:
+        print(f"⚠️  {counts['errors']} pages failed, see the log for details")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -34,10 +34,11 @@ def run_enhanced_nutrition_collection():
     settings.update({
         'DOWNLOAD_DELAY': 3,
         'RANDOMIZE_DOWNLOAD_DELAY': True,
-        'CONCURRENT_REQUESTS': 1,
         'LOG_LEVEL': 'INFO',
         'ITEM_PIPELINES': {
             'crop_scraper.pipelines.ValidationPipeline': 300,
+            'crop_scraper.pipelines.NormalizationPipeline': 350,
+            'crop_scraper.pipelines.DedupPipeline': 380,
             'crop_scraper.pipelines.DatabasePipeline': 400,
             'crop_scraper.pipelines.JsonWriterPipeline': 500,
         },
@@ -48,11 +49,6 @@ def run_enhanced_nutrition_collection():
                 'overwrite': True,
             },
         },
-        # Enhanced extraction settings
-        'AUTOTHROTTLE_ENABLED': True,
-        'AUTOTHROTTLE_START_DELAY': 2,
-        'AUTOTHROTTLE_MAX_DELAY': 10,
-        'AUTOTHROTTLE_TARGET_CONCURRENCY': 1.0,
     })
     
     # Run the spider
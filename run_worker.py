@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Run a spider as a worker node of a distributed crawl: requests come from and
+go to a shared broker (see BROKER_PATH), which dedups them and paces each
+domain for all nodes, and items go to the broker's sink. Start as many
+workers as you like, here or on other machines sharing the broker file, then
+store the items with --drain
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from scrapy.utils.project import get_project_settings
+
+from crop_scraper.distributed import Broker, drain_items, run_worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('spider', help='Spider to crawl, e.g. almanac')
+    parser.add_argument('--broker', help='Broker file (default: BROKER_PATH)')
+    parser.add_argument('--node', help='Name of this node (default: <hostname>-<pid>)')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Start this many worker processes on this machine')
+    parser.add_argument('--reset', action='store_true',
+                        help="Forget the spider's finished crawl in the broker first, to crawl it again")
+    parser.add_argument('--drain', action='store_true',
+                        help="Don't crawl; run the items in the sink through the item pipelines")
+    args = parser.parse_args()
+
+    os.environ.setdefault('SCRAPY_SETTINGS_MODULE', 'crop_scraper.settings')
+    settings = get_project_settings()
+    if args.broker:
+        settings.set('BROKER_PATH', args.broker, priority='cmdline')
+
+    if args.reset:
+        with Broker.from_settings(settings) as broker:
+            broker.reset(args.spider)
+        print(f"🧹 Reset '{args.spider}' in {settings.get('BROKER_PATH')}")
+
+    if args.drain:
+        print(f"📥 Storing items of '{args.spider}' from {settings.get('BROKER_PATH')}...")
+        counts = drain_items(settings, args.spider)
+        print(f"✅ {counts['items']} items ({counts['stored']} passed the pipelines, {counts['dropped']} dropped)")
+        return 0
+
+    if args.processes > 1:
+        node = args.node or 'worker'
+        command = [sys.executable, os.path.abspath(__file__), args.spider]
+        if args.broker:
+            command += ['--broker', args.broker]
+        print(f"🚀 Starting {args.processes} workers for '{args.spider}'...")
+        workers = [subprocess.Popen(command + ['--node', f"{node}-{i}"]) for i in range(1, args.processes + 1)]
+        failed = sum(1 for worker in workers if worker.wait() != 0)
+        with Broker.from_settings(settings) as broker:
+            print(f"✅ Broker: {broker.stats(args.spider)}")
+        return 1 if failed else 0
+
+    counts = run_worker(settings, args.spider, node=args.node)
+    print(f"✅ {counts['node']}: {counts['pages']} pages -> {counts['items']} items in {counts['seconds']}s "
+          f"({counts['duplicates']} duplicate requests skipped) [{counts['finish_reason']}]")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
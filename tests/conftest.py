@@ -0,0 +1,4 @@
+from scrapy.utils.reactor import install_reactor
+
+# The reactor the project runs on (TWISTED_REACTOR), installed before anything imports the default one
+install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
@@ -0,0 +1,90 @@
+import pytest
+import scrapy
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from crop_scraper.archive import ResponseArchive, callback_name
+from crop_scraper.middlewares import ResponseArchiveMiddleware
+from crop_scraper.spiders.nutrition_spider import NutritionSpider
+
+URL = 'https://www.almanac.com/plant/tomatoes'
+
+PAGE = b'''<html><head><title>Tomatoes</title></head><body>
+<h1 class="page-title">Tomatoes</h1>
+<div class="content">
+  <p>Tomatoes need soil with a pH of 6.2 to 6.8 and full sun, at least 8 hours a day.</p>
+  <p>At planting, feed seedlings a 5-10-10 fertilizer. Water 1 to 2 inches per week.</p>
+</div>
+</body></html>'''
+
+
+@pytest.fixture
+def archive(tmp_path):
+    with ResponseArchive(str(tmp_path / 'responses.db')) as archive:
+        yield archive
+
+
+def page(body=PAGE, callback=None):
+    request = scrapy.Request(URL, callback=callback)
+    return HtmlResponse(URL, body=body, headers={'Content-Type': 'text/html; charset=utf-8'}, request=request)
+
+
+def test_response_round_trips(archive):
+    response = page()
+    archive.add_response(response, spider='nutrition', callback='parse')
+
+    record = archive.latest(URL)
+    assert (record['spider'], record['callback'], record['status']) == ('nutrition', 'parse', 200)
+    loaded = archive.load_response(record)
+    assert isinstance(loaded, HtmlResponse)
+    assert (loaded.url, loaded.body, loaded.headers['Content-Type']) == (URL, PAGE, b'text/html; charset=utf-8')
+
+
+def test_archived_page_extracts_like_the_live_one(archive):
+    archive.add_response(page(), spider='nutrition', callback='parse')
+    loaded = archive.load_response(archive.latest(URL))
+    loaded.request = scrapy.Request(URL)
+
+    spider = NutritionSpider()
+    live = [dict(item) for item in spider.parse(page())]
+    assert live and [dict(item) for item in spider.parse(loaded)] == live
+
+
+def test_identical_bodies_are_stored_once(archive):
+    archive.add(URL, PAGE, spider='nutrition', fetched_at='2025-05-26T10:00:00')
+    archive.add(URL, PAGE, spider='nutrition', fetched_at='2025-05-27T10:00:00')
+    archive.add(URL + '/care', PAGE, spider='almanac')
+    archive.add(URL, PAGE + b'<!-- updated -->', spider='nutrition', fetched_at='2025-05-28T10:00:00')
+
+    stats = archive.stats()
+    assert (stats['responses'], stats['bodies']) == (4, 2)
+    assert stats['stored_bytes'] < stats['raw_bytes']
+    assert [record['fetched_at'] for record in archive.records(spider='nutrition')] == ['2025-05-28T10:00:00']
+    assert len(list(archive.records(spider='nutrition', latest=False))) == 3
+
+
+def test_callback_name():
+    spider = NutritionSpider()
+    assert callback_name(scrapy.Request(URL)) == 'parse'
+    assert callback_name(scrapy.Request(URL, callback=spider.parse)) == 'parse'
+    assert callback_name(scrapy.Request(URL, callback=spider.extract_stage_nutrition)) == 'extract_stage_nutrition'
+
+
+def test_middleware_skips_cached_responses(tmp_path):
+    crawler = get_crawler(NutritionSpider, {
+        'RESPONSE_ARCHIVE_ENABLED': True,
+        'RESPONSE_ARCHIVE_PATH': str(tmp_path / 'responses.db'),
+    })
+    middleware = ResponseArchiveMiddleware.from_crawler(crawler)
+    spider = NutritionSpider()
+    middleware.spider_opened(spider)
+
+    response = page(callback=spider.parse)
+    assert middleware.process_response(response.request, response, spider) is response
+    cached = page()
+    cached.flags.append('cached')
+    middleware.process_response(cached.request, cached, spider)
+    middleware.spider_closed(spider)
+
+    with ResponseArchive(str(tmp_path / 'responses.db')) as archive:
+        assert [(record['url'], record['callback']) for record in archive.records()] == [(URL, 'parse')]
@@ -0,0 +1,71 @@
+import pytest
+import scrapy
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from crop_scraper.middlewares import ConditionalRequestMiddleware
+from crop_scraper.validators import ValidatorStore
+
+URL = 'https://example.com/plant/tomato'
+
+
+class PlantSpider(scrapy.Spider):
+    name = 'plants'
+    incremental_callbacks = ['parse']
+
+
+@pytest.fixture
+def middleware(tmp_path):
+    store = ValidatorStore(str(tmp_path / 'validators.db')).open()
+    yield ConditionalRequestMiddleware(store, stats=get_crawler(PlantSpider).stats)
+    store.close()
+
+
+def fetch(middleware, spider, body=b'<p>Tomato</p>', status=200, headers=None):
+    """Run a request for URL through the middleware, returning the request and the response it passed on"""
+    request = scrapy.Request(URL)
+    middleware.process_request(request, spider)
+    response = HtmlResponse(URL, status=status, body=body, headers=headers, request=request)
+    return request, middleware.process_response(request, response, spider)
+
+
+def parsed(middleware, spider, request, response, failed=False):
+    middleware.page_parsed(request=request, response=response, failed=failed, spider=spider)
+
+
+def test_unchanged_page_is_skipped(middleware):
+    spider = PlantSpider()
+    request, response = fetch(middleware, spider, headers={'ETag': '"v1"'})
+    parsed(middleware, spider, request, response)
+
+    request = scrapy.Request(URL)
+    middleware.process_request(request, spider)
+    assert request.headers['If-None-Match'] == b'"v1"'
+    with pytest.raises(IgnoreRequest):
+        fetch(middleware, spider, body=b'', status=304)
+    with pytest.raises(IgnoreRequest):
+        fetch(middleware, spider)
+
+
+def test_changed_page_is_parsed(middleware):
+    spider = PlantSpider()
+    request, response = fetch(middleware, spider)
+    parsed(middleware, spider, request, response)
+
+    request, response = fetch(middleware, spider, body=b'<p>Tomato, updated</p>')
+    assert response.request is request
+
+
+def test_page_is_not_skipped_after_a_failed_parse(middleware):
+    spider = PlantSpider()
+    request, response = fetch(middleware, spider)
+    assert middleware.store.get(spider.name, URL) is None
+
+    parsed(middleware, spider, request, response, failed=True)
+    assert middleware.store.get(spider.name, URL) is None
+    request, response = fetch(middleware, spider)
+
+    parsed(middleware, spider, request, response)
+    with pytest.raises(IgnoreRequest):
+        fetch(middleware, spider)
@@ -0,0 +1,105 @@
+import pytest
+from scrapy.http import HtmlResponse, Request
+
+from crop_scraper import content
+from crop_scraper.content import main_content, main_content_nodes, template_key
+from crop_scraper.spiders.almanac_focused_spider import AlmanacFocusedSpider
+from crop_scraper.spiders.almanac_spider import AlmanacSpider
+from crop_scraper.spiders.mini_test_spider import MiniTestSpider
+from crop_scraper.spiders.nutrition_spider import NutritionSpider
+
+URL = 'https://www.almanac.com/plant/tomatoes'
+
+ARTICLE = '''<article>
+<h1 class="page-title">Tomatoes</h1>
+<div class="content">
+  <p>Tomatoes need plenty of water: 1 to 2 inches per week, more in drought.</p>
+  <p>Soil pH should be slightly acid, 6.2 to 6.8, in well-drained loam.</p>
+  <p>Feed with a 5-10-10 fertilizer at planting and compost in spring.</p>
+  <p>Give them full sun, at least 8 hours of light a day.</p>
+  <p>Sow seeds 1/4 inch deep indoors and plant out after the last frost.</p>
+  <p>Space plants 24 to 36 inches apart in rows 4 feet apart.</p>
+  <p>Harvest 60 to 85 days after transplanting, when fruit is ripe and ready.</p>
+  <p>Temperatures below 50 degrees and cold nights slow growth; protect from frost.</p>
+  <p>Water deeply at the base so leaves stay dry in summer.</p>
+</div>
+</article>'''
+
+CLEAN = f'<html><body>{ARTICLE}</body></html>'
+
+NOISY = f'''<html><head><title>Tomatoes</title></head><body>
+<header><div class="menu"><a href="/gardening">Gardening</a> <a href="/weather">Weather</a>
+  <p>Plant by the moon: best days to water and plant this month, with sunrise and sunset times.</p></div></header>
+<nav><ul><li><a href="/plant/carrots">Carrots: sow seeds 1/4 inch deep, 2 inches apart</a></li>
+  <li><a href="/plant/corn">Corn needs full sun and rich soil with plenty of water</a></li></ul></nav>
+<div class="layout">
+  <div class="sidebar"><p>Our garden planner shows spacing in inches and feet for every plant you grow.</p></div>
+  {ARTICLE}
+</div>
+<div class="calendar-widget"><p>Frost dates: the average last spring frost is 30 days away in your zone.</p></div>
+<footer><p>Sign up for our newsletter: weekly tips on fertilizer, soil, compost and watering.</p></footer>
+</body></html>'''
+
+PARSERS = [
+    (AlmanacSpider, 'parse_crop'),
+    (AlmanacFocusedSpider, 'parse_page'),
+    (MiniTestSpider, 'parse_page'),
+    (NutritionSpider, 'parse'),
+]
+
+
+def page(body, url=URL):
+    return HtmlResponse(url, body=body.encode(), encoding='utf-8', request=Request(url))
+
+
+def items(spidercls, callback, body):
+    return [dict(item) for item in getattr(spidercls(), callback)(page(body))]
+
+
+@pytest.fixture(autouse=True)
+def templates(monkeypatch):
+    """Start every test without remembered template locators"""
+    monkeypatch.setattr(content, 'templates', {})
+    return content.templates
+
+
+@pytest.fixture
+def whole_page(monkeypatch):
+    """Read whole pages, as the extractors did before main-content isolation"""
+    monkeypatch.setattr('crop_scraper.document.main_content_nodes', lambda response, selector=None: None)
+
+
+def test_region_is_the_article():
+    response = page(NOISY)
+    assert main_content(response).tag == 'article'
+    text = ' '.join(main_content_nodes(response))
+    assert 'Water deeply at the base' in text
+    assert not any(noise in text for noise in ('moon', 'Corn needs', 'garden planner', 'Frost dates', 'newsletter'))
+
+
+def test_page_with_little_prose_is_used_whole():
+    assert main_content(page('<html><body><nav>Home</nav><p>Tomatoes</p></body></html>')) is None
+
+
+def test_region_is_remembered_per_site_template(templates):
+    main_content(page(NOISY))
+    assert templates == {template_key(URL): '/html/body/div[normalize-space(@class)="layout"]/article'}
+
+    response = page(NOISY.replace('Tomatoes', 'Carrots'), url='https://www.almanac.com/plant/carrots')
+    assert main_content(response).tag == 'article'
+
+
+@pytest.mark.parametrize('spidercls, callback', PARSERS)
+def test_uncluttered_page_gives_the_whole_page_items(spidercls, callback, request):
+    isolated = items(spidercls, callback, CLEAN)
+    request.getfixturevalue('whole_page')
+    assert isolated == items(spidercls, callback, CLEAN)
+
+
+@pytest.mark.parametrize('spidercls, callback', PARSERS)
+def test_navigation_and_footers_are_left_out(spidercls, callback):
+    assert items(spidercls, callback, NOISY) == items(spidercls, callback, CLEAN)
+
+
+def test_whole_page_picks_up_navigation(whole_page):
+    assert items(AlmanacFocusedSpider, 'parse_page', NOISY) != items(AlmanacFocusedSpider, 'parse_page', CLEAN)
@@ -0,0 +1,193 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+from scrapy.exceptions import DropItem
+from twisted.internet.defer import Deferred
+
+from crop_scraper.items import CropItem
+from crop_scraper.pipelines import DatabasePipeline
+
+
+def crop(name, **fields):
+    return CropItem(name=name, source_url=f'https://example.com/{name.lower()}', data_source='test', **fields)
+
+
+def stored_names(path):
+    with sqlite3.connect(path) as connection:
+        return sorted(row[0] for row in connection.execute('SELECT name FROM crops'))
+
+
+def test_rows_wait_for_a_full_batch(tmp_path):
+    path = tmp_path / 'crops.db'
+    pipeline = DatabasePipeline(database_url=f'sqlite:///{path}', batch_size=3, batch_max_age=60)
+    pipeline.open_spider(None)
+
+    pipeline.process_item(crop('Tomato'), None)
+    pipeline.process_item(crop('Carrot'), None)
+    assert stored_names(path) == []
+
+    pipeline.process_item(crop('Pepper'), None)
+    assert stored_names(path) == ['Carrot', 'Pepper', 'Tomato']
+    pipeline.close_spider(None)
+
+
+def test_close_spider_flushes_partial_batch(tmp_path):
+    path = tmp_path / 'crops.db'
+    pipeline = DatabasePipeline(database_url=f'sqlite:///{path}', batch_size=100, batch_max_age=60)
+    pipeline.open_spider(None)
+
+    pipeline.process_item(crop('Tomato'), None)
+    pipeline.process_item(crop('Carrot'), None)
+    assert stored_names(path) == []
+
+    pipeline.close_spider(None)
+    assert stored_names(path) == ['Carrot', 'Tomato']
+    assert pipeline.storage is None
+
+
+def test_row_that_failed_to_write_is_inserted_when_seen_again(tmp_path):
+    path = tmp_path / 'crops.db'
+    pipeline = DatabasePipeline(database_url=f'sqlite:///{path}', batch_size=3, batch_max_age=60)
+    pipeline.open_spider(None)
+
+    # A set can't be bound, so the batch falls back to row-by-row writes and skips it
+    for item in (crop('Tomato'), crop('Beet', soil_type={'loam'}), crop('Carrot')):
+        pipeline.process_item(item, None)
+    assert stored_names(path) == ['Carrot', 'Tomato']
+
+    pipeline.process_item(crop('Beet', soil_type='loam'), None)
+    pipeline.process_item(crop('Tomato'), None)
+    pipeline.close_spider(None)
+    assert stored_names(path) == ['Beet', 'Carrot', 'Tomato']
+
+
+class WriterHarness:
+    """A threaded DatabasePipeline whose writer waits on a gate and whose reactor calls run on demand"""
+
+    def __init__(self, tmp_path, monkeypatch, **kwargs):
+        from twisted.internet import reactor
+
+        self.path = tmp_path / 'crops.db'
+        self.calls = []
+        monkeypatch.setattr(reactor, 'callFromThread', lambda f, *args: self.calls.append((f, args)))
+        self.pipeline = DatabasePipeline(database_url=f'sqlite:///{self.path}', batch_max_age=60, **kwargs)
+        self.gate = threading.Event()
+        queue_row = self.pipeline.queue_row
+
+        def gated_queue_row(*entry):
+            self.gate.wait()
+            if entry[1][0] == 'Bad':
+                raise TypeError('unsupported value')
+            queue_row(*entry)
+
+        self.pipeline.queue_row = gated_queue_row
+        self.pipeline.open_spider(None)
+
+    def wait_for(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+    def run_reactor_calls(self):
+        calls, self.calls = self.calls, []
+        for f, args in calls:
+            f(*args)
+
+
+def test_writer_defers_items_while_the_queue_is_full(tmp_path, monkeypatch):
+    harness = WriterHarness(tmp_path, monkeypatch, queue_size=1)
+    pipeline = harness.pipeline
+
+    assert isinstance(pipeline.process_item(crop('Tomato'), None), CropItem)
+    harness.wait_for(pipeline.queue.empty)
+    assert isinstance(pipeline.process_item(crop('Carrot'), None), CropItem)
+    waiting = crop('Pepper')
+    d = pipeline.process_item(waiting, None)
+    assert isinstance(d, Deferred) and not d.called
+
+    harness.gate.set()
+    harness.wait_for(lambda: harness.calls)
+    harness.run_reactor_calls()
+    assert d.called and d.result is waiting
+
+    pipeline.stop_writer()
+    assert stored_names(harness.path) == ['Carrot', 'Pepper', 'Tomato']
+
+
+def test_writer_skips_a_bad_row_and_keeps_going(tmp_path, monkeypatch):
+    harness = WriterHarness(tmp_path, monkeypatch, queue_size=10)
+    pipeline = harness.pipeline
+    harness.gate.set()
+
+    for name in ('Tomato', 'Bad', 'Carrot'):
+        pipeline.process_item(crop(name), None)
+    harness.wait_for(pipeline.queue.empty)
+    assert pipeline.writer_thread.is_alive()
+
+    pipeline.stop_writer()
+    assert stored_names(harness.path) == ['Carrot', 'Tomato']
+
+
+def test_item_error_flushes_the_writers_batch(tmp_path, monkeypatch):
+    harness = WriterHarness(tmp_path, monkeypatch, queue_size=10, batch_size=100)
+    pipeline = harness.pipeline
+    harness.gate.set()
+    crop_row = pipeline.crop_row
+
+    def failing_crop_row(adapter):
+        if adapter['name'] == 'Broken':
+            raise ValueError('unreadable item')
+        return crop_row(adapter)
+
+    monkeypatch.setattr(pipeline, 'crop_row', failing_crop_row)
+    pipeline.process_item(crop('Tomato'), None)
+    pipeline.process_item(crop('Carrot'), None)
+    with pytest.raises(DropItem):
+        pipeline.process_item(crop('Broken'), None)
+
+    harness.wait_for(lambda: stored_names(harness.path) == ['Carrot', 'Tomato'])
+    assert pipeline.writer_thread.is_alive()
+    pipeline.stop_writer()
+
+
+def test_dead_writer_drops_waiting_and_later_items(tmp_path, monkeypatch):
+    harness = WriterHarness(tmp_path, monkeypatch, queue_size=1)
+    pipeline = harness.pipeline
+
+    pipeline.process_item(crop('Tomato'), None)
+    harness.wait_for(pipeline.queue.empty)
+    pipeline.process_item(crop('Carrot'), None)
+    d = pipeline.process_item(crop('Pepper'), None)
+    failures = []
+    d.addErrback(failures.append)
+
+    def broken_get(*args, **kwargs):
+        raise RuntimeError('queue broken')
+
+    pipeline.queue.get = broken_get
+    harness.gate.set()
+    harness.wait_for(lambda: not pipeline.writer_thread.is_alive())
+    harness.run_reactor_calls()
+    assert failures and failures[0].check(DropItem)
+
+    with pytest.raises(DropItem):
+        pipeline.process_item(crop('Onion'), None)
+    pipeline.stop_writer()
+    assert pipeline.writer_thread is None
+
+
+def test_stop_writer_gives_up_on_a_stuck_writer(tmp_path, monkeypatch):
+    harness = WriterHarness(tmp_path, monkeypatch, queue_size=1, stop_timeout=0.2)
+    pipeline = harness.pipeline
+
+    pipeline.process_item(crop('Tomato'), None)
+    harness.wait_for(pipeline.queue.empty)
+    pipeline.process_item(crop('Carrot'), None)
+
+    start = time.monotonic()
+    pipeline.stop_writer()
+    assert time.monotonic() - start < 2
+    harness.gate.set()
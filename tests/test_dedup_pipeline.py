@@ -0,0 +1,55 @@
+import sqlite3
+
+import pytest
+from scrapy.exceptions import DropItem
+
+from crop_scraper.items import CropItem
+from crop_scraper.pipelines import DatabasePipeline, DedupPipeline
+
+
+def crop(name, **fields):
+    return CropItem(name=name, source_url=f'https://example.com/{name.lower()}', data_source='test', **fields)
+
+
+def store(database_url, *items):
+    pipeline = DatabasePipeline(database_url=database_url)
+    pipeline.open_spider(None)
+    for item in items:
+        pipeline.process_item(item, None)
+    pipeline.close_spider(None)
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    url = f'sqlite:///{tmp_path}/crops.db'
+    store(url, crop('Tomato', soil_ph='6.0'), crop('Carrot', soil_ph='6.5'))
+    return url
+
+
+def test_unchanged_and_changed_items_reach_the_exports(database_url):
+    dedup = DedupPipeline(database_url=database_url)
+    dedup.open_spider(None)
+
+    unchanged = crop('Tomato', soil_ph='6.0')
+    changed = crop('Carrot', soil_ph='7.0')
+    assert dedup.process_item(unchanged, None) is unchanged
+    assert dedup.process_item(changed, None) is changed
+    assert dedup.unchanged == 1
+
+    with pytest.raises(DropItem):
+        dedup.process_item(crop('Tomato', soil_ph='6.0'), None)
+    dedup.close_spider(None)
+
+
+def test_unchanged_item_only_bumps_last_seen(database_url, tmp_path):
+    path = tmp_path / 'crops.db'
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE crops SET last_seen = 'before'")
+
+    store(database_url, crop('Tomato', soil_ph='6.0'))
+
+    with sqlite3.connect(path) as connection:
+        rows = dict(connection.execute('SELECT name, last_seen FROM crops'))
+        assert connection.execute('SELECT COUNT(*) FROM crops').fetchone()[0] == 2
+    assert rows['Tomato'] != 'before'
+    assert rows['Carrot'] == 'before'
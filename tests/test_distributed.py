@@ -0,0 +1,100 @@
+import time
+
+import pytest
+import scrapy
+from scrapy import signals
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from crop_scraper.distributed import Broker, DistributedScheduler
+from crop_scraper.signals import request_finished
+
+URL = 'https://example.com/plant/delta'
+
+
+class PlantSpider(scrapy.Spider):
+    name = 'plants'
+
+    def parse(self, response):
+        pass
+
+
+@pytest.fixture
+def broker(tmp_path):
+    with Broker(str(tmp_path / 'broker.db'), domain_delay=0.0, lease_timeout=0.2) as broker:
+        yield broker
+
+
+@pytest.fixture
+def crawler(tmp_path):
+    return get_crawler(PlantSpider, {
+        'BROKER_PATH': str(tmp_path / 'broker.db'),
+        'BROKER_DOMAIN_DELAY': 0.0,
+        'NODE_NAME': 'node-1',
+        'REQUEST_FINGERPRINTER_CLASS': 'crop_scraper.frontier.CanonicalRequestFingerprinter',
+    })
+
+
+@pytest.fixture
+def scheduler(crawler):
+    scheduler = DistributedScheduler.from_crawler(crawler)
+    scheduler.open(PlantSpider())
+    yield scheduler
+    scheduler.close('finished')
+
+
+def test_expired_lease_is_leased_again(broker):
+    assert broker.push('plants', b'delta', URL, 0, b'request')
+    assert not broker.push('plants', b'delta', URL, 0, b'request')
+
+    request_id, data, wait = broker.lease('plants', 'node-1')
+    assert broker.lease('plants', 'node-2') is None
+    time.sleep(0.25)
+    assert broker.lease('plants', 'node-2')[0] == request_id
+
+    broker.done(request_id)
+    assert not broker.unfinished('plants')
+
+
+def test_lease_is_done_once_the_callback_output_is_handled(crawler, scheduler):
+    scheduler.enqueue_request(scrapy.Request(URL))
+    request = scheduler.next_request()
+    assert scheduler.broker.stats('plants')['leased'] == 1
+
+    crawler.signals.send_catch_log(request_finished, request=request, failed=False)
+    assert scheduler.broker.stats('plants')['done'] == 1
+    assert not scheduler.has_pending_requests()
+
+
+def test_items_are_stored_with_the_lease_finish(crawler, scheduler):
+    scheduler.enqueue_request(scrapy.Request(URL))
+    request = scheduler.next_request()
+    response = HtmlResponse(URL, body=b'<p>Delta</p>', request=request)
+    for name in ('Delta', 'Delta F1'):
+        crawler.signals.send_catch_log(signals.item_scraped, item={'name': name}, response=response,
+                                       spider=scheduler.spider)
+    assert scheduler.broker.stats('plants')['items'] == 0
+
+    crawler.signals.send_catch_log(request_finished, request=request, failed=False)
+    assert scheduler.broker.stats('plants') == {'pending': 0, 'leased': 0, 'done': 1, 'items': 2, 'drained': 0}
+    assert [item for item_id, item in scheduler.broker.undrained_items('plants')] == [
+        {'name': 'Delta'}, {'name': 'Delta F1'},
+    ]
+
+
+def test_lease_of_a_dropped_request_is_done(scheduler):
+    scheduler.enqueue_request(scrapy.Request(URL))
+    # Ignored by a downloader middleware: Scrapy just lets go of the request
+    scheduler.next_request()
+    assert not scheduler.has_pending_requests()
+    assert scheduler.broker.stats('plants')['done'] == 1
+
+
+def test_redirect_to_a_variant_is_queued(scheduler):
+    scheduler.enqueue_request(scrapy.Request(URL))
+    request = scheduler.next_request()
+    redirect = request.replace(url=URL + '/', meta={**request.meta, 'redirect_urls': [URL]})
+
+    assert scheduler.enqueue_request(redirect)
+    assert not scheduler.enqueue_request(scrapy.Request(URL + '/'))
+    assert scheduler.next_request().url == URL + '/'
@@ -0,0 +1,125 @@
+import re
+
+import pytest
+from scrapy.http import HtmlResponse
+
+from crop_scraper.document import SentenceIndex, content_document, page_document
+from crop_scraper.spiders.nutrition_spider import NutritionSpider
+
+URL = 'https://www.almanac.com/plant/tomatoes'
+
+PAGE = b'''<html><head><title>Tomatoes | Almanac</title></head><body>
+<nav><a href="/">Home</a> <a href="/garden">Garden</a></nav>
+<h1 class="page-title">Tomatoes</h1>
+<div class="content">
+  <p>Tomatoes need soil with a pH of 6.2 to 6.8 and full sun!  At least 8 hours a day.</p>
+  <p>Feed seedlings a   5-10-10 fertilizer
+     at planting. Water 1 to 2 inches per week?</p>
+  <p>Short</p>
+  <p>Feed seedlings a 5-10-10 fertilizer at planting. Water 1 to 2 inches per week?</p>
+  <p>Space plants 24 to 36 inches apart; compost helps the soil.</p>
+</div>
+<footer>Sign up for the Almanac newsletter to get weekly garden tips.</footer>
+</body></html>'''
+
+
+NUTRIENT_TEXT = (
+    'Nitrogen: feed 150 ppm N during vegetative growth! Phosphorus at 50 ppm helps roots. '
+    'Keep potassium (K) near 200 ppm once fruit sets? Calcium and magnesium at 2 tbsp per gallon. '
+    'Nitrate burns. Iron chelate, 2.5 ppm. ' + 'Long sentence about nitrogen 1 ' * 12 + '. '
+    'Zinc 0.05 ppm and boron 0.5 ppm, with Mo as a trace for 30 days'
+)
+
+
+def page():
+    return HtmlResponse(URL, body=PAGE, encoding='utf-8')
+
+
+def old_text_containing(response, keywords):
+    """AlmanacFocusedSpider.extract_text_containing before PageDocument"""
+    results = []
+    for text in response.css('*::text').getall():
+        text = text.strip()
+        if len(text) > 10:
+            for keyword in keywords:
+                if keyword.lower() in text.lower():
+                    cleaned_text = ' '.join(text.split())
+                    if cleaned_text not in results and len(cleaned_text) < 500:
+                        results.append(cleaned_text)
+                    break
+    return results[:5]
+
+
+def test_text_is_the_joined_text_nodes():
+    response = page()
+    document = page_document(response)
+    assert document.text == ' '.join(response.css('*::text').getall())
+    assert document.lower == document.text.lower()
+    assert page_document(response, '.content ::text').text == ' '.join(response.css('.content ::text').getall())
+
+
+def test_document_is_built_once_per_response_and_selector():
+    response = page()
+    assert page_document(response) is page_document(response)
+    assert page_document(response, '.content ::text') is not page_document(response)
+    assert page_document(page()) is not page_document(response)
+
+
+def test_passages_containing_keywords_match_the_old_lookup():
+    response = page()
+    for keywords in (['soil'], ['water', 'fertilizer'], ['Almanac', 'TOMATOES'], ['nothing']):
+        assert page_document(response).containing(keywords, limit=5) == old_text_containing(response, keywords)
+
+
+def test_sentences_split_like_re_split():
+    document = page_document(page())
+    assert document.sentences == re.split(r'[.!?]', document.text)
+    assert [document.text[start:end] for start, end in document.sentence_bounds] == document.sentences
+
+
+def test_content_document_falls_back_to_the_whole_page():
+    response = page()
+    assert content_document(response, ['.entry-content ::text', '.content ::text']) is \
+        page_document(response, '.content ::text')
+    assert content_document(response, ['.entry-content ::text']) is page_document(response)
+
+
+def old_nutrient_info(text_content, nutrient_keywords):
+    """NutritionSpider.extract_nutrient_info before SentenceIndex"""
+    nutrient_info = []
+    if isinstance(text_content, list):
+        text_content = ' '.join(text_content)
+    for keyword in nutrient_keywords:
+        for sentence in re.split(r'[.!?]', text_content):
+            if keyword.lower() in sentence.lower():
+                clean_sentence = sentence.strip()
+                if len(clean_sentence) > 20 and len(clean_sentence) < 300:
+                    if any(char.isdigit() for char in clean_sentence):
+                        nutrient_info.append(clean_sentence)
+    return nutrient_info
+
+
+@pytest.mark.parametrize('keywords', [
+    ['nitrogen', 'N', 'nitrate'],
+    ['phosphorus', 'P', 'phosphate'],
+    ['potassium', 'K', 'potash'],
+    ['calcium', 'magnesium', 'sulfur', 'Ca', 'Mg', 'S'],
+    ['iron', 'manganese', 'zinc', 'copper', 'boron', 'molybdenum', 'Fe', 'Mn', 'Zn', 'Cu', 'B', 'Mo'],
+])
+def test_sentence_index_finds_the_old_nutrient_sentences(keywords):
+    index = SentenceIndex.from_text(NUTRIENT_TEXT)
+    assert index.find(keywords) == old_nutrient_info(NUTRIENT_TEXT, keywords)
+    assert NutritionSpider().extract_nutrient_info(NUTRIENT_TEXT.split('. '), keywords) == \
+        old_nutrient_info(NUTRIENT_TEXT.split('. '), keywords)
+
+
+def test_page_sentence_index_matches_the_text_split():
+    document = page_document(HtmlResponse(URL, body=f'<p>{NUTRIENT_TEXT}</p>'.encode(), encoding='utf-8'))
+    assert document.sentence_index.find(['zinc', 'N']) == old_nutrient_info(document.text, ['zinc', 'N'])
+    assert len(document.sentence_index) == len(SentenceIndex.from_text(document.text))
+
+
+def test_keyword_lookups_are_memoized():
+    index = SentenceIndex.from_text(NUTRIENT_TEXT)
+    assert index.containing('Nitrogen') is index.containing('nitrogen')
+    assert index.containing('selenium') == []
@@ -0,0 +1,27 @@
+from crop_scraper.exporters import export_database, read_crops
+from crop_scraper.items import CropItem
+from crop_scraper.pipelines import DatabasePipeline
+
+
+def test_export_database_reads_through_database_url(tmp_path):
+    database_url = f'sqlite:///{tmp_path}/crops.db'
+    pipeline = DatabasePipeline(database_url=database_url)
+    pipeline.open_spider(None)
+    for name in ('Tomato', 'Carrot'):
+        pipeline.process_item(CropItem(name=name, source_url=f'https://example.com/{name}', data_source='test'), None)
+    pipeline.close_spider(None)
+
+    counts = export_database(database_url, str(tmp_path / 'parquet'))
+    assert counts['crops'] == 2
+    assert sorted(read_crops(str(tmp_path / 'parquet'), columns=['name'])['name']) == ['Carrot', 'Tomato']
+
+
+def test_export_parquet_reports_a_missing_database(tmp_path, monkeypatch, capsys):
+    import export_parquet
+
+    missing = tmp_path / 'missing.db'
+    monkeypatch.setattr('sys.argv', ['export_parquet.py', '--database', str(missing),
+                                     '--output', str(tmp_path / 'parquet')])
+    assert export_parquet.main() == 1
+    assert 'Database not found' in capsys.readouterr().out
+    assert not missing.exists()
@@ -0,0 +1,120 @@
+import gc
+import os
+
+import pytest
+import scrapy
+from scrapy.utils.test import get_crawler
+
+from crop_scraper.frontier import CanonicalRequestFingerprinter, FrontierScheduler, canonicalize_url
+from crop_scraper.signals import request_finished
+
+
+class PlantSpider(scrapy.Spider):
+    name = 'plants'
+
+    def parse(self, response):
+        pass
+
+
+def redirected(request, url):
+    """The request RedirectMiddleware would make for a redirect of request to url"""
+    return request.replace(url=url, meta={**request.meta, 'redirect_urls': [request.url]})
+
+
+@pytest.fixture
+def crawler(tmp_path):
+    return get_crawler(PlantSpider, {
+        'FRONTIER_DIR': str(tmp_path),
+        'FRONTIER_COMMIT_EVERY': 1,
+        'REQUEST_FINGERPRINTER_CLASS': 'crop_scraper.frontier.CanonicalRequestFingerprinter',
+    })
+
+
+def open_scheduler(crawler):
+    spider = PlantSpider()
+    scheduler = FrontierScheduler.from_crawler(crawler)
+    scheduler.open(spider)
+    return scheduler, spider
+
+
+def urls(scheduler):
+    result = []
+    while (request := scheduler.next_request()) is not None:
+        result.append(request.url)
+    return result
+
+
+def test_url_variants_share_a_fingerprint():
+    fingerprinter = CanonicalRequestFingerprinter()
+    variants = [
+        'http://Example.com/plant/delta?b=2&a=1&utm_source=x',
+        'https://example.com:443/plant/delta/?a=1&b=2#care',
+    ]
+    assert len({canonicalize_url(url) for url in variants}) == 1
+    assert len({fingerprinter.fingerprint(scrapy.Request(url)) for url in variants}) == 1
+
+
+def test_redirect_to_a_variant_is_fingerprinted_on_its_exact_url():
+    fingerprinter = CanonicalRequestFingerprinter()
+    request = scrapy.Request('https://example.com/plant/delta')
+    redirect = redirected(request, 'https://example.com/plant/delta/')
+    assert fingerprinter.fingerprint(redirect) != fingerprinter.fingerprint(request)
+
+    moved = redirected(request, 'https://example.com/plant/epsilon')
+    assert fingerprinter.fingerprint(moved) == fingerprinter.fingerprint(scrapy.Request(moved.url))
+
+
+def test_resume_after_restart(crawler):
+    scheduler, spider = open_scheduler(crawler)
+    for url in ('https://example.com/a', 'https://example.com/b', 'https://example.com/c'):
+        assert scheduler.enqueue_request(scrapy.Request(url))
+    in_flight = scheduler.next_request()
+    crawler.signals.send_catch_log(request_finished, request=scheduler.next_request(), failed=False)
+    scheduler.close('shutdown')
+
+    scheduler, spider = open_scheduler(crawler)
+    assert crawler.stats.get_value('frontier/resumed') == 2
+    assert not scheduler.enqueue_request(scrapy.Request('http://example.com/a/'))
+    assert sorted(urls(scheduler)) == sorted(['https://example.com/a', in_flight.url])
+    scheduler.close('shutdown')
+
+
+def test_redirect_to_a_variant_is_not_filtered(crawler):
+    scheduler, spider = open_scheduler(crawler)
+    scheduler.enqueue_request(scrapy.Request('https://example.com/plant/delta'))
+    request = scheduler.next_request()
+
+    assert scheduler.enqueue_request(redirected(request, 'https://example.com/plant/delta/'))
+    assert not scheduler.enqueue_request(scrapy.Request('https://example.com/plant/delta/'))
+    assert urls(scheduler) == ['https://example.com/plant/delta/']
+    scheduler.close('shutdown')
+
+
+def test_dropped_requests_leave_in_flight(crawler):
+    scheduler, spider = open_scheduler(crawler)
+    scheduler.enqueue_request(scrapy.Request('https://example.com/offsite'))
+    scheduler.enqueue_request(scrapy.Request('https://example.com/dropped'))
+
+    # Ignored by a downloader middleware: Scrapy just lets go of the request
+    scheduler.next_request()
+    gc.collect()
+    request = scheduler.next_request()
+    assert len(scheduler.in_flight) == 1
+
+    crawler.signals.send_catch_log(request_finished, request=request, failed=True)
+    assert len(scheduler.in_flight) == 0
+    scheduler.close('finished')
+    assert not os.path.exists(scheduler.path)
+
+
+def test_unfinished_crawl_keeps_its_frontier(crawler):
+    scheduler, spider = open_scheduler(crawler)
+    scheduler.enqueue_request(scrapy.Request('https://example.com/a'))
+    scheduler.enqueue_request(scrapy.Request('https://example.com/b'))
+    request = scheduler.next_request()
+    scheduler.close('shutdown')
+    assert os.path.exists(scheduler.path)
+
+    scheduler, spider = open_scheduler(crawler)
+    assert scheduler.pending == 2
+    scheduler.close('shutdown')
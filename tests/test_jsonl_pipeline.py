@@ -0,0 +1,84 @@
+import gzip
+import json
+
+import scrapy
+
+from crop_scraper.items import CropItem
+from crop_scraper.pipelines import JsonLinesWriterPipeline, JsonWriterPipeline, iter_jsonl, jsonl_to_json
+
+
+class PlantSpider(scrapy.Spider):
+    name = 'plants'
+
+
+def crops(count):
+    return [CropItem(name=f'Crop {n}', scientific_name='Solanum lycopersicum', data_source='test',
+                     soil_type='Terreau « cœur de bœuf »', ph_min=6.2 + n)
+            for n in range(count)]
+
+
+def write(pipeline, items):
+    spider = PlantSpider()
+    pipeline.open_spider(spider)
+    for item in items:
+        assert pipeline.process_item(item, spider) is item
+    pipeline.close_spider(spider)
+    return pipeline.paths
+
+
+def test_parts_rotate_by_item_count(tmp_path):
+    items = crops(5)
+    paths = write(JsonLinesWriterPipeline(output_dir=str(tmp_path), rotate_items=2), items)
+
+    # The last rotation opens an empty part
+    assert [path[-11:] for path in paths] == ['_0000.jsonl', '_0001.jsonl', '_0002.jsonl']
+    assert [len(list(iter_jsonl([path]))) for path in paths] == [2, 2, 1]
+    assert list(iter_jsonl(paths)) == [dict(item) for item in items]
+
+
+def test_parts_rotate_by_size(tmp_path):
+    items = crops(4)
+    line = json.dumps(dict(items[0]), ensure_ascii=False) + '\n'
+    paths = write(JsonLinesWriterPipeline(output_dir=str(tmp_path), rotate_bytes=len(line.encode()) * 2), items)
+
+    assert [len(list(iter_jsonl([path]))) for path in paths] == [2, 2, 0]
+    assert list(iter_jsonl(paths)) == [dict(item) for item in items]
+
+
+def test_gzipped_parts_hold_the_same_lines(tmp_path):
+    items = crops(3)
+    plain = write(JsonLinesWriterPipeline(output_dir=str(tmp_path / 'plain')), items)
+    gzipped = write(JsonLinesWriterPipeline(output_dir=str(tmp_path / 'gzip'), use_gzip=True), items)
+
+    assert gzipped[0].endswith('.jsonl.gz')
+    with open(plain[0], 'rb') as f, gzip.open(gzipped[0], 'rb') as g:
+        assert f.read() == g.read()
+
+
+def test_lines_reach_disk_every_flush_items(tmp_path):
+    spider = PlantSpider()
+    pipeline = JsonLinesWriterPipeline(output_dir=str(tmp_path), flush_items=2, flush_interval=60)
+    pipeline.open_spider(spider)
+    for item in crops(3):
+        pipeline.process_item(item, spider)
+
+    assert len(list(iter_jsonl(pipeline.paths))) == 2
+    pipeline.close_spider(spider)
+    assert len(list(iter_jsonl(pipeline.paths))) == 3
+
+
+def test_crops_data_json_matches_the_in_memory_writer(tmp_path):
+    items = crops(3)
+    pipeline = JsonWriterPipeline(output_dir=str(tmp_path), rotate_items=2)
+    pipeline.output_path = str(tmp_path / 'crops_data.json')
+    write(pipeline, items)
+
+    # What JsonWriterPipeline wrote when it held every item until close
+    with open(tmp_path / 'expected.json', 'w', encoding='utf-8') as f:
+        json.dump([dict(item) for item in items], f, indent=2, ensure_ascii=False)
+    assert (tmp_path / 'crops_data.json').read_bytes() == (tmp_path / 'expected.json').read_bytes()
+
+
+def test_empty_export_is_an_empty_array(tmp_path):
+    assert jsonl_to_json([], str(tmp_path / 'crops_data.json')) == 0
+    assert json.loads((tmp_path / 'crops_data.json').read_text()) == []
@@ -0,0 +1,78 @@
+import pytest
+
+from crop_scraper.keywords import KeywordClassifier, trie_pattern
+from crop_scraper.spiders.nutrition_spider import SNIPPETS
+
+NODES = [
+    '',
+    '   ',
+    'Short text',
+    'Feed tomatoes every two weeks with a balanced fertilizer.',
+    'Feeding schedule: 150 ppm nitrogen during the vegetative stage.',
+    '  Water   1 to 2 inches\n per week, more in dry spells.  ',
+    'Water 1 to 2 inches per week, more in dry spells.',
+    'Subscribe to the Almanac newsletter for weekly feeding tips.',
+    'Check sunrise and sun\n   times for your area before planting out.',
+    'Plant seeds 1/4 inch deep, 18 to 24 inches apart, in full sun.',
+    'Harvest when fruit is ready, about 60 to 85 days after transplanting.',
+    'Soil pH should be 6.2 to 6.8; add compost to clay or sandy loam.',
+    'The recipe for EC: keep the electrical conductivity at 2.0 to 3.5 mS/cm.',
+    'Seedlings need little fertilizer until their first true leaves emerge.',
+    'Flowering plants benefit from potassium; avoid excess nitrogen at bloom.',
+    'Compost, manure and other organic matter feed the soil slowly over the season.',
+    'NPK of 5-10-10 at planting, then side-dress with 10-10-10 once fruit sets.',
+    'Mulch keeps moisture in and weeds down around the base of the plants.',
+    'Water deeply in the morning so leaves dry before nightfall and disease spreads less.',
+    'Feed tomatoes every two weeks with a balanced fertilizer.',
+    'x' * 995 + ' feed',
+    'x' * 1000 + ' feed',
+]
+
+
+def old_text_containing(texts, keywords, exclude, min_length, max_length=1000, limit=5):
+    """NutritionSpider.extract_text_containing before KeywordClassifier, over already-selected text nodes"""
+    results = []
+    for text in texts:
+        if not text:
+            continue
+        text = text.strip()
+        if len(text) > min_length and len(text) < max_length:
+            for keyword in keywords:
+                if keyword.lower() in text.lower():
+                    cleaned_text = ' '.join(text.split())
+                    if not any(nav_word in cleaned_text.lower() for nav_word in exclude):
+                        if cleaned_text not in results:
+                            results.append(cleaned_text)
+                    break
+    return results[:limit]
+
+
+def test_nutrition_snippets_match_the_per_field_lookup():
+    snippets = SNIPPETS.classify(NODES)
+    for field, keywords in SNIPPETS.fields.items():
+        assert snippets[field] == old_text_containing(NODES, sorted(keywords), SNIPPETS.exclude, min_length=15), field
+    assert snippets['water'] and snippets['fertilizer_recommendations']
+
+
+@pytest.mark.parametrize('limit', [1, 3, 100])
+def test_limit_keeps_the_first_snippets_in_page_order(limit):
+    classifier = KeywordClassifier({'any': ['e']}, min_length=0, limit=limit)
+    assert classifier.classify(NODES)['any'] == old_text_containing(NODES, ['e'], (), min_length=0, limit=limit)
+
+
+def test_keywords_that_prefix_each_other_are_all_found():
+    classifier = KeywordClassifier({'short': ['feed'], 'long': ['feeding schedule'], 'mid': ['feeding']})
+    assert classifier.keywords_in('weekly feeding schedule') == {'feed', 'feeding', 'feeding schedule'}
+    assert classifier.keywords_in('a feed') == {'feed'}
+
+
+def test_snippet_length_bound_applies_after_collapsing_whitespace():
+    classifier = KeywordClassifier({'water': ['water']}, max_length=None, max_snippet_length=20)
+    assert classifier.classify(['Water   weekly   and deeply', 'Water weekly always'])['water'] == [
+        'Water weekly always',
+    ]
+
+
+def test_empty_trie_never_matches():
+    assert trie_pattern([]) == '(?!)'
+    assert KeywordClassifier({'none': []}).classify(NODES) == {'none': []}
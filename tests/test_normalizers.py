@@ -0,0 +1,22 @@
+import pytest
+
+from crop_scraper.normalizers import normalize_crop_fields, parse_npk
+
+
+@pytest.mark.parametrize('text', ['10-10-10', '10:10:10', '10/10/10', 'Use a balanced 10:10:10 fertilizer'])
+def test_npk_separators(text):
+    assert parse_npk(text) == (10.0, 10.0, 10.0)
+
+
+def test_npk_needs_one_separator_throughout():
+    assert parse_npk('10-10:10') == (None, None, None)
+
+
+def test_npk_dict_values_become_numbers():
+    assert parse_npk({'nitrogen': '5', 'phosphorus': '10.5', 'potassium': 'about 5%'}) == (5.0, 10.5, 5.0)
+    assert parse_npk({'nitrogen': '', 'phosphorus': None}) == (None, None, None)
+
+
+def test_crop_fields_from_colon_npk():
+    fields = normalize_crop_fields({'fertilizer_npk': '5:10:10'})
+    assert (fields['npk_n'], fields['npk_p'], fields['npk_k']) == (5.0, 10.0, 10.0)
@@ -0,0 +1,116 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+from twisted.internet.defer import succeed
+
+from crop_scraper.offload import ParseOffload, init_worker, pack_response, parse_packed, unpack_response
+from crop_scraper.spiders.nutrition_spider import NutritionSpider
+
+URL = 'https://www.almanac.com/plant/tomatoes'
+
+PAGE = '''<html><head><title>Tomatoes</title></head><body>
+<h1 class="page-title">Tomatoes</h1>
+<div class="content">
+  <p>Tomatoes need soil with a pH of 6.2 to 6.8 and full sun, at least 8 hours a day.</p>
+  <p>At planting, feed seedlings a 5-10-10 fertilizer; during flowering switch to 10-10-10,
+     about 2 tablespoons per plant every 2 weeks.</p>
+  <p>Water 1 to 2 inches per week. Space plants 24 to 36 inches apart and set them 2 inches deep.</p>
+  <p>Fruit is ready to harvest 60 to 85 days after transplanting.</p>
+</div>
+</body></html>''' + '<p>Growing tomatoes in containers.</p>' * 50
+
+
+class OffloadSpider(NutritionSpider):
+    """The nutrition spider, loaded by the pool workers from this module"""
+
+    name = 'offload_test'
+
+    def broken(self, response):
+        raise ValueError('unparseable page')
+
+
+@pytest.fixture(scope='module')
+def pool():
+    with ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=init_worker,
+        initargs=([__name__], OffloadSpider.name),
+    ) as pool:
+        yield pool
+
+
+@pytest.fixture
+def reactor_calls(monkeypatch):
+    """Run calls handed to the reactor thread straight away"""
+    from twisted.internet import reactor
+
+    monkeypatch.setattr(reactor, 'callFromThread', lambda f, *args: f(*args))
+
+
+def page():
+    return HtmlResponse(URL, body=PAGE.encode(), encoding='utf-8', request=Request(URL))
+
+
+def as_dicts(results):
+    return [dict(result) for result in results]
+
+
+def test_packed_response_round_trips_deflated():
+    spider = OffloadSpider()
+    response = page()
+    packed = pack_response(response, spider)
+    assert len(packed['body']) < len(response.body) / 2
+
+    unpacked = unpack_response(packed, spider)
+    assert (unpacked.url, unpacked.body, unpacked.encoding) == (response.url, response.body, 'utf-8')
+    assert unpacked.request.url == URL
+
+
+def test_offloaded_items_match_inline_parsing(pool):
+    spider = OffloadSpider()
+    inline = as_dicts(spider.parse(page()))
+    assert inline[0]['name'] == 'Tomatoes' and inline[0]['fertilizer_recommendations']
+
+    results = pool.submit(parse_packed, 'parse', pack_response(page(), spider)).result(timeout=120)
+    assert {kind for kind, result in results} == {'item'}
+    assert as_dicts(result for kind, result in results) == inline
+
+
+def test_callback_that_raises_in_the_worker_fails_its_response(pool, reactor_calls):
+    spider = OffloadSpider()
+    extension = ParseOffload(get_crawler(OffloadSpider), workers=1)
+    failures = []
+    d = extension.wait(pool.submit(parse_packed, 'broken', pack_response(page(), spider)))
+    d.addErrback(failures.append)
+
+    deadline = time.monotonic() + 120
+    while not d.called:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert failures[0].check(ValueError)
+    # The worker survives for the next response
+    assert pool.submit(parse_packed, 'parse', pack_response(page(), spider)).result(timeout=120)
+
+
+def test_pool_shuts_down_on_spider_closed(monkeypatch):
+    crawler = get_crawler(OffloadSpider, {
+        'PARSE_OFFLOAD_ENABLED': True,
+        'PARSE_OFFLOAD_WORKERS': 1,
+        'SPIDER_MODULES': [__name__],
+    })
+    extension = ParseOffload.from_crawler(crawler)
+    spider = OffloadSpider()
+    extension.spider_opened(spider)
+    pool = extension.pool
+    assert spider.parse_offload is extension
+
+    monkeypatch.setattr('twisted.internet.threads.deferToThread', lambda f, *a, **kw: succeed(f(*a, **kw)))
+    assert extension.spider_closed(spider).called
+    assert extension.pool is None and spider.parse_offload is None
+    with pytest.raises(RuntimeError):
+        pool.submit(pow, 2, 2)
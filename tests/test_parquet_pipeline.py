@@ -0,0 +1,97 @@
+import os
+import sqlite3
+
+import pandas as pd
+import pyarrow.parquet as pq
+import scrapy
+
+from crop_scraper.exporters import read_crops, write_partitioned
+from crop_scraper.items import CropItem, NutrientRecipeItem
+from crop_scraper.pipelines import DatabasePipeline, ParquetExportPipeline
+
+# What data_analysis.py reads
+ANALYSIS_COLUMNS = ['name', 'data_source', 'water_needs', 'soil_ph', 'ph_min', 'ph_max',
+                    'fertilizer_recommendations', 'sun_requirements', 'days_to_maturity']
+
+
+class PlantSpider(scrapy.Spider):
+    name = 'plants'
+
+
+def crop(name, data_source='almanac.com', scraped_date='2025-05-26T10:00:00', **fields):
+    return CropItem(name=name, source_url=f'https://{data_source}/{name.lower()}', data_source=data_source,
+                    scraped_date=scraped_date, **fields)
+
+
+CROPS = [
+    crop('Tomato', water_needs='1-2 inches per week', soil_ph='6.2-6.8', ph_min=6.2, ph_max=6.8,
+         sun_requirements='Full sun', days_to_maturity='60-85 days'),
+    crop('Carrot', soil_ph='6.0-6.8', ph_min='6.0', ph_max='6.8', fertilizer_recommendations='5-10-10'),
+    crop('Okra', data_source='extension.org', scraped_date='2025-05-27T08:00:00'),
+]
+
+
+def export(tmp_path, items, batch_size=1000):
+    spider = PlantSpider()
+    pipeline = ParquetExportPipeline(root=str(tmp_path / 'parquet'), batch_size=batch_size)
+    pipeline.open_spider(spider)
+    for item in items:
+        assert pipeline.process_item(item, spider) is item
+    pipeline.close_spider(spider)
+    return str(tmp_path / 'parquet')
+
+
+def parts(root, table):
+    return sorted(os.path.relpath(os.path.join(path, name), os.path.join(root, table))
+                  for path, _, names in os.walk(os.path.join(root, table)) for name in names)
+
+
+def test_items_are_partitioned_by_source_and_crawl_date(tmp_path):
+    root = export(tmp_path, CROPS + [NutrientRecipeItem(crop_name='Tomato', nitrogen_ppm='150',
+                                                         data_source='hydro.org')])
+
+    assert [os.path.dirname(part) for part in parts(root, 'crops')] == [
+        'data_source=almanac.com/crawl_date=2025-05-26',
+        'data_source=extension.org/crawl_date=2025-05-27',
+    ]
+    assert [os.path.dirname(part).split('/')[0] for part in parts(root, 'recipes')] == ['data_source=hydro.org']
+
+
+def test_batches_write_new_parts_with_one_schema(tmp_path):
+    root = export(tmp_path, CROPS[:2], batch_size=1)
+
+    files = [os.path.join(root, 'crops', part) for part in parts(root, 'crops')]
+    assert len(files) == 2
+    schemas = {pq.read_schema(path) for path in files}
+    assert len(schemas) == 1
+
+
+def test_export_reads_back_like_the_database(tmp_path):
+    root = export(tmp_path, CROPS)
+    database = tmp_path / 'crops.db'
+    pipeline = DatabasePipeline(database_url=f'sqlite:///{database}')
+    pipeline.open_spider(None)
+    for item in CROPS:
+        pipeline.process_item(item, None)
+    pipeline.close_spider(None)
+
+    # data_analysis.py loaded the crops table before the Parquet export existed
+    with sqlite3.connect(database) as conn:
+        expected = pd.read_sql_query(f"SELECT {', '.join(ANALYSIS_COLUMNS)} FROM crops", conn)
+    actual = read_crops(root, columns=ANALYSIS_COLUMNS)
+
+    def records(df):
+        df = df.astype(object).where(df.notna(), None)
+        return sorted(df.to_dict('records'), key=lambda row: row['name'])
+
+    assert records(actual) == records(expected)
+
+
+def test_latest_crawl_of_a_crop_wins(tmp_path):
+    root = str(tmp_path / 'parquet')
+    write_partitioned([dict(crop('Tomato', soil_ph='6.0'))], root, 'crops')
+    write_partitioned([dict(crop('Tomato', soil_ph='6.5', scraped_date='2025-06-01T09:00:00'))], root, 'crops')
+
+    assert read_crops(root, columns=['name', 'soil_ph']).to_dict('records') == [
+        {'name': 'Tomato', 'soil_ph': '6.5'},
+    ]
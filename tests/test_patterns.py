@@ -0,0 +1,81 @@
+import re
+
+import pytest
+
+import crop_scraper.spiders.almanac_spider  # noqa: F401
+import crop_scraper.spiders.extension_spider  # noqa: F401
+import crop_scraper.spiders.nutrition_spider  # noqa: F401
+from crop_scraper.patterns import PATTERNS, MultiFieldExtractor, findall, lowercase_copy, search
+from crop_scraper.rules import site_rules
+from crop_scraper.site_rules import SITES
+
+for site in SITES:
+    site_rules(site)
+
+TEXTS = [
+    'Tomatoes need soil with a pH of 6.2 to 6.8. SPACING: 24 to 36 inches apart. '
+    'Water 1-2 inches per week, weekly in dry spells. Days to maturity: 60 to 85 days.',
+    'Apply a 5-10-10 Fertilizer at planting, then 10-10-10 every 2 weeks. Side-dress with '
+    '1 tablespoon per plant. Nitrogen: 150 ppm, Potassium 200 PPM, Iron 2.5 ppm. EC 2.0-3.5 mS/cm.',
+    'PLANT 1/4 INCH DEEP IN FULL SUN. Harvest when ripe, about 8 weeks. Temperature: 65-85°F. '
+    'Soil type: loamy, well-drained. pH 6,0 – 7,0 for Ca and Mg.',
+    # Case folding that str.lower() and IGNORECASE disagree on
+    'İstanbul ſoil with a PH of 6.5. Water daily.',
+    'µS/cm readings of 1500 µS; Ferti̇lizer 20-20-20 ÉTÉ spacing: 12 inches.',
+    '',
+]
+
+
+def registered():
+    return [(name, pattern) for name, patterns in sorted(PATTERNS.items()) for pattern in patterns]
+
+
+def test_every_spiders_patterns_are_registered():
+    names = {name.split('.')[0] for name in PATTERNS}
+    assert {'almanac', 'extension', 'extension_ppm', 'nutrition'} <= names
+    assert set(SITES) & names
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_search_matches_re_search(text):
+    lower = lowercase_copy(text)
+    for name, pattern in registered():
+        expected = pattern.search(text)
+        found = search(pattern, text, lower)
+        assert (found and (found.span(), found.groups())) == (expected and (expected.span(), expected.groups())), \
+            (name, pattern.pattern)
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_findall_matches_re_findall(text):
+    lower = lowercase_copy(text)
+    for name, pattern in registered():
+        assert findall(pattern, text, lower) == pattern.findall(text), (name, pattern.pattern)
+
+
+def test_extractor_gives_each_fields_first_matches_in_order():
+    extractor = MultiFieldExtractor('test', {
+        'spacing': [r'spac(?:ing|e)\s*:?\s*([^.]+)', r'(\d+)\s*inches\s+apart'],
+        'water': [r'water\s+([^.]*weekly)', r'Water\s+(\d+)'],
+    })
+    text = TEXTS[0]
+    matches = extractor.first_matches(text)
+
+    for field, patterns in extractor.fields.items():
+        assert [match and match.group(1) for match in matches[field]] == [
+            re.search(pattern.pattern, text, re.IGNORECASE) and re.search(pattern.pattern, text, re.IGNORECASE).group(1)
+            for pattern in patterns
+        ]
+    assert extractor.findall('spacing', text) == [re.findall(pattern, text, re.IGNORECASE)
+                                                 for pattern in (r'spac(?:ing|e)\s*:?\s*([^.]+)',
+                                                                 r'(\d+)\s*inches\s+apart')]
+
+
+def test_patterns_are_searched_when_iteration_reaches_them():
+    extractor = MultiFieldExtractor('test_lazy', {'spacing': [r'spacing:\s*(\d+)', r'(\d+)\s*inches']})
+    matches = extractor.first_matches(TEXTS[0])['spacing']
+
+    assert next(iter(matches)).group(1) == '24'
+    assert len(matches.found) == 1
+    assert matches[1].group(1) == '36'
+    assert len(matches.found) == 2
@@ -0,0 +1,80 @@
+import sqlite3
+
+import pytest
+from scrapy.exceptions import DropItem
+
+from crop_scraper.items import CropItem, NutrientRecipeItem
+from crop_scraper.normalizers import parse_ec_range
+from crop_scraper.pipelines import DatabasePipeline, NormalizationPipeline, ValidationPipeline
+
+URL = 'https://example.com/hydroponic-tomato'
+
+
+def recipe(stage='fruiting', **fields):
+    return NutrientRecipeItem(crop_name='Tomato', stage_of_growth=stage, source_url=URL, data_source='test',
+                              **fields)
+
+
+def run(path, items):
+    pipelines = [ValidationPipeline(), NormalizationPipeline(), DatabasePipeline(database_url=f'sqlite:///{path}')]
+    pipelines[-1].open_spider(None)
+    for item in items:
+        for pipeline in pipelines:
+            item = pipeline.process_item(item, None)
+    pipelines[-1].close_spider(None)
+
+
+def rows(path, query):
+    with sqlite3.connect(path) as conn:
+        conn.row_factory = sqlite3.Row
+        return [dict(row) for row in conn.execute(query)]
+
+
+@pytest.mark.parametrize('text, bounds', [
+    ('1.5-2.5 mS/cm', (1.5, 2.5)),
+    ('EC 2.0', (2.0, 2.0)),
+    ('1500 µS/cm', (None, None)),
+    ('', (None, None)),
+])
+def test_ec_range_bounds(text, bounds):
+    assert parse_ec_range(text) == bounds
+
+
+def test_recipe_without_a_crop_name_is_dropped():
+    with pytest.raises(DropItem):
+        ValidationPipeline().process_item(NutrientRecipeItem(nitrogen_ppm='150'), None)
+
+
+def test_recipe_is_stored_with_typed_columns(tmp_path):
+    path = tmp_path / 'crops.db'
+    run(path, [recipe(nitrogen_ppm='150 ppm', potassium_ppm=240, iron_ppm='2.5',
+                      ec_range='2.0-3.5 mS/cm', ph_range='pH 5.8 to 6.3')])
+
+    [row] = rows(path, 'SELECT * FROM recipes')
+    assert (row['crop_name'], row['stage_of_growth']) == ('Tomato', 'fruiting')
+    assert (row['nitrogen_ppm'], row['potassium_ppm'], row['iron_ppm']) == (150.0, 240.0, 2.5)
+    assert row['phosphorus_ppm'] is None
+    assert (row['ec_min'], row['ec_max'], row['ph_min'], row['ph_max']) == (2.0, 3.5, 5.8, 6.3)
+    assert row['ec_range'] == '2.0-3.5 mS/cm'
+
+
+def test_each_growth_stage_is_its_own_row(tmp_path):
+    path = tmp_path / 'crops.db'
+    run(path, [recipe('vegetative', nitrogen_ppm='100'), recipe(nitrogen_ppm='150')])
+    run(path, [recipe(nitrogen_ppm='180')])
+
+    assert rows(path, 'SELECT stage_of_growth, nitrogen_ppm FROM recipes ORDER BY stage_of_growth') == [
+        {'stage_of_growth': 'fruiting', 'nitrogen_ppm': 180.0},
+        {'stage_of_growth': 'vegetative', 'nitrogen_ppm': 100.0},
+    ]
+
+
+def test_crops_are_stored_as_before(tmp_path):
+    path = tmp_path / 'crops.db'
+    run(path, [CropItem(name='Tomato', soil_ph='6.2-6.8', source_url=URL, data_source='test'),
+               recipe(nitrogen_ppm='150')])
+
+    assert rows(path, 'SELECT name, soil_ph, ph_min, ph_max FROM crops') == [
+        {'name': 'Tomato', 'soil_ph': '6.2-6.8', 'ph_min': 6.2, 'ph_max': 6.8},
+    ]
+    assert rows(path, 'SELECT COUNT(*) AS n FROM nutrient_recipes') == [{'n': 0}]
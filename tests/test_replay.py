@@ -0,0 +1,100 @@
+import sqlite3
+
+import pytest
+from scrapy.http import HtmlResponse, Request
+from scrapy.settings import Settings
+
+from crop_scraper.archive import ResponseArchive
+from crop_scraper.items import CropItem
+from crop_scraper.pipelines import DatabasePipeline, NormalizationPipeline, ValidationPipeline
+from crop_scraper.replay import replay_archive, run_pipelines
+from crop_scraper.spiders.nutrition_spider import NutritionSpider
+
+PAGES = {
+    'https://www.almanac.com/plant/tomatoes': ('Tomatoes', '''
+        <p>Tomatoes need soil with a pH of 6.2 to 6.8 and full sun, at least 8 hours a day.</p>
+        <p>At planting, feed seedlings a 5-10-10 fertilizer. Water 1 to 2 inches per week.</p>
+        <p>Space plants 24 to 36 inches apart. Fruit is ready 60 to 85 days after transplanting.</p>'''),
+    'https://www.almanac.com/plant/carrots': ('Carrots', '''
+        <p>Carrots like loose, sandy soil with a pH of 6.0 to 6.8.</p>
+        <p>Use a low-nitrogen fertilizer. Water 1 inch per week.</p>'''),
+    'https://www.almanac.com/plant/empty': ('', '<p>Nothing to see here.</p>'),
+}
+
+PIPELINES = [ValidationPipeline, NormalizationPipeline, DatabasePipeline]
+
+
+class ReplaySpider(NutritionSpider):
+    """The nutrition spider, loaded by the replay workers from this module"""
+
+    name = 'replay_test'
+
+
+def page(url):
+    title, content = PAGES[url]
+    body = f'<html><body><h1 class="page-title">{title}</h1><div class="content">{content}</div></body></html>'
+    return HtmlResponse(url, body=body.encode(), encoding='utf-8', request=Request(url))
+
+
+def crops(path):
+    with sqlite3.connect(path) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = [dict(row) for row in conn.execute('SELECT * FROM crops ORDER BY name')]
+    for row in rows:
+        for column in ('id', 'scraped_date', 'created_at', 'updated_at', 'last_seen'):
+            row.pop(column, None)
+    return rows
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    path = str(tmp_path / 'responses.db')
+    with ResponseArchive(path) as archive:
+        for url in PAGES:
+            archive.add_response(page(url), spider=ReplaySpider.name, callback='parse')
+    return path
+
+
+def test_replay_stores_what_the_crawl_stored(tmp_path, archive_path):
+    live = tmp_path / 'live.db'
+    spider = ReplaySpider()
+    pipelines = [cls() for cls in PIPELINES[:-1]] + [DatabasePipeline(database_url=f'sqlite:///{live}')]
+    pipelines[-1].open_spider(spider)
+    for url in PAGES:
+        for item in spider.parse(page(url)):
+            run_pipelines(pipelines, item, spider)
+    pipelines[-1].close_spider(spider)
+
+    replayed = tmp_path / 'replayed.db'
+    settings = Settings({
+        'SPIDER_MODULES': [__name__],
+        'ITEM_PIPELINES': {f'crop_scraper.pipelines.{cls.__name__}': 300 + n for n, cls in enumerate(PIPELINES)},
+        'DATABASE_URL': f'sqlite:///{replayed}',
+    })
+    counts = replay_archive(settings, ReplaySpider.name, archive_path=archive_path, workers=1, chunk_size=2)
+
+    assert (counts['pages'], counts['errors']) == (3, 0)
+    assert counts['stored'] == len(crops(live)) == 3
+    assert crops(replayed) == crops(live)
+
+
+def test_replay_filters_by_url(tmp_path, archive_path):
+    settings = Settings({
+        'SPIDER_MODULES': [__name__],
+        'ITEM_PIPELINES': {},
+    })
+    counts = replay_archive(settings, ReplaySpider.name, archive_path=archive_path, workers=1,
+                            url_contains='carrots')
+    assert (counts['pages'], counts['items']) == (1, 1)
+
+
+def test_list_values_are_stored_as_text(tmp_path):
+    path = tmp_path / 'crops.db'
+    pipeline = DatabasePipeline(database_url=f'sqlite:///{path}')
+    pipeline.open_spider(None)
+    pipeline.process_item(CropItem(name='Tomato', source_url='https://example.com/tomato', data_source='test',
+                                   soil_type=['Loamy', 'well-drained'], water_needs='1 inch per week'), None)
+    pipeline.close_spider(None)
+
+    [row] = crops(path)
+    assert (row['soil_type'], row['water_needs']) == ('Loamy | well-drained', '1 inch per week')
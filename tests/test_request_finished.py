@@ -0,0 +1,70 @@
+import pytest
+import scrapy
+from scrapy import signals
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from crop_scraper.middlewares import RequestFinishedMiddleware
+from crop_scraper.signals import request_finished
+
+
+class PlantSpider(scrapy.Spider):
+    name = 'plants'
+
+
+@pytest.fixture
+def crawler():
+    return get_crawler(PlantSpider)
+
+
+@pytest.fixture
+def finished(crawler):
+    """(url, failed) of every request_finished sent"""
+    sent = []
+
+    def receiver(request, failed, **kwargs):
+        sent.append((request.url, failed))
+
+    crawler.signals.connect(receiver, signal=request_finished, weak=False)
+    return sent
+
+
+def page(url='https://example.com/plant/tomato'):
+    return HtmlResponse(url, body=b'<p>Tomato</p>', request=scrapy.Request(url))
+
+
+def raising_callback(middleware, response, spider):
+    """The output Scrapy hands the outermost middleware for a callback that raises before yielding.
+
+    The exception reaches the middleware's process_spider_exception while it
+    unwinds the inner middlewares, then its process_spider_output.
+    """
+    exception = ValueError('parse failed')
+    middleware.process_spider_exception(response, exception, spider)
+    raise exception
+    yield
+
+
+def test_raising_callback_finishes_once(crawler, finished):
+    middleware = RequestFinishedMiddleware.from_crawler(crawler)
+    spider = PlantSpider()
+    response = page()
+
+    output = middleware.process_spider_output(response, raising_callback(middleware, response, spider), spider)
+    with pytest.raises(ValueError):
+        list(output)
+    assert finished == [(response.url, True)]
+
+
+def test_finishes_once_the_items_are_handled(crawler, finished):
+    middleware = RequestFinishedMiddleware.from_crawler(crawler)
+    spider = PlantSpider()
+    response = page()
+    items = [{'name': 'Tomato'}, {'name': 'Carrot'}]
+
+    assert list(middleware.process_spider_output(response, iter(items), spider)) == items
+    crawler.signals.send_catch_log(signals.item_scraped, item=items[0], response=response, spider=spider)
+    assert finished == []
+    crawler.signals.send_catch_log(signals.item_dropped, item=items[1], response=response, spider=spider,
+                                   exception=None)
+    assert finished == [(response.url, False)]
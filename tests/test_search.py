@@ -0,0 +1,108 @@
+import json
+import sqlite3
+import threading
+import urllib.parse
+import urllib.request
+from http.server import HTTPServer
+
+import pytest
+
+from crop_scraper.items import CropItem
+from crop_scraper.pipelines import DatabasePipeline
+from crop_scraper.storage import open_storage
+from dashboard import CropDataHandler
+
+CROPS = [
+    dict(name='Tomato', water_needs='1-2 inches per week', fertilizer_recommendations='5-10-10 at planting, as for peppers'),
+    dict(name='Tomatillo', water_needs='Water deeply once a week', fertilizer_recommendations='Compost'),
+    dict(name='Carrot', water_needs='1 inch per week', fertilizer_recommendations='Low nitrogen fertilizer'),
+    dict(name='Pepper', water_needs='Keep soil moist', fertilizer_recommendations='Side-dress with compost'),
+]
+
+
+def crop(fields):
+    return CropItem(source_url=f"https://example.com/{fields['name'].lower()}", data_source='test', **fields)
+
+
+def store(path, items):
+    pipeline = DatabasePipeline(database_url=f'sqlite:///{path}')
+    pipeline.open_spider(None)
+    for item in items:
+        pipeline.process_item(item, None)
+    pipeline.close_spider(None)
+
+
+def matches(path, term):
+    with sqlite3.connect(path) as conn:
+        return sorted(row[0] for row in conn.execute(
+            'SELECT c.name FROM crops_fts JOIN crops c ON c.id = crops_fts.rowid WHERE crops_fts MATCH ?',
+            (term,)))
+
+
+def client_side_filter(term):
+    """The dashboard's search before /api/search: a substring match on three fields"""
+    term = term.lower()
+    return sorted(fields['name'] for fields in CROPS
+                  if any(term in (fields.get(column) or '').lower()
+                         for column in ('name', 'water_needs', 'fertilizer_recommendations')))
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / 'crops.db'
+    store(path, [crop(fields) for fields in CROPS])
+    return path
+
+
+@pytest.fixture
+def search(database, monkeypatch):
+    """GET /api/search from a dashboard server over the test database"""
+    storage = open_storage(f'sqlite:///{database}')
+    monkeypatch.setattr(CropDataHandler, 'storage', storage)
+    monkeypatch.setattr(CropDataHandler, 'log_message', lambda self, *args: None)
+    server = HTTPServer(('localhost', 0), CropDataHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    def get(query, **params):
+        url = f"http://localhost:{server.server_port}/api/search?{urllib.parse.urlencode({'q': query, **params})}"
+        with urllib.request.urlopen(url) as response:
+            return json.load(response)
+
+    yield get
+    server.shutdown()
+    server.server_close()
+    storage.close()
+
+
+def test_triggers_keep_the_index_in_sync(database):
+    assert matches(database, 'compost') == ['Pepper', 'Tomatillo']
+
+    store(database, [crop({**CROPS[3], 'fertilizer_recommendations': 'Fish emulsion'})])
+    assert matches(database, 'compost') == ['Tomatillo']
+    assert matches(database, 'emulsion') == ['Pepper']
+
+    with sqlite3.connect(database) as conn:
+        conn.execute("DELETE FROM crops WHERE name = 'Tomatillo'")
+    assert matches(database, 'compost') == []
+
+
+def test_index_is_rebuilt_for_rows_stored_before_it(database):
+    with sqlite3.connect(database) as conn:
+        for trigger in ('insert', 'delete', 'update'):
+            conn.execute(f'DROP TRIGGER crops_fts_{trigger}')
+        conn.execute('DROP TABLE crops_fts')
+
+    store(database, [])
+    assert matches(database, 'nitrogen') == ['Carrot']
+
+
+@pytest.mark.parametrize('term', ['tomato', 'week', 'compost', 'carrot'])
+def test_search_finds_what_the_client_side_filter_did(search, term):
+    assert sorted(result['name'] for result in search(term)['results']) == client_side_filter(term)
+
+
+def test_search_ranks_name_matches_first_and_marks_them(search):
+    results = search('pepper')['results']
+    assert [result['name'] for result in results] == ['Pepper', 'Tomato']
+    assert '<mark>' in results[0]['snippet']
+    assert search('  ')['results'] == []
@@ -0,0 +1,104 @@
+import pytest
+from scrapy.http import HtmlResponse, Request
+
+from crop_scraper.sections import SectionIndex, section_index
+from crop_scraper.spiders.almanac_spider import AlmanacSpider
+from crop_scraper.spiders.gardening_know_how_spider import GardeningKnowHowSpider
+
+URL = 'https://www.almanac.com/plant/tomatoes'
+ARTICLE_URL = 'https://www.gardeningknowhow.com/edible/vegetables/tomato/growing-tomatoes.htm'
+
+GUIDE = '''<html><body><article>
+<h1 class="page-title">Tomatoes</h1>
+<p>Tomatoes are the most popular garden crop. Water is what they crave most in a hot summer.</p>
+<h2>Planting</h2>
+<p>Sow seeds 1/4 inch deep indoors six weeks before the last frost. Space plants 24 inches apart.</p>
+<h3>Seedlings</h3>
+<p>Harden off seedlings for a week before setting them out in the garden.</p>
+<h2>Watering</h2>
+<p>Water 1 to 2 inches per week, more during dry spells, and mulch to keep moisture in.</p>
+<p><strong>Feeding</strong></p>
+<p>Side-dress with compost once fruit sets; too much nitrogen gives leaves, not fruit.</p>
+</article></body></html>'''
+
+ARTICLE = '''<html><body><h1>How To Grow Tomato Plants</h1>
+<div class="entry-content">
+  <p>Tomato plants are easy to grow. Watering them well and often is the first rule of the garden.</p>
+  <h2>Tomato Care</h2>
+  <p>Remove suckers below the first flower cluster to keep the plant open.</p>
+  <h2>How to Water Tomatoes</h2>
+  <p>Watering deeply twice a week gives the roots about 2 inches of water in total.</p>
+</div>
+</body></html>'''
+
+# Headings that name no field, or name one but hold nothing for it
+MISLEADING = '''<html><body><article>
+<h1 class="page-title">Carrots</h1>
+<h2>Watering cans we love</h2>
+<p>A long-spouted can makes light work of the vegetable patch in every season.</p>
+<h2>Our favourite varieties</h2>
+<p>Sow seeds 1/4 inch deep in loose soil. Space plants 2 inches apart after thinning.</p>
+<p>Water 1 inch per week so roots grow straight and sweet in the summer.</p>
+</article></body></html>'''
+
+
+NO_HEADINGS = GUIDE
+for tag in ('h2', 'h3', 'strong'):
+    NO_HEADINGS = NO_HEADINGS.replace(f'<{tag}>', '<span>').replace(f'</{tag}>', '</span>')
+
+
+def page(body, url=URL):
+    return HtmlResponse(url, body=body.encode(), encoding='utf-8', request=Request(url))
+
+
+@pytest.fixture
+def whole_page(monkeypatch):
+    """Search fields in the whole content, as the extractors did before section lookup"""
+    monkeypatch.setattr(SectionIndex, 'documents', lambda self, keywords, fallback: [fallback])
+
+
+def test_text_is_filed_under_nested_headings():
+    index = section_index(page(GUIDE))
+    assert index.headings() == ['tomatoes', 'planting', 'seedlings', 'watering', 'feeding']
+
+    [planting] = index.find(['plant', 'seedling'])
+    assert planting.heading == 'planting'
+    text = index.document(['plant']).text
+    assert 'Sow seeds 1/4 inch deep' in text and 'Harden off seedlings' in text
+    assert 'Planting' not in text and 'Water 1 to 2 inches' not in text
+
+    # A bold-only paragraph heads a section below the h2 it sits in
+    assert index.document(['feed']).text.strip().startswith('Side-dress with compost')
+    assert 'Side-dress with compost' in index.document(['water']).text
+
+
+def test_keywords_match_the_start_of_heading_words():
+    index = section_index(page(GUIDE))
+    assert [section.heading for section in index.find(['water'])] == ['watering']
+    assert index.find(['atering']) == []
+    assert index.document(['harvest']) is None
+    assert index.documents(['harvest'], 'page') == ['page']
+
+
+def test_fields_are_taken_from_their_sections():
+    item = next(AlmanacSpider().parse_crop(page(GUIDE)))
+    assert item['water_needs'] == '1 to 2 inches per week, more during dry spells, and mulch to keep moisture in'
+
+    article = next(GardeningKnowHowSpider().parse_page(page(ARTICLE, ARTICLE_URL)))
+    assert article['water_needs'] == 'Watering deeply twice a week gives the roots about 2 inches of water in total.'
+
+
+def test_fields_were_taken_from_the_first_mention(whole_page):
+    item = next(AlmanacSpider().parse_crop(page(GUIDE)))
+    assert item['water_needs'] == 'is what they crave most in a hot summer'
+
+
+@pytest.mark.parametrize('spidercls, callback, body, url', [
+    (AlmanacSpider, 'parse_crop', MISLEADING, URL),
+    (AlmanacSpider, 'parse_crop', NO_HEADINGS, URL),
+    (GardeningKnowHowSpider, 'parse_page', MISLEADING.replace('article', 'div class="entry-content"'), ARTICLE_URL),
+])
+def test_pages_without_matching_sections_give_the_same_items(spidercls, callback, body, url, request):
+    sectioned = [dict(item) for item in getattr(spidercls(), callback)(page(body, url))]
+    request.getfixturevalue('whole_page')
+    assert sectioned == [dict(item) for item in getattr(spidercls(), callback)(page(body, url))]
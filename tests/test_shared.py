@@ -0,0 +1,138 @@
+import sqlite3
+
+import pytest
+import scrapy
+from scrapy.utils.test import get_crawler
+
+from crop_scraper import shared
+from crop_scraper.items import CropItem
+from crop_scraper.pipelines import DatabasePipeline
+from crop_scraper.shared import SharedPipeline, close_user, open_user
+from crop_scraper.throttle import AdaptiveThrottle
+from crop_scraper.validators import ValidatorStore
+
+URL = 'https://example.com/plant/tomato'
+
+
+class PlantSpider(scrapy.Spider):
+    name = 'plants'
+
+
+class OtherPlantSpider(scrapy.Spider):
+    name = 'other_plants'
+
+
+class Slot:
+    """The attributes of a Scrapy downloader slot the throttle retunes"""
+
+    def __init__(self, delay):
+        self.concurrency = 1
+        self.delay = delay
+
+
+@pytest.fixture(autouse=True)
+def process(monkeypatch):
+    """A fresh process-wide registry for each test"""
+    monkeypatch.setattr(shared, 'objects', {})
+    monkeypatch.setattr(shared, 'users', shared.Counter())
+
+
+def crawler(spidercls=PlantSpider, **settings):
+    return get_crawler(spidercls, settings)
+
+
+def crop(name, **fields):
+    return CropItem(name=name, source_url=f'https://example.com/{name.lower()}', data_source='test', **fields)
+
+
+def crops(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute('SELECT name, soil_ph, data_source FROM crops ORDER BY name').fetchall()
+
+
+def test_private_objects_without_the_setting():
+    built = [shared.shared(crawler(), ('archive', 'a.db'), object) for _ in range(2)]
+    assert built[0] is not built[1]
+    assert isinstance(DatabasePipeline.from_crawler(crawler()), DatabasePipeline)
+
+
+def test_one_object_per_key_with_the_setting():
+    first = shared.shared(crawler(SHARED_RESOURCES=True), ('archive', 'a.db'), object)
+    assert shared.shared(crawler(OtherPlantSpider, SHARED_RESOURCES=True), ('archive', 'a.db'), object) is first
+    assert shared.shared(crawler(SHARED_RESOURCES=True), ('archive', 'b.db'), object) is not first
+
+
+def test_first_user_opens_and_last_user_closes():
+    resource = object()
+    assert [open_user(resource) for _ in range(3)] == [True, False, False]
+    assert [close_user(resource) for _ in range(3)] == [False, False, True]
+    assert resource not in shared.users
+    assert open_user(resource)
+
+
+def test_shared_database_pipeline_stores_what_separate_pipelines_stored(tmp_path):
+    items = {PlantSpider: [crop('Tomato', soil_ph='6.0'), crop('Carrot', soil_ph='6.5')],
+             OtherPlantSpider: [crop('Pepper', soil_ph='6.8')]}
+
+    separate = tmp_path / 'separate.db'
+    for spidercls, spider_items in items.items():
+        pipeline = DatabasePipeline.from_crawler(crawler(spidercls, DATABASE_URL=f'sqlite:///{separate}'))
+        pipeline.open_spider(spidercls())
+        for item in spider_items:
+            pipeline.process_item(item, spidercls())
+        pipeline.close_spider(spidercls())
+
+    together = tmp_path / 'together.db'
+    handles = {spidercls: DatabasePipeline.from_crawler(
+        crawler(spidercls, DATABASE_URL=f'sqlite:///{together}', SHARED_RESOURCES=True)) for spidercls in items}
+    first, second = handles.values()
+    assert isinstance(first, SharedPipeline) and first.pipeline is second.pipeline
+
+    for spidercls, handle in handles.items():
+        handle.open_spider(spidercls())
+    for spidercls, spider_items in items.items():
+        for item in spider_items:
+            handles[spidercls].process_item(item, spidercls())
+    first.close_spider(PlantSpider())
+    assert first.pipeline.storage is not None
+    second.close_spider(OtherPlantSpider())
+    assert first.pipeline.storage is None
+
+    assert crops(together) == crops(separate)
+    assert len(crops(together)) == 3
+
+
+def test_single_crawler_slot_is_tuned_as_before():
+    throttle = AdaptiveThrottle(min_delay=1.0, max_delay=30.0)
+    state = throttle.response('example.com', 200, 8.0)
+    slot = Slot(delay=3.0)
+    throttle.apply(slot, state)
+    assert (slot.concurrency, slot.delay) == (int(state.concurrency), throttle.delay(state))
+
+
+def test_crawlers_sharing_a_host_split_its_load():
+    throttle = AdaptiveThrottle(min_delay=1.0, max_delay=30.0)
+    state = throttle.response('example.com', 200, 8.0)
+    alone, first, second = Slot(delay=3.0), Slot(delay=3.0), Slot(delay=3.0)
+    throttle.apply(alone, state)
+    throttle.apply(first, state, 'first')
+    throttle.apply(second, state, 'second')
+
+    assert second.concurrency == max(1, int(state.concurrency / 3))
+    assert second.delay == min(throttle.max_delay, alone.delay * 3)
+
+    throttle.leave('first')
+    throttle.leave('second')
+    throttle.apply(alone, state)
+    assert (alone.concurrency, alone.delay) == (int(state.concurrency), throttle.delay(state))
+
+
+def test_validators_are_kept_per_spider(tmp_path):
+    store = ValidatorStore(str(tmp_path / 'validators.db')).open()
+    store.changed(PlantSpider.name, URL, 'abc', etag='"v1"')
+    assert store.get(PlantSpider.name, URL)['etag'] == '"v1"'
+    assert store.get(OtherPlantSpider.name, URL) is None
+
+    store.changed(OtherPlantSpider.name, URL, 'def')
+    assert store.get(PlantSpider.name, URL)['sha256'] == 'abc'
+    store.close()
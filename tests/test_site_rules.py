@@ -0,0 +1,153 @@
+import pytest
+from scrapy.http import HtmlResponse, Request
+
+from crop_scraper.rules import SiteRules, site_rules
+from crop_scraper.spiders.almanac_focused_spider import AlmanacFocusedSpider
+from crop_scraper.spiders.gardening_know_how_spider import GardeningKnowHowSpider
+from crop_scraper.spiders.mini_test_spider import MiniTestSpider
+
+ALMANAC_URL = 'https://www.almanac.com/plant/tomatoes'
+GARDENING_KNOW_HOW_URL = 'https://www.gardeningknowhow.com/edible/vegetables/tomato/growing-tomatoes.htm'
+
+ALMANAC_PAGE = '''<html><head><title>Tomatoes</title></head><body>
+<article>
+<h1 class="page-title">  Tomatoes </h1>
+<div class="content">
+  <p>Tomatoes need plenty of water: 1 to 2 inches per week, more in drought.</p>
+  <p>Soil pH should be slightly acid, 6.2 to 6.8, in well-drained loam.</p>
+  <p>Feed with a 5-10-10 fertilizer at planting and compost in spring.</p>
+  <p>Give them full sun, at least 8 hours of light a day.</p>
+  <p>Sow seeds 1/4 inch deep indoors and plant out after the last frost.</p>
+  <p>Space plants 24 to 36 inches apart in rows 4 feet apart.</p>
+  <p>Harvest 60 to 85 days after transplanting, when fruit is ripe and ready.</p>
+  <p>Temperatures below 50 degrees and cold nights slow growth; protect from frost.</p>
+  <p>Water deeply at the base so leaves stay dry in summer.</p>
+</div>
+</article>
+</body></html>'''
+
+GARDENING_KNOW_HOW_PAGE = '''<html><head><title>Growing tomato plants</title></head><body>
+<h1>How To Grow Tomato Plants</h1>
+<div class="entry-content">
+  <p>Tomatoes need watering regularly, about 1 to 2 inches each week through summer.</p>
+  <p>The soil pH should be between 6.2 and 6.8 for best results.</p>
+  <p>Fertilize with a 10-10-10 fertilizer when planting. Feeding every two weeks with compost tea helps fruiting plants.</p>
+  <p>Tomatoes grow best in full sun with at least 8 hours of light.</p>
+  <p>Plant seedlings at a depth of 2 inches below the first leaves.</p>
+  <p>Spacing plants 24 inches apart gives good air flow.</p>
+  <p>Harvest in 60 to 85 days when the fruit turns red.</p>
+</div>
+</body></html>'''
+
+# What the spiders extracted before the site rules
+ALMANAC_FOCUSED_ITEM = {
+    'data_source': 'almanac.com',
+    'days_to_maturity': ['Harvest 60 to 85 days after transplanting, when fruit is ripe and ready.'],
+    'fertilizer_recommendations': ['Feed with a 5-10-10 fertilizer at planting and compost in spring.'],
+    'harvest_time': ['Harvest 60 to 85 days after transplanting, when fruit is ripe and ready.'],
+    'name': 'Tomatoes',
+    'planting_depth': ['Tomatoes need plenty of water: 1 to 2 inches per week, more in drought.',
+                       'Feed with a 5-10-10 fertilizer at planting and compost in spring.',
+                       'Sow seeds 1/4 inch deep indoors and plant out after the last frost.',
+                       'Space plants 24 to 36 inches apart in rows 4 feet apart.',
+                       'Harvest 60 to 85 days after transplanting, when fruit is ripe and ready.'],
+    'planting_season': ['Feed with a 5-10-10 fertilizer at planting and compost in spring.',
+                        'Sow seeds 1/4 inch deep indoors and plant out after the last frost.',
+                        'Space plants 24 to 36 inches apart in rows 4 feet apart.',
+                        'Harvest 60 to 85 days after transplanting, when fruit is ripe and ready.',
+                        'Water deeply at the base so leaves stay dry in summer.'],
+    'soil_ph': ['Soil pH should be slightly acid, 6.2 to 6.8, in well-drained loam.'],
+    'soil_type': ['Soil pH should be slightly acid, 6.2 to 6.8, in well-drained loam.'],
+    'source_url': 'https://www.almanac.com/plant/tomatoes',
+    'spacing': ['Tomatoes need plenty of water: 1 to 2 inches per week, more in drought.',
+                'Space plants 24 to 36 inches apart in rows 4 feet apart.'],
+    'sun_requirements': ['Soil pH should be slightly acid, 6.2 to 6.8, in well-drained loam.',
+                         'Give them full sun, at least 8 hours of light a day.'],
+    'temperature_range': ['Sow seeds 1/4 inch deep indoors and plant out after the last frost.',
+                          'Temperatures below 50 degrees and cold nights slow growth; protect from frost.'],
+    'water_needs': ['Tomatoes need plenty of water: 1 to 2 inches per week, more in drought.',
+                    'Water deeply at the base so leaves stay dry in summer.'],
+}
+
+MINI_TEST_ITEM = {
+    'data_source': 'almanac.com',
+    'days_to_maturity': 'Harvest 60 to 85 days after transplanting, when fruit is ripe and ready.',
+    'fertilizer_recommendations': 'Feed with a 5-10-10 fertilizer at planting and compost in spring.',
+    'name': 'Tomatoes',
+    'planting_depth': 'Feed with a 5-10-10 fertilizer at planting and compost in spring. | Sow seeds 1/4 inch '
+                      'deep indoors and plant out after the last frost. | Space plants 24 to 36 inches apart in '
+                      'rows 4 feet apart.',
+    'soil_ph': 'Soil pH should be slightly acid, 6.2 to 6.8, in well-drained loam.',
+    'source_url': 'https://www.almanac.com/plant/tomatoes',
+    'spacing': 'Space plants 24 to 36 inches apart in rows 4 feet apart.',
+    'sun_requirements': 'Soil pH should be slightly acid, 6.2 to 6.8, in well-drained loam.',
+    'water_needs': 'Tomatoes need plenty of water: 1 to 2 inches per week, more in drought. | Water deeply at '
+                   'the base so leaves stay dry in summer.',
+}
+
+GARDENING_KNOW_HOW_ITEM = {
+    'common_name': 'Tomato',
+    'data_source': 'Gardening Know How',
+    'days_to_maturity': 'Harvest in 60 to 85 days when the fruit turns red.',
+    'fertilizer_recommendations': ['Fertilize with a 10-10-10 fertilizer when planting.',
+                                   'Feeding every two weeks with compost tea helps fruiting plants.',
+                                   'compost tea helps fruiting plants.',
+                                   '10-10-10 fertilizer when planting.'],
+    'name': 'Tomato',
+    'planting_depth': 'Plant seedlings at a depth of 2 inches below the first leaves.',
+    'soil_ph': 'pH should be between 6.',
+    'source_url': 'https://www.gardeningknowhow.com/edible/vegetables/tomato/growing-tomatoes.htm',
+    'spacing': 'Spacing plants 24 inches apart gives good air flow.',
+    'sun_requirements': 'full sun with at least 8 hours of light.',
+    'water_needs': 'watering regularly, about 1 to 2 inches each week through summer.',
+}
+
+
+def page(url, body):
+    return HtmlResponse(url, body=body.encode(), encoding='utf-8', request=Request(url))
+
+
+@pytest.mark.parametrize('spider, url, body, expected', [
+    (AlmanacFocusedSpider, ALMANAC_URL, ALMANAC_PAGE, ALMANAC_FOCUSED_ITEM),
+    (MiniTestSpider, ALMANAC_URL, ALMANAC_PAGE, MINI_TEST_ITEM),
+    (GardeningKnowHowSpider, GARDENING_KNOW_HOW_URL, GARDENING_KNOW_HOW_PAGE, GARDENING_KNOW_HOW_ITEM),
+])
+def test_rules_extract_what_the_spider_did(spider, url, body, expected):
+    items = [dict(item) for item in spider().parse_page(page(url, body))]
+    assert items == [expected]
+
+
+def test_crop_name_falls_back_to_the_url():
+    url = 'https://www.almanac.com/plant/sweet-peppers'
+    body = '<html><body><h1>Growing Guide</h1><p>Water 1 inch per week, more in dry spells.</p></body></html>'
+    assert site_rules('mini_test').crop_name(page(url, body)) == 'Sweet Peppers'
+    assert site_rules('mini_test').crop_name(page('https://www.almanac.com/garden/x', body)) == 'Unknown'
+    # almanac_focused used to return '' for a blank title
+    blank = '<html><body><h1 class="page-title">   </h1></body></html>'
+    assert site_rules('almanac_focused').crop_name(page(url, blank)) == 'Sweet Peppers'
+
+
+def test_article_without_a_title_is_skipped():
+    body = '<html><body><div class="entry-content"><p>Water 1 inch per week in dry spells.</p></div></body></html>'
+    assert list(GardeningKnowHowSpider().parse_page(page(GARDENING_KNOW_HOW_URL, body))) == []
+
+
+def test_listing_pages_are_followed_to_crop_pages():
+    listing = '''<html><body>
+        <a href="/edible/vegetables/tomato/growing-tomatoes.htm">Tomatoes</a>
+        <a href="/edible/vegetables/okra/okra-recipes.htm">Okra recipes</a>
+        <a class="next" href="/edible/vegetables?page=2">Next</a>
+    </body></html>'''
+    spider = GardeningKnowHowSpider()
+    requests = list(spider.parse(page('https://www.gardeningknowhow.com/edible/vegetables', listing)))
+    assert [(request.url, request.callback) for request in requests] == [
+        (GARDENING_KNOW_HOW_URL, spider.parse_page),
+        ('https://www.gardeningknowhow.com/edible/vegetables?page=2', spider.parse),
+    ]
+
+
+def test_unknown_rule_keys_are_rejected():
+    with pytest.raises(ValueError):
+        SiteRules('typo', {'fields': {'water_needs': {'keyword': ['water']}}})
+    with pytest.raises(ValueError):
+        SiteRules('typo', {'fields': {'not_a_field': {'keywords': ['water']}}})
@@ -0,0 +1,32 @@
+from crop_scraper.throttle import AdaptiveThrottle
+
+
+class Slot:
+    """The attributes of a Scrapy downloader slot the throttle retunes"""
+
+    def __init__(self, delay):
+        self.concurrency = 1
+        self.delay = delay
+
+
+def retune(throttle, slot, key='example.com', status=200, latency=0.1):
+    throttle.apply(slot, throttle.response(key, status, latency))
+    return slot.delay
+
+
+def test_fast_host_keeps_the_spiders_download_delay():
+    throttle = AdaptiveThrottle(min_delay=1.0)
+    slot = Slot(delay=3.0)
+    assert [retune(throttle, slot) for _ in range(5)] == [3.0] * 5
+
+
+def test_delay_never_drops_below_the_minimum():
+    throttle = AdaptiveThrottle(min_delay=1.0)
+    assert retune(throttle, Slot(delay=0.0)) == 1.0
+
+
+def test_slow_host_is_delayed_beyond_the_start_delay():
+    throttle = AdaptiveThrottle(min_delay=1.0, max_delay=30.0)
+    slot = Slot(delay=3.0)
+    assert retune(throttle, slot, latency=8.0) == 4.0  # latency over the concurrency it grew to, 2
+    assert retune(throttle, slot, status=503) == 16.0